@@ -0,0 +1,4 @@
+from browser_use.agent.gateway.service import LLMGateway
+from browser_use.agent.gateway.views import LLMGatewayConfig, LLMGatewayMetrics
+
+__all__ = ['LLMGateway', 'LLMGatewayConfig', 'LLMGatewayMetrics']
@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Any
+
+from langchain_core.load import dumpd
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable
+
+from browser_use.agent.gateway.views import LLMGatewayConfig, LLMGatewayMetrics
+
+if TYPE_CHECKING:
+	import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+	"""Token bucket refilled continuously at `per_minute` tokens per minute, holding at most one minute of tokens"""
+
+	def __init__(self, per_minute: int):
+		self.capacity = float(per_minute)
+		self.rate = per_minute / 60
+		self.tokens = self.capacity
+		self._updated = time.monotonic()
+
+	def _refill(self, now: float) -> None:
+		self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+		self._updated = now
+
+	def wait_time(self, amount: float, now: float) -> float:
+		"""Seconds until `amount` tokens are available (requests larger than the bucket wait for a full bucket)"""
+		self._refill(now)
+		missing = min(amount, self.capacity) - self.tokens
+		return max(0.0, missing / self.rate)
+
+	def consume(self, amount: float, now: float) -> None:
+		"""Take tokens from the bucket, it can go negative if usage was underestimated"""
+		self._refill(now)
+		self.tokens -= amount
+
+
+class LLMGateway:
+	"""
+	Gateway for LLM calls shared by many agents in one process.
+
+	Calls are queued by priority (lower value first, FIFO within a priority) and released while the requests per
+	minute and tokens per minute budgets allow it. A rate limit error from the provider pauses the whole queue instead
+	of every agent backing off on its own. Identical requests in flight at the same time share a single call.
+
+	Pass the same gateway to every Agent with `Agent(..., llm_gateway=gateway)`. For pooled connections, create the
+	chat models with the gateway's http client, e.g. `ChatOpenAI(http_async_client=gateway.get_http_async_client())`.
+	"""
+
+	def __init__(self, config: LLMGatewayConfig | None = None):
+		self.config = config or LLMGatewayConfig()
+		self._request_bucket = TokenBucket(self.config.requests_per_minute) if self.config.requests_per_minute else None
+		self._token_bucket = TokenBucket(self.config.tokens_per_minute) if self.config.tokens_per_minute else None
+
+		# heap of (priority, sequence, tokens, future), the future is resolved when the request may start
+		self._queue: list[tuple[int, int, int, asyncio.Future[None]]] = []
+		self._sequence = itertools.count()
+		self._in_flight = 0
+		self._paused_until = 0.0
+		self._wakeup: asyncio.TimerHandle | None = None
+		self._pending_calls: dict[str, asyncio.Future[Any]] = {}
+		self._http_async_client: httpx.AsyncClient | None = None
+
+		self._latencies: deque[float] = deque(maxlen=self.config.latency_window)
+		self._queue_waits: deque[float] = deque(maxlen=self.config.latency_window)
+		self._total_requests = 0
+		self._failed_requests = 0
+		self._rate_limited_requests = 0
+		self._coalesced_requests = 0
+
+	async def ainvoke(
+		self, runnable: Runnable, input: Any, tokens: int | None = None, priority: int = 0, coalesce: bool = True
+	) -> Any:
+		"""Call runnable.ainvoke(input) through the queue
+
+		tokens: input tokens of the request (e.g. from the message manager), estimated from the input if not given
+		priority: lower values are served first
+		coalesce: False to always make a call of its own, e.g. for a hedged duplicate of a request that is still pending
+		"""
+		if not coalesce or not self.config.coalesce_identical_requests:
+			return await self._ainvoke(runnable, input, tokens, priority)
+
+		key = self._request_key(runnable, input)
+		pending_call = self._pending_calls.get(key)
+		if pending_call is not None:
+			self._coalesced_requests += 1
+			try:
+				# every caller gets its own copy, agents modify the parsed output
+				return copy.deepcopy(await asyncio.shield(pending_call))
+			except asyncio.CancelledError:
+				if not pending_call.cancelled():
+					raise
+				# the caller that made the request was cancelled, not us
+				return await self._ainvoke(runnable, input, tokens, priority)
+
+		pending_call = asyncio.get_running_loop().create_future()
+		self._pending_calls[key] = pending_call
+		try:
+			result = await self._ainvoke(runnable, input, tokens, priority)
+			pending_call.set_result(result)
+			return result
+		except asyncio.CancelledError:
+			pending_call.cancel()
+			raise
+		except Exception as e:
+			pending_call.set_exception(e)
+			pending_call.exception()  # mark as retrieved if nobody else waited for it
+			raise
+		finally:
+			del self._pending_calls[key]
+
+	async def _ainvoke(self, runnable: Runnable, input: Any, tokens: int | None, priority: int) -> Any:
+		if tokens is None:
+			tokens = self._estimate_tokens(input)
+		async with self.slot(tokens, priority):
+			result = await runnable.ainvoke(input)
+
+		# charge the output tokens (and any underestimate of the input) once the provider reports the usage
+		used_tokens = self._get_usage_tokens(result)
+		if self._token_bucket and used_tokens > tokens:
+			self._token_bucket.consume(used_tokens - tokens, time.monotonic())
+		return result
+
+	@asynccontextmanager
+	async def slot(self, tokens: int = 0, priority: int = 0) -> AsyncIterator[None]:
+		"""Wait for a free slot in the rate limits and hold it for the duration of the block (e.g. a streamed call)"""
+		queued_at = time.monotonic()
+		await self._acquire(tokens, priority)
+		started_at = time.monotonic()
+		self._queue_waits.append(started_at - queued_at)
+		self._total_requests += 1
+		try:
+			yield
+		except Exception as e:
+			self._failed_requests += 1
+			if self._is_rate_limit_error(e):
+				self._rate_limited_requests += 1
+				self._pause(self._get_retry_after(e))
+			raise
+		finally:
+			self._latencies.append(time.monotonic() - started_at)
+			self._in_flight -= 1
+			self._dispatch()
+
+	def metrics(self) -> LLMGatewayMetrics:
+		"""Current queue depth, counters and latency percentiles"""
+		return LLMGatewayMetrics(
+			queue_depth=sum(1 for *_, future in self._queue if not future.done()),
+			in_flight=self._in_flight,
+			total_requests=self._total_requests,
+			failed_requests=self._failed_requests,
+			rate_limited_requests=self._rate_limited_requests,
+			coalesced_requests=self._coalesced_requests,
+			queue_wait_p50=_percentile(self._queue_waits, 50),
+			queue_wait_p95=_percentile(self._queue_waits, 95),
+			latency_p50=_percentile(self._latencies, 50),
+			latency_p95=_percentile(self._latencies, 95),
+			latency_max=max(self._latencies, default=0.0),
+		)
+
+	def get_http_async_client(self) -> httpx.AsyncClient:
+		"""Shared pooled http client, pass it to the chat models (e.g. http_async_client for ChatOpenAI)"""
+		if self._http_async_client is None:
+			import httpx
+
+			self._http_async_client = httpx.AsyncClient(
+				limits=httpx.Limits(
+					max_connections=self.config.max_connections,
+					max_keepalive_connections=self.config.max_keepalive_connections,
+				)
+			)
+		return self._http_async_client
+
+	async def aclose(self) -> None:
+		"""Close the shared http client"""
+		if self._http_async_client is not None:
+			await self._http_async_client.aclose()
+			self._http_async_client = None
+
+	async def _acquire(self, tokens: int, priority: int) -> None:
+		future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+		heapq.heappush(self._queue, (priority, next(self._sequence), tokens, future))
+		self._dispatch()
+		try:
+			await future
+		except asyncio.CancelledError:
+			if future.done() and not future.cancelled():
+				# the slot was granted just before the cancellation, give it back
+				self._in_flight -= 1
+				self._dispatch()
+			raise
+
+	def _dispatch(self) -> None:
+		"""Start queued requests in priority order while the limits allow it"""
+		if self._wakeup is not None:
+			self._wakeup.cancel()
+			self._wakeup = None
+
+		while self._queue:
+			_, _, tokens, future = self._queue[0]
+			if future.done():
+				# cancelled while waiting
+				heapq.heappop(self._queue)
+				continue
+			if self.config.max_concurrent_requests and self._in_flight >= self.config.max_concurrent_requests:
+				return  # the next finished request dispatches again
+
+			now = time.monotonic()
+			wait = self._paused_until - now
+			if self._request_bucket:
+				wait = max(wait, self._request_bucket.wait_time(1, now))
+			if self._token_bucket:
+				wait = max(wait, self._token_bucket.wait_time(tokens, now))
+			if wait > 0:
+				self._wakeup = asyncio.get_running_loop().call_later(wait, self._dispatch)
+				return
+
+			heapq.heappop(self._queue)
+			if self._request_bucket:
+				self._request_bucket.consume(1, now)
+			if self._token_bucket:
+				self._token_bucket.consume(tokens, now)
+			self._in_flight += 1
+			future.set_result(None)
+
+	def _pause(self, seconds: float) -> None:
+		"""Hold back all queued requests, the provider is rate limiting us"""
+		logger.warning(f'⏳ LLM provider rate limit reached, pausing all queued requests for {seconds:.1f}s')
+		self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+	def _get_retry_after(self, error: Exception) -> float:
+		response = getattr(error, 'response', None)
+		headers = getattr(response, 'headers', None) or {}
+		try:
+			return float(headers.get('retry-after'))
+		except (TypeError, ValueError):
+			return self.config.rate_limit_backoff_seconds
+
+	@staticmethod
+	def _is_rate_limit_error(error: Exception) -> bool:
+		status_code = getattr(error, 'status_code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+		return status_code == 429 or 'RateLimit' in type(error).__name__
+
+	@staticmethod
+	def _request_key(runnable: Runnable, input: Any) -> str:
+		"""
+		Identical runnable and identical input.
+
+		The runnable is compared by its serialized form (model class, model name, parameters, bound tools and output
+		parsers), so separate but identical model objects and structured output runnables created per call match.
+		"""
+		serialized = json.dumps([dumpd(runnable), dumpd(input)], sort_keys=True, default=str)
+		return hashlib.sha256(serialized.encode()).hexdigest()
+
+	@staticmethod
+	def _estimate_tokens(input: Any) -> int:
+		messages = input if isinstance(input, list) else [input]
+		characters = sum(len(str(m.content)) if isinstance(m, BaseMessage) else len(str(m)) for m in messages)
+		return characters // 3
+
+	@staticmethod
+	def _get_usage_tokens(result: Any) -> int:
+		# structured output with include_raw returns the message as 'raw'
+		message = result.get('raw') if isinstance(result, dict) else result
+		usage = getattr(message, 'usage_metadata', None) or {}
+		return usage.get('total_tokens', 0)
+
+
+def _percentile(values: deque[float], percentile: int) -> float:
+	if not values:
+		return 0.0
+	ordered = sorted(values)
+	return ordered[min(len(ordered) - 1, len(ordered) * percentile // 100)]
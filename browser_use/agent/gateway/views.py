@@ -0,0 +1,40 @@
+from pydantic import BaseModel, Field
+
+
+class LLMGatewayConfig(BaseModel):
+	"""Configuration for a LLM gateway shared by agents"""
+
+	# Provider limits, None means unlimited
+	requests_per_minute: int | None = Field(default=None, gt=0)
+	tokens_per_minute: int | None = Field(default=None, gt=0)
+	max_concurrent_requests: int | None = Field(default=None, gt=0)
+
+	# How long all queued requests wait after the provider answered with a rate limit error (if it sends no retry-after)
+	rate_limit_backoff_seconds: float = Field(default=10.0, ge=0)
+
+	# Share one model call between identical requests that are in flight at the same time
+	coalesce_identical_requests: bool = True
+
+	# Connection pool of the shared http client (see LLMGateway.get_http_async_client)
+	max_connections: int = Field(default=100, gt=0)
+	max_keepalive_connections: int = Field(default=20, gt=0)
+
+	# Number of recent requests used for the latency percentiles
+	latency_window: int = Field(default=500, gt=0)
+
+
+class LLMGatewayMetrics(BaseModel):
+	"""Snapshot of the gateway queue and latency metrics"""
+
+	queue_depth: int
+	in_flight: int
+	total_requests: int
+	failed_requests: int
+	rate_limited_requests: int
+	coalesced_requests: int
+	# seconds spent waiting in the queue, and calling the model
+	queue_wait_p50: float
+	queue_wait_p95: float
+	latency_p50: float
+	latency_p95: float
+	latency_max: float
@@ -55,7 +55,8 @@ def create_history_gif(
 	images = []
 
 	# if history is empty or first screenshot is None, we can't create a gif
-	if not history.history or not history.history[0].state.screenshot:
+	first_screenshot = history.history[0].state.get_screenshot() if history.history else None
+	if not first_screenshot:
 		logger.warning('No history or first screenshot to create GIF from')
 		return
 
@@ -115,7 +116,7 @@ def create_history_gif(
 	if show_task and task:
 		task_frame = _create_task_frame(
 			task,
-			history.history[0].state.screenshot,
+			first_screenshot,
 			title_font,  # type: ignore
 			regular_font,  # type: ignore
 			logo,
@@ -125,11 +126,12 @@ def create_history_gif(
 
 	# Process each history item
 	for i, item in enumerate(history.history, 1):
-		if not item.state.screenshot:
+		screenshot = item.state.get_screenshot()
+		if not screenshot:
 			continue
 
 		# Convert base64 screenshot to PIL Image
-		img_data = base64.b64decode(item.state.screenshot)
+		img_data = base64.b64decode(screenshot)
 		image = Image.open(io.BytesIO(img_data))
 
 		if show_goals and item.model_output:
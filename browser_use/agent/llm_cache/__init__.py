@@ -0,0 +1,4 @@
+from browser_use.agent.llm_cache.service import LLMCacheMissError, LLMResponseCache
+from browser_use.agent.llm_cache.views import LLMCacheConfig, LLMCacheStats
+
+__all__ = ['LLMCacheConfig', 'LLMCacheMissError', 'LLMCacheStats', 'LLMResponseCache']
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.load import dumps, loads
+
+from browser_use.agent.llm_cache.views import LLMCacheConfig, LLMCacheStats
+
+logger = logging.getLogger(__name__)
+
+# Parts of the prompt that change between otherwise identical runs (see AgentMessagePrompt)
+VOLATILE_PROMPT_PATTERNS = [
+	re.compile(r'Current date and time: \d{4}-\d{2}-\d{2} \d{2}:\d{2}'),
+]
+
+
+class LLMCacheMissError(Exception):
+	"""Raised in replay mode when a model call has no recorded response"""
+
+
+class LLMResponseCache(BaseCache):
+	"""
+	Content-addressed on-disk cache of chat model responses, backed by SQLite.
+
+	The key is a hash of the serialized messages, the model and its call parameters (incl. bound tools and the
+	structured output schema), with volatile parts of the prompt such as the current time removed. The raw model
+	response is cached, so structured output is parsed again on a hit exactly as for a live call.
+
+	It plugs into the langchain cache hook: pass it to Agent(llm_cache=...) to cache the agent, planner, extraction
+	and validation calls, or set it on any chat model with `ChatOpenAI(cache=cache)` or globally with
+	`langchain_core.globals.set_llm_cache(cache)`. Streamed calls are not cached.
+	"""
+
+	def __init__(self, config: LLMCacheConfig | None = None):
+		self.config = config or LLMCacheConfig()
+		self._hits = 0
+		self._misses = 0
+		self._lock = threading.Lock()
+
+		# the async lookups of langchain run in executor threads
+		Path(self.config.path).expanduser().parent.mkdir(parents=True, exist_ok=True)
+		self._connection = sqlite3.connect(Path(self.config.path).expanduser(), check_same_thread=False)
+		with self._lock, self._connection:
+			self._connection.execute(
+				'CREATE TABLE IF NOT EXISTS responses '
+				'(key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, last_used_at REAL NOT NULL)'
+			)
+			self._connection.execute('CREATE INDEX IF NOT EXISTS responses_last_used_at ON responses (last_used_at)')
+
+	def lookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+		if self.config.mode == 'off':
+			return None
+
+		key = self.make_key(prompt, llm_string)
+		now = time.time()
+		with self._lock, self._connection:
+			row = self._connection.execute('SELECT value, created_at FROM responses WHERE key = ?', (key,)).fetchone()
+			if row is not None and self.config.ttl_seconds is not None and now - row[1] > self.config.ttl_seconds:
+				self._connection.execute('DELETE FROM responses WHERE key = ?', (key,))
+				row = None
+			if row is not None:
+				self._connection.execute('UPDATE responses SET last_used_at = ? WHERE key = ?', (now, key))
+
+		if row is None:
+			self._misses += 1
+			if self.config.mode == 'replay':
+				raise LLMCacheMissError(f'No recorded LLM response for request {key[:12]} in {self.config.path}')
+			return None
+
+		self._hits += 1
+		logger.debug(f'💾 LLM response cache hit for request {key[:12]}')
+		return [loads(generation) for generation in loads(row[0])]
+
+	def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+		if self.config.mode != 'record':
+			return
+
+		key = self.make_key(prompt, llm_string)
+		value = dumps([dumps(generation) for generation in return_val])
+		now = time.time()
+		with self._lock, self._connection:
+			self._connection.execute(
+				'INSERT OR REPLACE INTO responses (key, value, created_at, last_used_at) VALUES (?, ?, ?, ?)',
+				(key, value, now, now),
+			)
+			# evict the least recently used entries
+			self._connection.execute(
+				'DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)',
+				(self.config.max_entries,),
+			)
+
+	def clear(self, **kwargs: Any) -> None:
+		with self._lock, self._connection:
+			self._connection.execute('DELETE FROM responses')
+
+	def stats(self) -> LLMCacheStats:
+		with self._lock:
+			entries = self._connection.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+		return LLMCacheStats(hits=self._hits, misses=self._misses, entries=entries)
+
+	def cached_model(self, llm: BaseChatModel) -> BaseChatModel:
+		"""Copy of the model that uses this cache for its calls, the model itself if it has its own cache setting"""
+		if llm.cache is not None:
+			return llm
+		# shallow copy, the caller's model is left as it is and the copy shares its clients
+		return llm.model_copy(update={'cache': self})
+
+	def close(self) -> None:
+		with self._lock:
+			self._connection.close()
+
+	@staticmethod
+	def make_key(prompt: str, llm_string: str) -> str:
+		for pattern in VOLATILE_PROMPT_PATTERNS:
+			prompt = pattern.sub('', prompt)
+		return hashlib.sha256(f'{llm_string}\n{prompt}'.encode()).hexdigest()
@@ -0,0 +1,32 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+from browser_use.telemetry.service import xdg_cache_home
+
+LLMCacheMode = Literal['record', 'replay', 'off']
+
+
+class LLMCacheConfig(BaseModel):
+	"""Configuration for the on-disk LLM response cache"""
+
+	path: str = str(xdg_cache_home() / 'browser_use' / 'llm_cache.sqlite')
+
+	# record: answer from the cache and store every new response
+	# replay: only answer from the cache, a miss raises LLMCacheMissError (offline reruns, CI)
+	# off: the cache is neither read nor written
+	mode: LLMCacheMode = 'record'
+
+	# Entries older than this are treated as missing, None keeps them forever
+	ttl_seconds: float | None = Field(default=None, gt=0)
+
+	# The least recently used entries are evicted beyond this size
+	max_entries: int = Field(default=10_000, gt=0)
+
+
+class LLMCacheStats(BaseModel):
+	"""Counters of the cache lookups since it was opened"""
+
+	hits: int
+	misses: int
+	entries: int
@@ -1,4 +1,5 @@
+from browser_use.agent.memory.backends import Mem0MemoryBackend, MemoryBackend, SummaryMemoryBackend
 from browser_use.agent.memory.service import Memory
 from browser_use.agent.memory.views import MemoryConfig
 
-__all__ = ['Memory', 'MemoryConfig']
+__all__ = ['Mem0MemoryBackend', 'Memory', 'MemoryBackend', 'MemoryConfig', 'SummaryMemoryBackend']
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import convert_to_openai_messages
+
+from browser_use.agent.memory.views import MemoryConfig
+
+if TYPE_CHECKING:
+	from browser_use.agent.gateway import LLMGateway
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend(ABC):
+	"""Creates the memory that replaces older messages of the agent"""
+
+	# The new memory also replaces the previous memory messages (rolling summary) instead of being added next to them
+	replaces_memory: bool = False
+
+	@abstractmethod
+	def create_memory(self, messages: list[BaseMessage], current_step: int) -> str | None:
+		"""Text of the memory for the messages, None if it could not be created"""
+
+	async def acreate_memory(self, messages: list[BaseMessage], current_step: int) -> str | None:
+		"""create_memory for the background task, in a worker thread unless the backend has an async implementation"""
+		return await asyncio.to_thread(self.create_memory, messages, current_step)
+
+
+SUMMARY_SYSTEM_PROMPT = """You compact the message history of a browser automation agent into a summary that replaces it.
+Keep what the agent needs to continue the task: what was done and on which pages, information that was found or \
+extracted, what failed and why, and what is left to do. Fold a previous summary in, it is part of the history. \
+Leave out page contents that are not needed anymore. Answer with the summary only, in at most {max_tokens} tokens."""
+
+
+class SummaryMemoryBackend(MemoryBackend):
+	"""
+	Rolling summary of the old messages written by the agent's own LLM, no embedder or vector store needed.
+
+	With an llm_gateway, the background summaries are queued through it like the agent's other model calls.
+	"""
+
+	replaces_memory = True
+
+	def __init__(self, llm: BaseChatModel, max_tokens: int = 800, llm_gateway: LLMGateway | None = None, priority: int = 0):
+		self.llm = llm
+		self.max_tokens = max_tokens
+		self.llm_gateway = llm_gateway
+		self.priority = priority
+
+	def create_memory(self, messages: list[BaseMessage], current_step: int) -> str | None:
+		try:
+			response = self.llm.invoke(self._summary_prompt(messages, current_step))
+		except Exception as e:
+			logger.error(f'Error creating summary memory: {e}')
+			return None
+		return self._format_summary(response, current_step)
+
+	async def acreate_memory(self, messages: list[BaseMessage], current_step: int) -> str | None:
+		prompt = self._summary_prompt(messages, current_step)
+		try:
+			if self.llm_gateway is None:
+				response = await self.llm.ainvoke(prompt)
+			else:
+				response = await self.llm_gateway.ainvoke(self.llm, prompt, priority=self.priority)
+		except Exception as e:
+			logger.error(f'Error creating summary memory: {e}')
+			return None
+		return self._format_summary(response, current_step)
+
+	def _summary_prompt(self, messages: list[BaseMessage], current_step: int) -> list[BaseMessage]:
+		history = '\n\n'.join(f'{_role(m)}: {_text(m)}' for m in messages)
+		return [
+			SystemMessage(content=SUMMARY_SYSTEM_PROMPT.format(max_tokens=self.max_tokens)),
+			HumanMessage(content=f'History up to step {current_step}:\n\n{history}'),
+		]
+
+	@staticmethod
+	def _format_summary(response: BaseMessage, current_step: int) -> str | None:
+		summary = _text(response).strip()
+		return f'Summary of steps 1-{current_step}:\n{summary}' if summary else None
+
+
+class Mem0MemoryBackend(MemoryBackend):
+	"""Procedural memory created by mem0, needs pip install browser-use[memory]"""
+
+	def __init__(self, config: MemoryConfig):
+		self.config = config
+
+		# Check for required packages
+		try:
+			# also disable mem0's telemetry when ANONYMIZED_TELEMETRY=False
+			if os.getenv('ANONYMIZED_TELEMETRY', 'true').lower()[0] in 'fn0':
+				os.environ['MEM0_TELEMETRY'] = 'False'
+			from mem0 import Memory as Mem0Memory
+		except ImportError:
+			raise ImportError('mem0 is required when enable_memory=True. Please install it with `pip install mem0`.')
+
+		if self.config.embedder_provider == 'huggingface':
+			try:
+				# check that required package is installed if huggingface is used
+				from sentence_transformers import SentenceTransformer  # noqa: F401
+			except ImportError:
+				raise ImportError(
+					'sentence_transformers is required when enable_memory=True and embedder_provider="huggingface". Please install it with `pip install sentence-transformers`.'
+				)
+
+		# Initialize Mem0 with the configuration
+		self.mem0 = Mem0Memory.from_config(config_dict=self.config.full_config_dict)
+
+	def create_memory(self, messages: list[BaseMessage], current_step: int) -> str | None:
+		parsed_messages = convert_to_openai_messages([m for m in messages if m.content])
+		try:
+			results = self.mem0.add(
+				messages=parsed_messages,
+				agent_id=self.config.agent_id,
+				memory_type='procedural_memory',
+				metadata={'step': current_step},
+			)
+			if len(results.get('results', [])):
+				return results.get('results', [])[0].get('memory')
+			return None
+		except Exception as e:
+			logger.error(f'Error creating procedural memory: {e}')
+			return None
+
+
+def _role(message: BaseMessage) -> str:
+	if isinstance(message, AIMessage):
+		return 'agent'
+	if isinstance(message, ToolMessage):
+		return 'tool'
+	return 'user'
+
+
+def _text(message: BaseMessage) -> str:
+	"""Text of the message, images are left out and tool calls are included"""
+	if isinstance(message.content, str):
+		text = message.content
+	else:
+		text = '\n'.join(
+			part if isinstance(part, str) else part.get('text', '')
+			for part in message.content
+			if isinstance(part, str) or part.get('type') == 'text'
+		)
+	if isinstance(message, AIMessage) and message.tool_calls:
+		text = '\n'.join([text, *(str(call['args']) for call in message.tool_calls)]).strip()
+	return text
@@ -1,31 +1,42 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-import os
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
 from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.messages import (
-	BaseMessage,
-	HumanMessage,
-)
-from langchain_core.messages.utils import convert_to_openai_messages
+from langchain_core.messages import HumanMessage
 
+from browser_use.agent.memory.backends import Mem0MemoryBackend, MemoryBackend, SummaryMemoryBackend
 from browser_use.agent.memory.views import MemoryConfig
 from browser_use.agent.message_manager.service import MessageManager
 from browser_use.agent.message_manager.views import ManagedMessage, MessageMetadata
 from browser_use.utils import time_execution_sync
 
+if TYPE_CHECKING:
+	from browser_use.agent.gateway import LLMGateway
+
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class _MessagesSnapshot:
+	messages: set[int]  # ids of all messages in the history when the snapshot was taken
+	messages_to_process: list[ManagedMessage]
+
+
 class Memory:
 	"""
 	Manages procedural memory for agents.
 
-	This class implements a procedural memory management system using Mem0 that transforms agent interaction history
+	This class implements a procedural memory management system that transforms agent interaction history
 	into concise, structured representations at specified intervals. It serves to optimize context window
 	utilization during extended task execution by converting verbose historical information into compact,
 	yet comprehensive memory constructs that preserve essential operational knowledge.
+
+	The memory is created by a MemoryBackend: by default mem0's procedural memory (pip install browser-use[memory]),
+	or a rolling summary written by the agent's LLM with MemoryConfig(backend='summary').
 	"""
 
 	def __init__(
@@ -33,9 +44,13 @@ class Memory:
 		message_manager: MessageManager,
 		llm: BaseChatModel,
 		config: MemoryConfig | None = None,
+		backend: MemoryBackend | None = None,
+		llm_gateway: LLMGateway | None = None,
+		priority: int = 0,
 	):
 		self.message_manager = message_manager
 		self.llm = llm
+		self._pending: tuple[_MessagesSnapshot, asyncio.Task[str | None]] | None = None
 
 		# Initialize configuration with defaults based on the LLM if not provided
 		if config is None:
@@ -57,95 +72,116 @@ class Memory:
 				self.config.embedder_dims = 512
 		else:
 			# Ensure LLM instance is set in the config
-			self.config = MemoryConfig(config)  # re-validate user-provided config
+			self.config = MemoryConfig.model_validate(config)  # re-validate user-provided config
 			self.config.llm_instance = llm
 
-		# Check for required packages
-		try:
-			# also disable mem0's telemetry when ANONYMIZED_TELEMETRY=False
-			if os.getenv('ANONYMIZED_TELEMETRY', 'true').lower()[0] in 'fn0':
-				os.environ['MEM0_TELEMETRY'] = 'False'
-			from mem0 import Memory as Mem0Memory
-		except ImportError:
-			raise ImportError('mem0 is required when enable_memory=True. Please install it with `pip install mem0`.')
-
-		if self.config.embedder_provider == 'huggingface':
-			try:
-				# check that required package is installed if huggingface is used
-				from sentence_transformers import SentenceTransformer  # noqa: F401
-			except ImportError:
-				raise ImportError(
-					'sentence_transformers is required when enable_memory=True and embedder_provider="huggingface". Please install it with `pip install sentence-transformers`.'
-				)
-
-		# Initialize Mem0 with the configuration
-		self.mem0 = Mem0Memory.from_config(config_dict=self.config.full_config_dict)
+		if backend is not None:
+			self.backend = backend
+		elif self.config.backend == 'mem0':
+			self.backend = Mem0MemoryBackend(self.config)
+		else:
+			self.backend = SummaryMemoryBackend(
+				llm, max_tokens=self.config.summary_max_tokens, llm_gateway=llm_gateway, priority=priority
+			)
+
+	def should_create_memory(self, current_step: int) -> bool:
+		"""Every memory_interval steps, or earlier once the message history exceeds its token budget"""
+		if current_step % self.config.memory_interval == 0:
+			return True
+		compact_at_tokens = self.config.compact_at_tokens or int(0.75 * self.message_manager.settings.max_input_tokens)
+		return self.message_manager.state.history.current_tokens > compact_at_tokens
 
 	@time_execution_sync('--create_procedural_memory')
 	def create_procedural_memory(self, current_step: int) -> None:
 		"""
-		Create a procedural memory if needed based on the current step.
+		Create a procedural memory if needed based on the current step, blocks until the backend returns.
 
 		Args:
 		    current_step: The current step number of the agent
 		"""
 		logger.info(f'Creating procedural memory at step {current_step}')
+		snapshot = self._snapshot_messages()
+		if snapshot is None:
+			return
+		memory_content = self.backend.create_memory([m.message for m in snapshot.messages_to_process], current_step)
+		self._replace_with_memory(snapshot, memory_content)
 
-		# Get all messages
-		all_messages = self.message_manager.state.history.messages
+	def start_procedural_memory(self, current_step: int) -> None:
+		"""
+		Consolidate the messages so far into a procedural memory in the background, the step does not wait for it.
 
+		The memory is swapped into the message history by apply_procedural_memory() once it is ready.
+		"""
+		if self._pending is not None:
+			logger.debug('Procedural memory is still being created, skipping')
+			return
+		logger.info(f'Creating procedural memory at step {current_step} in the background')
+		snapshot = self._snapshot_messages()
+		if snapshot is None:
+			return
+		messages = [m.message for m in snapshot.messages_to_process]
+		task = asyncio.create_task(self.backend.acreate_memory(messages, current_step))
+		self._pending = (snapshot, task)
+
+	def apply_procedural_memory(self) -> bool:
+		"""Swap a procedural memory created in the background into the message history, call between steps"""
+		if self._pending is None or not self._pending[1].done():
+			return False
+		snapshot, task = self._pending
+		self._pending = None
+		if task.cancelled():
+			return False
+		if task.exception() is not None:
+			logger.error(f'Error creating procedural memory: {task.exception()}')
+			return False
+		return self._replace_with_memory(snapshot, task.result())
+
+	def cancel_procedural_memory(self) -> None:
+		"""Drop a procedural memory that is still being created"""
+		if self._pending is not None:
+			self._pending[1].cancel()
+			self._pending = None
+
+	def _snapshot_messages(self) -> _MessagesSnapshot | None:
 		# Separate messages into those to keep as-is and those to process for memory
-		new_messages = []
-		messages_to_process = []
-
-		for msg in all_messages:
-			if isinstance(msg, ManagedMessage) and msg.metadata.message_type in {'init', 'memory'}:
-				# Keep system and memory messages as they are
-				new_messages.append(msg)
-			else:
-				if len(msg.message.content) > 0:
-					messages_to_process.append(msg)
+		# Keep system messages, and the previous memories unless the backend folds them into the new one
+		keep_types = {'init'} if self.backend.replaces_memory else {'init', 'memory'}
+		all_messages = self.message_manager.state.history.messages
+		messages_to_process = [msg for msg in all_messages if msg.metadata.message_type not in keep_types]
 
 		# Need at least 2 messages to create a meaningful summary
-		if len(messages_to_process) <= 1:
+		if sum(1 for msg in messages_to_process if msg.message.content) <= 1:
 			logger.info('Not enough non-memory messages to summarize')
-			return
-		# Create a procedural memory
-		memory_content = self._create([m.message for m in messages_to_process], current_step)
+			return None
+		return _MessagesSnapshot(messages={id(m) for m in all_messages}, messages_to_process=messages_to_process)
 
+	def _replace_with_memory(self, snapshot: _MessagesSnapshot, memory_content: str | None) -> bool:
 		if not memory_content:
 			logger.warning('Failed to create procedural memory')
-			return
+			return False
 
-		# Replace the processed messages with the consolidated memory
 		memory_message = HumanMessage(content=memory_content)
 		memory_tokens = self.message_manager._count_tokens(memory_message)
 		memory_metadata = MessageMetadata(tokens=memory_tokens, message_type='memory')
 
-		# Calculate the total tokens being removed
-		removed_tokens = sum(m.metadata.tokens for m in messages_to_process)
-
-		# Add the memory message
-		new_messages.append(ManagedMessage(message=memory_message, metadata=memory_metadata))
+		# The memory replaces the processed messages still in the history, it goes after the kept messages and
+		# before the messages added since the snapshot
+		processed = {id(m) for m in snapshot.messages_to_process}
+		kept, added_since, removed_tokens = [], [], 0
+		for msg in self.message_manager.state.history.messages:
+			if id(msg) in processed:
+				removed_tokens += msg.metadata.tokens
+			elif id(msg) in snapshot.messages:
+				kept.append(msg)
+			else:
+				added_since.append(msg)
 
 		# Update the history
-		self.message_manager.state.history.messages = new_messages
-		self.message_manager.state.history.current_tokens -= removed_tokens
-		self.message_manager.state.history.current_tokens += memory_tokens
-		logger.info(f'Messages consolidated: {len(messages_to_process)} messages converted to procedural memory')
-
-	def _create(self, messages: list[BaseMessage], current_step: int) -> str | None:
-		parsed_messages = convert_to_openai_messages(messages)
-		try:
-			results = self.mem0.add(
-				messages=parsed_messages,
-				agent_id=self.config.agent_id,
-				memory_type='procedural_memory',
-				metadata={'step': current_step},
-			)
-			if len(results.get('results', [])):
-				return results.get('results', [])[0].get('memory')
-			return None
-		except Exception as e:
-			logger.error(f'Error creating procedural memory: {e}')
-			return None
+		self.message_manager.state.history.messages = [
+			*kept,
+			ManagedMessage(message=memory_message, metadata=memory_metadata),
+			*added_since,
+		]
+		self.message_manager.state.history.current_tokens += memory_tokens - removed_tokens
+		logger.info(f'Messages consolidated: {len(processed)} messages converted to procedural memory')
+		return True
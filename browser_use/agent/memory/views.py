@@ -15,6 +15,14 @@ class MemoryConfig(BaseModel):
 	agent_id: str = Field(default='browser_use_agent', min_length=1)
 	memory_interval: int = Field(default=10, gt=1, lt=100)
 
+	# 'mem0': procedural memory created by mem0 with the embedder and vector store below (pip install browser-use[memory])
+	# 'summary': rolling summary written by the agent's LLM, no extra packages needed, opt-in as it adds model calls
+	backend: Literal['mem0', 'summary'] = 'mem0'
+	# Summary settings, the memory is also created before the interval once the message history has more tokens than
+	# compact_at_tokens (default: 75% of the agent's max_input_tokens)
+	summary_max_tokens: int = Field(default=800, gt=50)
+	compact_at_tokens: int | None = Field(default=None, gt=0)
+
 	# Embedder settings
 	embedder_provider: Literal['openai', 'gemini', 'ollama', 'huggingface'] = 'huggingface'
 	embedder_model: str = Field(min_length=2, default='all-MiniLM-L6-v2')
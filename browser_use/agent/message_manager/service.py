@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import logging
+from typing import Any
 
 from langchain_core.messages import (
 	AIMessage,
@@ -9,11 +10,14 @@ from langchain_core.messages import (
 	SystemMessage,
 	ToolMessage,
 )
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, PrivateAttr
 
+from browser_use.agent.message_manager.tokenizer import Tokenizer, get_default_tokenizer
+from browser_use.agent.message_manager.utils import SensitiveDataScrubber
 from browser_use.agent.message_manager.views import MessageMetadata
 from browser_use.agent.prompts import AgentMessagePrompt
 from browser_use.agent.views import ActionResult, AgentOutput, AgentStepInfo, MessageManagerState
+from browser_use.agent.vision import estimate_image_tokens, png_size
 from browser_use.browser.views import BrowserState
 from browser_use.utils import time_execution_sync
 
@@ -21,6 +25,8 @@ logger = logging.getLogger(__name__)
 
 
 class MessageManagerSettings(BaseModel):
+	model_config = ConfigDict(arbitrary_types_allowed=True)
+
 	max_input_tokens: int = 128000
 	estimated_characters_per_token: int = 3
 	image_tokens: int = 800
@@ -28,6 +34,34 @@ class MessageManagerSettings(BaseModel):
 	message_context: str | None = None
 	sensitive_data: dict[str, str] | None = None
 	available_file_paths: list[str] | None = None
+	# tiktoken, loaded in the background, with estimated_characters_per_token until it is ready or if it is not available
+	tokenizer: Tokenizer | None = None
+	# keep per-step messages out of the history so the prompt prefix stays identical between steps
+	cache_friendly_prompt: bool = False
+	# collapse runs of interactive elements that did not change since the previous step in the state message
+	compact_unchanged_elements: bool = False
+	# show only the first N of a run of structurally identical sibling elements in the state message
+	fold_repeated_elements: int | None = None
+	# token budget for the element list in the state message, elements nearest to the viewport go first
+	element_token_budget: int | None = None
+	# image token budget for a downscaled screenshot plus crops around new elements, instead of the full screenshot
+	vision_image_tokens: int | None = None
+
+	# compiled from sensitive_data, rebuilt if sensitive_data changes
+	_sensitive_data_scrubber: SensitiveDataScrubber | None = PrivateAttr(default=None)
+
+	def model_post_init(self, __context) -> None:
+		if self.tokenizer is None:
+			self.tokenizer = get_default_tokenizer(self.estimated_characters_per_token)
+		self.get_sensitive_data_scrubber()
+
+	def get_sensitive_data_scrubber(self) -> SensitiveDataScrubber | None:
+		"""Get the compiled scrubber for sensitive_data (None if there is no sensitive data)"""
+		if not self.sensitive_data:
+			return None
+		if self._sensitive_data_scrubber is None or self._sensitive_data_scrubber.sensitive_data != self.sensitive_data:
+			self._sensitive_data_scrubber = SensitiveDataScrubber(self.sensitive_data)
+		return self._sensitive_data_scrubber
 
 
 class MessageManager:
@@ -35,13 +69,15 @@ class MessageManager:
 		self,
 		task: str,
 		system_message: SystemMessage,
-		settings: MessageManagerSettings = MessageManagerSettings(),
-		state: MessageManagerState = MessageManagerState(),
+		settings: MessageManagerSettings | None = None,
+		state: MessageManagerState | None = None,
 	):
 		self.task = task
-		self.settings = settings
-		self.state = state
+		self.settings = settings if settings is not None else MessageManagerSettings()
+		self.state = state if state is not None else MessageManagerState()
 		self.system_prompt = system_message
+		# messages (and their content) sent in the previous prompt, to measure the unchanged prefix
+		self._last_prompt: list[tuple[BaseMessage, Any]] = []
 
 		# Only initialize messages if state is empty
 		if len(self.state.history.messages) == 0:
@@ -151,8 +187,13 @@ class MessageManager:
 			result,
 			include_attributes=self.settings.include_attributes,
 			step_info=step_info,
+			compact_unchanged_elements=self.settings.compact_unchanged_elements,
+			fold_repeated_elements=self.settings.fold_repeated_elements,
+			element_token_budget=self.settings.element_token_budget,
+			count_tokens=self.settings.tokenizer.count if self.settings.tokenizer else None,
+			vision_image_tokens=self.settings.vision_image_tokens,
 		).get_user_message(use_vision)
-		self._add_message_with_tokens(state_message)
+		self._add_message_with_tokens(state_message, message_type='state')
 
 	def add_model_output(self, model_output: AgentOutput) -> None:
 		"""Add model output as AI message"""
@@ -179,6 +220,35 @@ class MessageManager:
 			msg = AIMessage(content=plan)
 			self._add_message_with_tokens(msg, position)
 
+	def add_step_message(self, message: BaseMessage) -> None:
+		"""Add a message that is only relevant for the current step (e.g. page specific actions)"""
+		if not self.settings.cache_friendly_prompt:
+			self._add_message_with_tokens(message)
+			return
+
+		# keep the state message last, step messages are removed together with it after the step
+		messages = self.state.history.messages
+		position = -1 if messages and messages[-1].metadata.message_type == 'state' else None
+		self._add_message_with_tokens(message, position, message_type='step')
+
+	def get_stable_prefix_length(self) -> int:
+		"""Number of messages before the first per-step message, this part of the prompt is reused by the next step"""
+		for i, managed_message in enumerate(self.state.history.messages):
+			if managed_message.metadata.message_type in ('state', 'step'):
+				return i
+		return len(self.state.history.messages)
+
+	def measure_stable_prefix(self) -> int:
+		"""Count the tokens at the start of the prompt that are unchanged since the previous call (cacheable by providers)"""
+		stable_tokens = 0
+		for (message, content), managed_message in zip(self._last_prompt, self.state.history.messages):
+			if managed_message.message is not message or managed_message.message.content is not content:
+				break
+			stable_tokens += managed_message.metadata.tokens
+
+		self._last_prompt = [(m.message, m.message.content) for m in self.state.history.messages]
+		return stable_tokens
+
 	@time_execution_sync('--get_messages')
 	def get_messages(self) -> list[BaseMessage]:
 		"""Get current message list, potentially trimmed to max tokens"""
@@ -213,23 +283,17 @@ class MessageManager:
 	def _filter_sensitive_data(self, message: BaseMessage) -> BaseMessage:
 		"""Filter out sensitive data from the message"""
 
-		def replace_sensitive(value: str) -> str:
-			if not self.settings.sensitive_data:
-				return value
+		scrubber = self.settings.get_sensitive_data_scrubber()
+		if scrubber is None:
+			return message
 
-			# Create a dictionary with all key-value pairs from sensitive_data where value is not None or empty
-			valid_sensitive_data = {k: v for k, v in self.settings.sensitive_data.items() if v}
+		# If there are no valid sensitive data entries, just return the original value
+		if not scrubber.has_valid_entries:
+			logger.warning('No valid entries found in sensitive_data dictionary')
+			return message
 
-			# If there are no valid sensitive data entries, just return the original value
-			if not valid_sensitive_data:
-				logger.warning('No valid entries found in sensitive_data dictionary')
-				return value
-
-			# Replace all valid sensitive data values with their placeholder tags
-			for key, val in valid_sensitive_data.items():
-				value = value.replace(val, f'<secret>{key}</secret>')
-
-			return value
+		# Replace all valid sensitive data values with their placeholder tags, in one pass per text
+		replace_sensitive = scrubber.scrub
 
 		if isinstance(message.content, str):
 			message.content = replace_sensitive(message.content)
@@ -240,26 +304,38 @@ class MessageManager:
 					message.content[i] = item
 		return message
 
+	def count_tokens(self, messages: list[BaseMessage]) -> int:
+		"""Count the tokens of messages that are sent to a model, e.g. a planner prompt that is not in the history"""
+		return sum(self._count_tokens(message) for message in messages)
+
 	def _count_tokens(self, message: BaseMessage) -> int:
 		"""Count tokens in a message using the model's tokenizer"""
 		tokens = 0
 		if isinstance(message.content, list):
 			for item in message.content:
 				if 'image_url' in item:
-					tokens += self.settings.image_tokens
+					tokens += self._count_image_tokens(item)
 				elif isinstance(item, dict) and 'text' in item:
 					tokens += self._count_text_tokens(item['text'])
 		else:
-			msg = message.content
-			if hasattr(message, 'tool_calls'):
-				msg += str(message.tool_calls)  # type: ignore
-			tokens += self._count_text_tokens(msg)
+			tokens += self._count_text_tokens(message.content)
+			tool_calls = getattr(message, 'tool_calls', None)
+			if tool_calls:
+				tokens += self._count_text_tokens(str(tool_calls))
 		return tokens
 
+	def _count_image_tokens(self, item: dict) -> int:
+		"""Images sized to the vision budget are counted by their size, full screenshots as image_tokens"""
+		if self.settings.vision_image_tokens is not None:
+			size = png_size(item['image_url']['url'])
+			if size is not None:
+				return estimate_image_tokens(*size)
+		return self.settings.image_tokens
+
 	def _count_text_tokens(self, text: str) -> int:
 		"""Count tokens in a text string"""
-		tokens = len(text) // self.settings.estimated_characters_per_token  # Rough estimate if no tokenizer available
-		return tokens
+		assert self.settings.tokenizer is not None
+		return self.settings.tokenizer.count(text)
 
 	def cut_messages(self):
 		"""Get current message list, potentially trimmed to max tokens"""
@@ -268,18 +344,20 @@ class MessageManager:
 			return None
 
 		msg = self.state.history.messages[-1]
+		message_type = msg.metadata.message_type
 
 		# if list with image remove image
 		if isinstance(msg.message.content, list):
 			text = ''
-			for item in msg.message.content:
+			for item in list(msg.message.content):
 				if 'image_url' in item:
 					msg.message.content.remove(item)
-					diff -= self.settings.image_tokens
-					msg.metadata.tokens -= self.settings.image_tokens
-					self.state.history.current_tokens -= self.settings.image_tokens
+					image_tokens = self._count_image_tokens(item)
+					diff -= image_tokens
+					msg.metadata.tokens -= image_tokens
+					self.state.history.current_tokens -= image_tokens
 					logger.debug(
-						f'Removed image with {self.settings.image_tokens} tokens - total tokens now: {self.state.history.current_tokens}/{self.settings.max_input_tokens}'
+						f'Removed image with {image_tokens} tokens - total tokens now: {self.state.history.current_tokens}/{self.settings.max_input_tokens}'
 					)
 				elif 'text' in item and isinstance(item, dict):
 					text += item['text']
@@ -301,16 +379,15 @@ class MessageManager:
 			f'Removing {proportion_to_remove * 100:.2f}% of the last message  {proportion_to_remove * msg.metadata.tokens:.2f} / {msg.metadata.tokens:.2f} tokens)'
 		)
 
-		content = msg.message.content
-		characters_to_remove = int(len(content) * proportion_to_remove)
-		content = content[:-characters_to_remove]
+		assert self.settings.tokenizer is not None
+		content = self.settings.tokenizer.truncate(msg.message.content, msg.metadata.tokens - diff)
 
 		# remove tokens and old long message
 		self.state.history.remove_last_state_message()
 
 		# new message with updated content
 		msg = HumanMessage(content=content)
-		self._add_message_with_tokens(msg)
+		self._add_message_with_tokens(msg, message_type=message_type)
 
 		last_msg = self.state.history.messages[-1]
 
@@ -320,7 +397,10 @@ class MessageManager:
 
 	def _remove_last_state_message(self) -> None:
 		"""Remove last state message from history"""
-		self.state.history.remove_last_state_message()
+		if self.settings.cache_friendly_prompt:
+			self.state.history.remove_step_messages()
+		else:
+			self.state.history.remove_last_state_message()
 
 	def add_tool_message(self, content: str, message_type: str | None = None) -> None:
 		"""Add tool message to history"""
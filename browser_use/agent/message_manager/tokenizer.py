@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import cache
+
+logger = logging.getLogger(__name__)
+
+
+class Tokenizer(ABC):
+	"""
+	Counts tokens for the message manager.
+
+	Subclasses implement _count (and optionally truncate). Counts are cached by content hash, so re-counting the same
+	text (e.g. an unchanged message that is re-added or re-measured when cutting) is a dict lookup.
+	"""
+
+	name: str = 'tokenizer'
+	max_cache_entries: int = 2048
+
+	def __init__(self) -> None:
+		self._cache: OrderedDict[tuple[int, int], int] = OrderedDict()
+
+	@abstractmethod
+	def _count(self, text: str) -> int:
+		"""Count the tokens in a text, without caching"""
+
+	def count(self, text: str) -> int:
+		"""Count the tokens in a text"""
+		if not text:
+			return 0
+
+		# str hashes are computed once per string object and cached by python, so this key is cheap even for large texts
+		key = (hash(text), len(text))
+		tokens = self._cache.get(key)
+		if tokens is not None:
+			self._cache.move_to_end(key)
+			return tokens
+
+		tokens = self._count(text)
+		self._cache[key] = tokens
+		if len(self._cache) > self.max_cache_entries:
+			self._cache.popitem(last=False)
+		return tokens
+
+	def truncate(self, text: str, max_tokens: int) -> str:
+		"""Cut the end of a text so that it has at most max_tokens tokens"""
+		tokens = self.count(text)
+		if tokens <= max_tokens:
+			return text
+		return text[: int(len(text) * max_tokens / tokens)]
+
+
+class CharacterEstimateTokenizer(Tokenizer):
+	"""Rough estimate based on the average number of characters per token, used if no real tokenizer is available"""
+
+	name = 'character_estimate'
+
+	def __init__(self, characters_per_token: int = 3) -> None:
+		super().__init__()
+		self.characters_per_token = characters_per_token
+
+	def _count(self, text: str) -> int:
+		return len(text) // self.characters_per_token
+
+
+class TiktokenTokenizer(Tokenizer):
+	"""Local BPE tokenizer using tiktoken. Exact for OpenAI models and a close estimate for other providers."""
+
+	name = 'tiktoken'
+
+	def __init__(self, encoding_name: str = 'o200k_base') -> None:
+		super().__init__()
+		self.encoding_name = encoding_name
+		self._encoding = _load_tiktoken_encoding(encoding_name)
+
+	def _count(self, text: str) -> int:
+		return len(self._encoding.encode(text, disallowed_special=()))
+
+	def truncate(self, text: str, max_tokens: int) -> str:
+		tokens = self._encoding.encode(text, disallowed_special=())
+		if len(tokens) <= max_tokens:
+			return text
+		return self._encoding.decode(tokens[:max_tokens])
+
+
+@cache
+def _load_tiktoken_encoding(encoding_name: str):
+	# loading an encoding can download its BPE ranks on first use, only do it once per process
+	import tiktoken
+
+	return tiktoken.get_encoding(encoding_name)
+
+
+@cache
+def _load_tiktoken_encoding_in_background(encoding_name: str) -> Future:
+	"""Load the encoding on a daemon thread, a download that hangs does not block the event loop or the exit"""
+	future: Future = Future()
+
+	def load() -> None:
+		try:
+			future.set_result(_load_tiktoken_encoding(encoding_name))
+		except Exception as e:
+			logger.debug(f'tiktoken encoding {encoding_name} not available, falling back to character based token estimate: {e}')
+			future.set_exception(e)
+
+	threading.Thread(target=load, name='tiktoken-loader', daemon=True).start()
+	return future
+
+
+class DefaultTokenizer(Tokenizer):
+	"""
+	tiktoken once its encoding is loaded, the character estimate until then or if it cannot be loaded.
+
+	The encoding is loaded on a background thread on first use (it is downloaded if it is not cached yet), so creating
+	the settings or counting a message never waits for the network.
+	"""
+
+	name = 'default'
+
+	def __init__(self, characters_per_token: int = 3, encoding_name: str = 'o200k_base') -> None:
+		super().__init__()
+		self.encoding_name = encoding_name
+		self._estimate = CharacterEstimateTokenizer(characters_per_token)
+		self._tiktoken: TiktokenTokenizer | None = None
+		self._encoding: Future | None = None
+
+	def _active(self) -> Tokenizer:
+		"""The tokenizer used right now, switches to tiktoken once the encoding is loaded"""
+		if self._tiktoken is None:
+			if self._encoding is None:
+				self._encoding = _load_tiktoken_encoding_in_background(self.encoding_name)
+			if self._encoding.done() and self._encoding.exception() is None:
+				self._tiktoken = TiktokenTokenizer(self.encoding_name)
+				self._cache.clear()  # drop the estimated counts
+		return self._tiktoken or self._estimate
+
+	def count(self, text: str) -> int:
+		self._active()  # switch before looking up the cached counts
+		return super().count(text)
+
+	def _count(self, text: str) -> int:
+		return self._active()._count(text)
+
+	def truncate(self, text: str, max_tokens: int) -> str:
+		return self._active().truncate(text, max_tokens)
+
+
+def get_default_tokenizer(characters_per_token: int = 3, encoding_name: str = 'o200k_base') -> Tokenizer:
+	"""tiktoken, loaded in the background, with the character estimate as fallback until it is ready"""
+	return DefaultTokenizer(characters_per_token, encoding_name)
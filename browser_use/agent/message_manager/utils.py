@@ -4,6 +4,7 @@ import json
 import logging
 import os
 import re
+from collections.abc import Iterable
 from typing import Any
 
 from langchain_core.messages import (
@@ -22,11 +23,117 @@ MODELS_WITHOUT_TOOL_SUPPORT_PATTERNS = [
 	'.*gemma.*-it',
 ]
 
+# chat model classes that accept explicit prompt cache breakpoints (cache_control on content blocks)
+CHAT_MODELS_WITH_CACHE_BREAKPOINTS = {'ChatAnthropic', 'ChatAnthropicVertex'}
+
+
+class SensitiveDataScrubber:
+	"""
+	Replaces every sensitive value in a text with its <secret>placeholder</secret> tag in a single pass.
+
+	All values are compiled once into one regex shaped like a trie (shared prefixes are only matched once), so the
+	replacement is a single scan and an inserted placeholder tag can never be matched again by another value.
+	Overlapping values resolve to the longest match.
+
+	In CPython a substring search per value is still faster than a regex scan for small secret sets, so below
+	REGEX_SCAN_THRESHOLD values texts are first checked with `in` and only scanned by the regex if a value occurs.
+	"""
+
+	REGEX_SCAN_THRESHOLD = 400
+
+	def __init__(self, sensitive_data: dict[str, str]):
+		self.sensitive_data = dict(sensitive_data)
+
+		# Only entries with a non-empty value can be scrubbed, the first key wins for duplicate values
+		self._value_to_key: dict[str, str] = {}
+		for key, value in self.sensitive_data.items():
+			if value:
+				self._value_to_key.setdefault(value, key)
+
+		self._pattern = re.compile(self._trie_regex(self._value_to_key)) if self._value_to_key else None
+
+	@property
+	def has_valid_entries(self) -> bool:
+		return self._pattern is not None
+
+	def scrub(self, text: str) -> str:
+		"""Replace all sensitive values in the text with their placeholder tags"""
+		if self._pattern is None:
+			return text
+		if len(self._value_to_key) < self.REGEX_SCAN_THRESHOLD and not any(value in text for value in self._value_to_key):
+			return text
+		return self._pattern.sub(lambda match: f'<secret>{self._value_to_key[match.group(0)]}</secret>', text)
+
+	@staticmethod
+	def _trie_regex(values: Iterable[str]) -> str:
+		"""Build a regex matching any of the values, structured as a character trie"""
+		trie: dict = {}
+		for value in values:
+			node = trie
+			for char in value:
+				node = node.setdefault(char, {})
+			node[''] = True  # end of a value
+
+		def to_regex(node: dict) -> str:
+			# follow chains of single children iteratively, long secrets would otherwise hit the recursion limit
+			prefix = ''
+			while len(node) == 1 and '' not in node:
+				char, node = next(iter(node.items()))
+				prefix += re.escape(char)
+
+			branches = [re.escape(char) + to_regex(child) for char, child in node.items() if char != '']
+			if not branches:
+				return prefix
+			regex = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+			if '' in node:
+				# greedy optional group: prefer the longer value when one value is a prefix of another
+				regex = f'(?:{regex})?'
+			return prefix + regex
+
+		return to_regex(trie)
+
 
 def is_model_without_tool_support(model_name: str) -> bool:
 	return any(re.match(pattern, model_name) for pattern in MODELS_WITHOUT_TOOL_SUPPORT_PATTERNS)
 
 
+def supports_cache_breakpoints(chat_model_library: str) -> bool:
+	return chat_model_library in CHAT_MODELS_WITH_CACHE_BREAKPOINTS
+
+
+def add_cache_breakpoints(messages: list[BaseMessage], indices: Iterable[int]) -> list[BaseMessage]:
+	"""
+	Mark the prompt prefix ending at each index as cacheable, for models that support explicit cache breakpoints.
+
+	Messages without text (e.g. empty tool messages) cannot carry a breakpoint, the closest earlier message with text
+	is marked instead. The input messages are not modified, marked messages are copies.
+	"""
+	output_messages = list(messages)
+	marked: set[int] = set()
+	for index in sorted(set(indices)):
+		for i in range(index, -1, -1):
+			if i in marked:
+				break
+			content = _with_cache_control(output_messages[i].content)
+			if content is not None:
+				output_messages[i] = output_messages[i].model_copy(update={'content': content})
+				marked.add(i)
+				break
+	return output_messages
+
+
+def _with_cache_control(content: str | list[str | dict]) -> list[str | dict] | None:
+	"""Content as blocks with a cache breakpoint on the last text block, None if there is no text to mark"""
+	if isinstance(content, str):
+		return [{'type': 'text', 'text': content, 'cache_control': {'type': 'ephemeral'}}] if content else None
+
+	for i in range(len(content) - 1, -1, -1):
+		block = content[i]
+		if isinstance(block, dict) and block.get('type') == 'text' and block.get('text'):
+			return [*content[:i], {**block, 'cache_control': {'type': 'ephemeral'}}, *content[i + 1 :]]
+	return None
+
+
 def extract_json_from_model_output(content: str) -> dict:
 	"""Extract JSON from model output, handling both plain JSON and code-block-wrapped JSON."""
 	try:
@@ -51,6 +158,101 @@ def extract_json_from_model_output(content: str) -> dict:
 		raise ValueError('Could not parse response.')
 
 
+class StreamingActionParser:
+	"""
+	Incremental scanner for streamed agent output JSON.
+
+	Feed it the streamed text chunk by chunk, it returns every element of the top level "action" list as soon as the
+	element is complete, long before the rest of the output has arrived. Text before the JSON object (code fences,
+	<think> blocks) is skipped. The full output should still be parsed and validated once the stream is finished.
+	"""
+
+	def __init__(self):
+		self._buffer = ''
+		self._position = 0
+		self._started = False
+		self._depth = 0
+		self._in_string = False
+		self._escaped = False
+		self._string_start = 0
+		self._expect_key = False
+		self._key: str | None = None
+		self._action_depth: int | None = None
+		self._element_start: int | None = None
+
+	def feed(self, chunk: str) -> list[dict]:
+		"""Add streamed text and return the actions completed by it"""
+		self._buffer += chunk
+		if not self._started and not self._find_start():
+			return []
+
+		actions = []
+		buffer = self._buffer
+		for position in range(self._position, len(buffer)):
+			char = buffer[position]
+			if self._in_string:
+				if self._escaped:
+					self._escaped = False
+				elif char == '\\':
+					self._escaped = True
+				elif char == '"':
+					self._in_string = False
+					if self._depth == 1 and self._expect_key:
+						self._key = json.loads(buffer[self._string_start : position + 1])
+			elif char == '"':
+				self._in_string = True
+				self._string_start = position
+			elif char in '{[':
+				self._depth += 1
+				if self._depth == 1:
+					self._expect_key = True
+				elif char == '[' and self._depth == 2 and self._key == 'action':
+					self._action_depth = 2
+				elif char == '{' and self._action_depth is not None and self._depth == self._action_depth + 1:
+					self._element_start = position
+			elif char in '}]':
+				if char == '}' and self._element_start is not None and self._depth == self._action_depth + 1:  # type: ignore
+					try:
+						actions.append(json.loads(buffer[self._element_start : position + 1]))
+					except json.JSONDecodeError as e:
+						logger.debug(f'Could not parse streamed action: {e}')
+					self._element_start = None
+				elif char == ']' and self._depth == self._action_depth:
+					self._action_depth = None
+				self._depth -= 1
+			elif self._depth == 1:
+				if char == ',':
+					self._expect_key = True
+				elif char == ':':
+					self._expect_key = False
+		self._position = len(buffer)
+		return actions
+
+	def _find_start(self) -> bool:
+		"""Skip to the opening brace of the JSON object, returns False if it has not been streamed yet"""
+		start = 0
+		if '<think>' in self._buffer:
+			end_of_thinking = self._buffer.rfind('</think>')
+			if end_of_thinking == -1:
+				return False
+			start = end_of_thinking + len('</think>')
+		brace = self._buffer.find('{', start)
+		if brace == -1:
+			return False
+		self._started = True
+		self._position = brace
+		return True
+
+
+def get_text_content(content: str | list[str | dict]) -> str:
+	"""Text of a message content, joining the text blocks if the content is a list"""
+	if isinstance(content, str):
+		return content
+	return ''.join(
+		block if isinstance(block, str) else block.get('text', '') for block in content if isinstance(block, (str, dict))
+	)
+
+
 def convert_input_messages(input_messages: list[BaseMessage], model_name: str | None) -> list[BaseMessage]:
 	"""Convert input messages to a format that is compatible with the planner model"""
 	if model_name is None:
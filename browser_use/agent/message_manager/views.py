@@ -125,6 +125,16 @@ class MessageHistory(BaseModel):
 			self.current_tokens -= self.messages[-1].metadata.tokens
 			self.messages.pop()
 
+	def remove_step_messages(self) -> None:
+		"""Remove the state message and all other messages that were only added for the current step"""
+		kept_messages = []
+		for managed_message in self.messages:
+			if managed_message.metadata.message_type in ('state', 'step'):
+				self.current_tokens -= managed_message.metadata.tokens
+			else:
+				kept_messages.append(managed_message)
+		self.messages = kept_messages
+
 
 class MessageManagerState(BaseModel):
 	"""Holds the state for MessageManager"""
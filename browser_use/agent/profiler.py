@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import pstats
+import sys
+import threading
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from types import FrameType
+from typing import Literal
+
+ProfilerMode = Literal['cprofile', 'sampling']
+
+# Frames where the event loop waits for I/O (browser, LLM), they are not Python work
+IDLE_FRAMES = ('selectors:', 'select:')
+
+
+class StepProfiler:
+	"""
+	Profiles the Python side of each agent step.
+
+	cprofile: deterministic, writes <prefix>_step_<n>.pstats per step (open with pstats or snakeviz), exact call counts
+	but slows the step down.
+	sampling: samples the stack of the event loop thread every `interval` seconds, writes <prefix>_step_<n>.collapsed
+	per step (flamegraph.pl / speedscope format). Low overhead, and the time the loop waits for the browser or the model
+	shows up as select() samples.
+
+	Both profile the whole thread, so other agents running on the same event loop are included.
+	"""
+
+	def __init__(self, mode: ProfilerMode, path_prefix: str, interval: float = 0.005):
+		self.mode = mode
+		self.path_prefix = path_prefix
+		self.interval = interval
+		self._run_stats: pstats.Stats | None = None
+		self._run_samples: Counter[str] = Counter()
+
+	@contextmanager
+	def profile_step(self, step_number: int) -> Iterator[None]:
+		Path(self.path_prefix).parent.mkdir(parents=True, exist_ok=True)
+		if self.mode == 'cprofile':
+			profile = cProfile.Profile()
+			profile.enable()
+			try:
+				yield
+			finally:
+				profile.disable()
+				self._save_profile(profile, step_number)
+		else:
+			sampler = _StackSampler(threading.get_ident(), self.interval)
+			sampler.start()
+			try:
+				yield
+			finally:
+				sampler.stop()
+				self._save_samples(sampler.samples, step_number)
+
+	def _save_profile(self, profile: cProfile.Profile, step_number: int) -> None:
+		profile.dump_stats(f'{self.path_prefix}_step_{step_number}.pstats')
+		if self._run_stats is None:
+			self._run_stats = pstats.Stats(profile)
+		else:
+			self._run_stats.add(profile)
+
+	def _save_samples(self, samples: Counter[str], step_number: int) -> None:
+		lines = [f'{stack} {count}' for stack, count in samples.most_common()]
+		Path(f'{self.path_prefix}_step_{step_number}.collapsed').write_text('\n'.join(lines) + '\n', encoding='utf-8')
+		self._run_samples.update(samples)
+
+	def summary(self, top: int = 30) -> str:
+		"""Functions with the most time across all profiled steps"""
+		if self.mode == 'cprofile':
+			if self._run_stats is None:
+				return ''
+			stream = io.StringIO()
+			self._run_stats.stream = stream  # type: ignore[attr-defined]
+			self._run_stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+			return stream.getvalue()
+
+		total = sum(self._run_samples.values())
+		if not total:
+			return ''
+		own: Counter[str] = Counter()
+		inclusive: Counter[str] = Counter()
+		for stack, count in self._run_samples.items():
+			frames = stack.split(';')
+			own[frames[-1]] += count
+			for frame in set(frames):
+				inclusive[frame] += count
+		idle = sum(count for frame, count in own.items() if frame.startswith(IDLE_FRAMES))
+
+		lines = [
+			f'{total} samples every {self.interval * 1000:.0f}ms, {idle / total:.0%} waiting for I/O (browser, LLM)',
+			'',
+			f'{"own %":>7} {"total %":>8}  function',
+		]
+		for frame, count in own.most_common(top):
+			lines.append(f'{count / total:>7.1%} {inclusive[frame] / total:>8.1%}  {frame}')
+		return '\n'.join(lines) + '\n'
+
+	def write_summary(self, top: int = 30) -> Path | None:
+		summary = self.summary(top)
+		if not summary:
+			return None
+		path = Path(f'{self.path_prefix}_summary.txt')
+		path.write_text(summary, encoding='utf-8')
+		return path
+
+
+class _StackSampler:
+	"""Background thread that counts the collapsed stacks of another thread"""
+
+	def __init__(self, thread_id: int, interval: float):
+		self.thread_id = thread_id
+		self.interval = interval
+		self.samples: Counter[str] = Counter()
+		self._stopped = threading.Event()
+		self._thread = threading.Thread(target=self._run, name='step-profiler', daemon=True)
+
+	def start(self) -> None:
+		self._thread.start()
+
+	def stop(self) -> None:
+		self._stopped.set()
+		self._thread.join()
+
+	def _run(self) -> None:
+		while not self._stopped.wait(self.interval):
+			frame = sys._current_frames().get(self.thread_id)
+			if frame is not None:
+				self.samples[_collapse(frame)] += 1
+
+
+def _collapse(frame: FrameType | None) -> str:
+	frames = []
+	while frame is not None:
+		frames.append(f'{frame.f_globals.get("__name__", "?")}:{frame.f_code.co_qualname}')
+		frame = frame.f_back
+	return ';'.join(reversed(frames))
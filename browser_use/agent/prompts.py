@@ -1,9 +1,12 @@
 import importlib.resources
+from collections.abc import Callable
 from datetime import datetime
 from typing import TYPE_CHECKING, Optional
 
 from langchain_core.messages import HumanMessage, SystemMessage
 
+from browser_use.agent.vision import screenshot_images
+
 if TYPE_CHECKING:
 	from browser_use.agent.views import ActionResult, AgentStepInfo
 	from browser_use.browser.views import BrowserState
@@ -66,14 +69,30 @@ class AgentMessagePrompt:
 		result: list['ActionResult'] | None = None,
 		include_attributes: list[str] | None = None,
 		step_info: Optional['AgentStepInfo'] = None,
+		compact_unchanged_elements: bool = False,
+		fold_repeated_elements: int | None = None,
+		element_token_budget: int | None = None,
+		count_tokens: Callable[[str], int] | None = None,
+		vision_image_tokens: int | None = None,
 	):
 		self.state = state
 		self.result = result
 		self.include_attributes = include_attributes or []
 		self.step_info = step_info
+		self.compact_unchanged_elements = compact_unchanged_elements
+		self.fold_repeated_elements = fold_repeated_elements
+		self.element_token_budget = element_token_budget
+		self.count_tokens = count_tokens
+		self.vision_image_tokens = vision_image_tokens
 
 	def get_user_message(self, use_vision: bool = True) -> HumanMessage:
-		elements_text = self.state.element_tree.clickable_elements_to_string(include_attributes=self.include_attributes)
+		elements_text = self.state.element_tree.clickable_elements_to_string(
+			include_attributes=self.include_attributes,
+			compact_unchanged=self.compact_unchanged_elements,
+			fold_repeated_after=self.fold_repeated_elements,
+			token_budget=self.element_token_budget,
+			count_tokens=self.count_tokens,
+		)
 
 		has_content_above = (self.state.pixels_above or 0) > 0
 		has_content_below = (self.state.pixels_below or 0) > 0
@@ -94,6 +113,11 @@ class AgentMessagePrompt:
 		else:
 			elements_text = 'empty page'
 
+		if self.element_token_budget is not None:
+			elements_scope = 'nearest to the viewport, above and below it, within a token budget'
+		else:
+			elements_scope = 'inside the viewport'
+
 		if self.step_info:
 			step_info_description = f'Current step: {self.step_info.step_number + 1}/{self.step_info.max_steps}'
 		else:
@@ -108,7 +132,7 @@ The following is one-time information - if you need to remember it write it to m
 Current url: {self.state.url}
 Available tabs:
 {self.state.tabs}
-Interactive elements from top layer of the current page inside the viewport:
+Interactive elements from top layer of the current page {elements_scope}:
 {elements_text}
 {step_info_description}
 """
@@ -122,6 +146,14 @@ Interactive elements from top layer of the current page inside the viewport:
 					error = result.error.split('\n')[-1]
 					state_description += f'\nAction error {i + 1}/{len(self.result)}: ...{error}'
 
+		if self.state.screenshot and use_vision is True and self.vision_image_tokens is not None:
+			# Overview and crops of the new elements instead of the full screenshot
+			content: list[str | dict] = [{'type': 'text', 'text': state_description}]
+			for image in screenshot_images(self.state.screenshot, self.state.element_tree, self.vision_image_tokens):
+				content.append({'type': 'text', 'text': image.label})
+				content.append({'type': 'image_url', 'image_url': {'url': f'data:image/png;base64,{image.data}'}})
+			return HumanMessage(content=content)
+
 		if self.state.screenshot and use_vision is True:
 			# Format message for vision model
 			return HumanMessage(
@@ -0,0 +1,3 @@
+from browser_use.agent.screenshot_store.service import DiskScreenshotStore, InMemoryScreenshotStore, ScreenshotStore
+
+__all__ = ['DiskScreenshotStore', 'InMemoryScreenshotStore', 'ScreenshotStore']
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import io
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Literal
+
+from browser_use.browser.views import BrowserStateHistory
+
+
+class ScreenshotStore(ABC):
+	"""Where the screenshots of the agent history are kept, read them back with BrowserStateHistory.get_screenshot()"""
+
+	@abstractmethod
+	def save(self, screenshot: str, state: BrowserStateHistory) -> None:
+		"""Keep the base64 screenshot of a step and reference it from its history state"""
+
+
+class InMemoryScreenshotStore(ScreenshotStore):
+	"""Keeps the screenshots inline in the history, identical screenshots share one string"""
+
+	def __init__(self):
+		self._screenshots: dict[str, str] = {}
+
+	def save(self, screenshot: str, state: BrowserStateHistory) -> None:
+		digest = hashlib.sha256(screenshot.encode()).hexdigest()
+		state.screenshot = self._screenshots.setdefault(digest, screenshot)
+
+
+class DiskScreenshotStore(ScreenshotStore):
+	"""
+	Writes the screenshots to content-addressed files, the history only keeps their path.
+
+	Identical screenshots are written once. Files are stored as PNG (raw bytes, a quarter smaller than base64),
+	or re-encoded as lossy WebP with `format='webp'` (needs Pillow), which is several times smaller again.
+	"""
+
+	def __init__(self, directory: str | Path, format: Literal['png', 'webp'] = 'png', quality: int = 80):
+		self.directory = Path(directory).resolve()
+		self.format = format
+		self.quality = quality
+
+	def save(self, screenshot: str, state: BrowserStateHistory) -> None:
+		data = base64.b64decode(screenshot)
+		digest = hashlib.sha256(data).hexdigest()
+		path = self.directory / digest[:2] / f'{digest}.{self.format}'
+		if not path.exists():
+			self._write(path, self._encode(data))
+		state.screenshot = None
+		state.screenshot_path = str(path)
+
+	@staticmethod
+	def _write(path: Path, data: bytes) -> None:
+		"""Write the file atomically, agents sharing the directory can write the same screenshot at the same time"""
+		path.parent.mkdir(parents=True, exist_ok=True)
+		with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f'{path.stem}.', suffix='.tmp', delete=False) as f:
+			f.write(data)
+		try:
+			os.replace(f.name, path)
+		except OSError:
+			# e.g. on Windows while another agent replaces the same file, its content is the same
+			os.unlink(f.name)
+			if not path.exists():
+				raise
+
+	def _encode(self, data: bytes) -> bytes:
+		if self.format == 'png':
+			return data
+
+		from PIL import Image
+
+		output = io.BytesIO()
+		Image.open(io.BytesIO(data)).save(output, format='WEBP', quality=self.quality)
+		return output.getvalue()
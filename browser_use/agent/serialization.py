@@ -0,0 +1,202 @@
+"""
+Compact, versioned serialization of the message manager state and the agent history, for saving and checkpointing
+long runs.
+
+Every object is encoded with an explicit schema, messages as their type and set fields instead of going through
+langchain's dumpd/load, and written with orjson as {'v': SERIALIZATION_VERSION, 'kind': ..., 'data': ...}. Objects
+decode to objects equal to the ones that were encoded.
+"""
+
+from __future__ import annotations
+
+import warnings
+from typing import TYPE_CHECKING, Any
+
+import orjson
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.load import dumpd, load
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from pydantic import BaseModel
+
+from browser_use.agent.message_manager.views import ManagedMessage, MessageHistory, MessageManagerState, MessageMetadata
+from browser_use.browser.views import BrowserStateHistory, TabInfo
+from browser_use.dom.history_tree_processor.view import CoordinateSet, DOMHistoryElement, ViewportInfo
+
+if TYPE_CHECKING:
+	from browser_use.agent.views import AgentHistory, AgentHistoryList, AgentOutput
+
+# Bump when the encoding of an object changes, data of other versions is rejected by loads()
+SERIALIZATION_VERSION = 1
+
+_MESSAGE_TYPES: dict[str, type[BaseMessage]] = {
+	'human': HumanMessage,
+	'ai': AIMessage,
+	'system': SystemMessage,
+	'tool': ToolMessage,
+}
+
+
+def dumps(obj: MessageManagerState | AgentHistoryList | AgentHistory | BrowserStateHistory) -> bytes:
+	"""Serialize the object to compact JSON bytes"""
+	from browser_use.agent.views import AgentHistory, AgentHistoryList
+
+	if isinstance(obj, MessageManagerState):
+		kind, data = 'message_manager_state', encode_message_manager_state(obj)
+	elif isinstance(obj, AgentHistoryList):
+		kind, data = 'agent_history_list', encode_agent_history_list(obj)
+	elif isinstance(obj, AgentHistory):
+		kind, data = 'agent_history', encode_agent_history(obj)
+	elif isinstance(obj, BrowserStateHistory):
+		kind, data = 'browser_state_history', encode_browser_state_history(obj)
+	else:
+		raise TypeError(f'Cannot serialize {type(obj).__name__}')
+	return orjson.dumps({'v': SERIALIZATION_VERSION, 'kind': kind, 'data': data}, default=json_default)
+
+
+def loads(
+	data: bytes | str, output_model: type[AgentOutput] | None = None
+) -> MessageManagerState | AgentHistoryList | AgentHistory | BrowserStateHistory:
+	"""
+	Deserialize data written by dumps().
+
+	Args:
+	    output_model: the agent's AgentOutput model with its custom actions, needed for agent history
+	"""
+	envelope = orjson.loads(data)
+	if envelope.get('v') != SERIALIZATION_VERSION:
+		raise ValueError(f'Unsupported serialization version {envelope.get("v")}, expected {SERIALIZATION_VERSION}')
+
+	kind = envelope['kind']
+	if kind == 'message_manager_state':
+		return decode_message_manager_state(envelope['data'])
+	if kind == 'browser_state_history':
+		return decode_browser_state_history(envelope['data'])
+	if kind not in ('agent_history', 'agent_history_list'):
+		raise ValueError(f'Unknown kind of serialized object: {kind}')
+	if output_model is None:
+		raise ValueError(f'output_model is required to load {kind}')
+	if kind == 'agent_history':
+		return decode_agent_history(envelope['data'], output_model)
+	return decode_agent_history_list(envelope['data'], output_model)
+
+
+def json_default(obj: Any) -> Any:
+	"""orjson default for values it cannot encode itself, e.g. parsed structured output in additional_kwargs"""
+	if isinstance(obj, BaseModel):
+		return obj.model_dump(mode='json')
+	raise TypeError(f'Type is not JSON serializable: {type(obj).__name__}')
+
+
+def _set_fields(model: BaseModel) -> dict[str, Any]:
+	"""The fields that were set on the model, unset fields decode to their defaults"""
+	return {field: getattr(model, field) for field in model.model_fields_set}
+
+
+# --- Messages ---
+
+
+def encode_message(message: BaseMessage) -> dict[str, Any]:
+	"""The message type and the fields that were set on the message"""
+	if type(message) is not _MESSAGE_TYPES.get(message.type):
+		# chunks and custom message classes
+		return {'type': 'lc', 'lc': dumpd(message)}
+	return {'type': message.type, **_set_fields(message)}
+
+
+def decode_message(data: dict[str, Any]) -> BaseMessage:
+	fields = dict(data)
+	message_type = fields.pop('type')
+	if message_type == 'lc':
+		with warnings.catch_warnings():
+			warnings.simplefilter('ignore', LangChainBetaWarning)
+			return load(fields['lc'])
+	return _MESSAGE_TYPES[message_type](**fields)
+
+
+def encode_message_manager_state(state: MessageManagerState) -> dict[str, Any]:
+	return {
+		'tool_id': state.tool_id,
+		'current_tokens': state.history.current_tokens,
+		# [message, tokens, message_type]
+		'messages': [[encode_message(m.message), m.metadata.tokens, m.metadata.message_type] for m in state.history.messages],
+	}
+
+
+def decode_message_manager_state(data: dict[str, Any]) -> MessageManagerState:
+	# the messages are already valid, construct skips ManagedMessage's langchain load()
+	messages = [
+		ManagedMessage.model_construct(
+			message=decode_message(message), metadata=MessageMetadata(tokens=tokens, message_type=message_type)
+		)
+		for message, tokens, message_type in data['messages']
+	]
+	return MessageManagerState(
+		history=MessageHistory(messages=messages, current_tokens=data['current_tokens']),
+		tool_id=data['tool_id'],
+	)
+
+
+# --- History ---
+
+
+def encode_browser_state_history(state: BrowserStateHistory) -> dict[str, Any]:
+	return state.to_dict()
+
+
+def decode_browser_state_history(data: dict[str, Any]) -> BrowserStateHistory:
+	return BrowserStateHistory(
+		url=data['url'],
+		title=data['title'],
+		tabs=[TabInfo(**tab) for tab in data['tabs']],
+		interacted_element=[_decode_dom_history_element(element) if element else None for element in data['interacted_element']],
+		screenshot=data.get('screenshot'),
+		screenshot_path=data.get('screenshot_path'),
+	)
+
+
+def _decode_dom_history_element(data: dict[str, Any]) -> DOMHistoryElement:
+	fields = dict(data)
+	for key in ('page_coordinates', 'viewport_coordinates'):
+		if fields.get(key) is not None:
+			fields[key] = CoordinateSet.model_validate(fields[key])
+	if fields.get('viewport_info') is not None:
+		fields['viewport_info'] = ViewportInfo.model_validate(fields['viewport_info'])
+	return DOMHistoryElement(**fields)
+
+
+def encode_agent_history(history_item: AgentHistory) -> dict[str, Any]:
+	model_output = history_item.model_output
+	return {
+		'model_output': {
+			'current_state': _set_fields(model_output.current_state),
+			# only the chosen action of each action model is set
+			'action': [action.model_dump(exclude_unset=True) for action in model_output.action],
+		}
+		if model_output
+		else None,
+		'result': [_set_fields(result) for result in history_item.result],
+		'state': encode_browser_state_history(history_item.state),
+		# nested spans and the hedge decision are encoded by json_default
+		'metadata': _set_fields(history_item.metadata) if history_item.metadata else None,
+	}
+
+
+def decode_agent_history(data: dict[str, Any], output_model: type[AgentOutput]) -> AgentHistory:
+	from browser_use.agent.views import ActionResult, AgentHistory, StepMetadata
+
+	return AgentHistory(
+		model_output=output_model.model_validate(data['model_output']) if data['model_output'] else None,
+		result=[ActionResult(**result) for result in data['result']],
+		state=decode_browser_state_history(data['state']),
+		metadata=StepMetadata.model_validate(data['metadata']) if data['metadata'] else None,
+	)
+
+
+def encode_agent_history_list(history: AgentHistoryList) -> dict[str, Any]:
+	return {'history': [encode_agent_history(h) for h in history.history]}
+
+
+def decode_agent_history_list(data: dict[str, Any], output_model: type[AgentOutput]) -> AgentHistoryList:
+	from browser_use.agent.views import AgentHistoryList
+
+	return AgentHistoryList(history=[decode_agent_history(h, output_model) for h in data['history']])
@@ -7,7 +7,9 @@ import os
 import re
 import sys
 import time
-from collections.abc import Awaitable, Callable
+from collections import deque
+from collections.abc import AsyncIterable, AsyncIterator, Awaitable, Callable
+from contextlib import AbstractAsyncContextManager, nullcontext
 from pathlib import Path
 from typing import Any, Generic, TypeVar
 
@@ -18,24 +20,37 @@ from langchain_core.messages import (
 	HumanMessage,
 	SystemMessage,
 )
+from langchain_core.runnables import Runnable
 
 # from lmnr.sdk.decorators import observe
 from pydantic import BaseModel, ValidationError
 
+from browser_use.agent.gateway.service import LLMGateway
 from browser_use.agent.gif import create_history_gif
+from browser_use.agent.llm_cache.service import LLMResponseCache
 from browser_use.agent.memory.service import Memory
 from browser_use.agent.memory.views import MemoryConfig
 from browser_use.agent.message_manager.service import MessageManager, MessageManagerSettings
+from browser_use.agent.message_manager.tokenizer import Tokenizer
 from browser_use.agent.message_manager.utils import (
+	StreamingActionParser,
+	add_cache_breakpoints,
 	convert_input_messages,
 	extract_json_from_model_output,
+	get_text_content,
 	is_model_without_tool_support,
 	save_conversation,
+	supports_cache_breakpoints,
 )
+from browser_use.agent.profiler import ProfilerMode, StepProfiler
 from browser_use.agent.prompts import AgentMessagePrompt, PlannerPrompt, SystemPrompt
+from browser_use.agent.screenshot_store.service import InMemoryScreenshotStore, ScreenshotStore
+from browser_use.agent.step_log.service import StepLog
+from browser_use.agent.trajectory_cache.service import TrajectoryCache
 from browser_use.agent.views import (
 	REQUIRED_LLM_API_ENV_VARS,
 	ActionResult,
+	AgentBrain,
 	AgentError,
 	AgentHistory,
 	AgentHistoryList,
@@ -43,6 +58,8 @@ from browser_use.agent.views import (
 	AgentSettings,
 	AgentState,
 	AgentStepInfo,
+	HedgeDecision,
+	HedgingPolicy,
 	StepMetadata,
 	ToolCallingMethod,
 )
@@ -56,13 +73,15 @@ from browser_use.dom.history_tree_processor.service import (
 	HistoryTreeProcessor,
 )
 from browser_use.exceptions import LLMException
+from browser_use.metrics.service import COUNT_BUCKETS, add_to_gauge, observe
 from browser_use.telemetry.service import ProductTelemetry
 from browser_use.telemetry.views import (
 	AgentEndTelemetryEvent,
 	AgentRunTelemetryEvent,
 	AgentStepTelemetryEvent,
 )
-from browser_use.utils import check_env_variables, time_execution_async, time_execution_sync
+from browser_use.tracing.service import SpanRecorder, current_span, record_span, span
+from browser_use.utils import EventLoopStallDetector, check_env_variables, time_execution_async, time_execution_sync
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -101,7 +120,7 @@ class Agent(Generic[Context]):
 		# Optional parameters
 		browser: Browser | None = None,
 		browser_context: BrowserContext | None = None,
-		controller: Controller[Context] = Controller(),
+		controller: Controller[Context] | None = None,
 		# Initial agent run parameters
 		sensitive_data: dict[str, str] | None = None,
 		initial_actions: list[dict[str, dict[str, Any]]] | None = None,
@@ -127,6 +146,13 @@ class Agent(Generic[Context]):
 		override_system_message: str | None = None,
 		extend_system_message: str | None = None,
 		max_input_tokens: int = 128000,
+		tokenizer: Tokenizer | None = None,
+		cache_friendly_prompt: bool = False,
+		compact_unchanged_elements: bool = False,
+		fold_repeated_elements: int | None = None,
+		element_token_budget: int | None = None,
+		vision_image_tokens: int | None = None,
+		stream_actions: bool = False,
 		validate_output: bool = False,
 		message_context: str | None = None,
 		generate_gif: bool | str = False,
@@ -156,14 +182,46 @@ class Agent(Generic[Context]):
 		enable_memory: bool = True,
 		memory_config: MemoryConfig | None = None,
 		source: str | None = None,
+		llm_gateway: LLMGateway | None = None,
+		llm_priority: int = 0,
+		hedging_policy: HedgingPolicy | None = None,
+		llm_cache: LLMResponseCache | None = None,
+		record_spans: bool = False,
+		profile_steps: ProfilerMode | None = None,
+		trajectory_cache: TrajectoryCache | None = None,
+		screenshot_store: ScreenshotStore | None = None,
+		step_log: StepLog | None = None,
+		task_family: str | None = None,
 	):
 		if page_extraction_llm is None:
 			page_extraction_llm = llm
 
+		# Responses of all model calls of the agent are read from / recorded to the cache, through copies of the models
+		# so that the caller's models (possibly shared with other agents) are not changed
+		self._connection_check_llm = llm  # the caller's model, a cached answer says nothing about the connection
+		if llm_cache is not None:
+			same_page_extraction_llm = page_extraction_llm is llm
+			llm = llm_cache.cached_model(llm)
+			page_extraction_llm = llm if same_page_extraction_llm else llm_cache.cached_model(page_extraction_llm)
+			if planner_llm is not None:
+				planner_llm = llm_cache.cached_model(planner_llm)
+			if hedging_policy is not None and hedging_policy.fallback_llm is not None:
+				hedging_policy = hedging_policy.model_copy(
+					update={'fallback_llm': llm_cache.cached_model(hedging_policy.fallback_llm)}
+				)
+
 		# Core components
 		self.task = task
 		self.llm = llm
-		self.controller = controller
+		self.llm_gateway = llm_gateway
+		self.trajectory_cache = trajectory_cache
+		self.screenshot_store = screenshot_store or InMemoryScreenshotStore()
+		self.step_log = step_log
+		self._resume_url: str | None = None
+		self.controller = controller or Controller()
+		if fold_repeated_elements is not None:
+			# folded lists point the model to expand_elements, other agents sharing the controller do not see the action
+			self.controller = self.controller.with_expand_elements()
 		self.sensitive_data = sensitive_data
 
 		self.settings = AgentSettings(
@@ -176,6 +234,17 @@ class Agent(Generic[Context]):
 			override_system_message=override_system_message,
 			extend_system_message=extend_system_message,
 			max_input_tokens=max_input_tokens,
+			cache_friendly_prompt=cache_friendly_prompt,
+			compact_unchanged_elements=compact_unchanged_elements,
+			fold_repeated_elements=fold_repeated_elements,
+			element_token_budget=element_token_budget,
+			vision_image_tokens=vision_image_tokens,
+			stream_actions=stream_actions,
+			llm_priority=llm_priority,
+			hedging_policy=hedging_policy,
+			task_family=task_family,
+			record_spans=record_spans,
+			profile_steps=profile_steps,
 			validate_output=validate_output,
 			message_context=message_context,
 			generate_gif=generate_gif,
@@ -190,6 +259,13 @@ class Agent(Generic[Context]):
 			save_playwright_script_path=save_playwright_script_path,
 			extend_planner_system_message=extend_planner_system_message,
 		)
+		if self.settings.vision_image_tokens is not None:
+			try:
+				import PIL  # noqa: F401
+			except ImportError:
+				raise ImportError(
+					'Pillow is required when vision_image_tokens is set. Please install it with `pip install "browser-use[vision]"`.'
+				)
 
 		# Memory settings
 		self.enable_memory = enable_memory
@@ -198,6 +274,10 @@ class Agent(Generic[Context]):
 		# Initialize state
 		self.state = injected_agent_state or AgentState()
 
+		# Recent model latencies for the hedging policy, and how the current step's model call was hedged
+		self._llm_latencies: deque[float] = deque(maxlen=hedging_policy.latency_window if hedging_policy else 1)
+		self._hedge_decision: HedgeDecision | None = None
+
 		# Action setup
 		self._setup_action_models()
 		self._set_browser_use_version_and_source(source)
@@ -206,6 +286,8 @@ class Agent(Generic[Context]):
 		# Model setup
 		self._set_model_names()
 		self.tool_calling_method = self._set_tool_calling_method()
+		if hedging_policy is not None and self._should_stream_actions():
+			logger.warning('⚠️ stream_actions and hedging_policy are both set, the model calls are streamed and not hedged.')
 
 		# Handle users trying to use use_vision=True with DeepSeek models
 		if 'deepseek' in self.model_name.lower():
@@ -261,6 +343,12 @@ class Agent(Generic[Context]):
 				message_context=self.settings.message_context,
 				sensitive_data=sensitive_data,
 				available_file_paths=self.settings.available_file_paths,
+				tokenizer=tokenizer,
+				cache_friendly_prompt=self.settings.cache_friendly_prompt,
+				compact_unchanged_elements=self.settings.compact_unchanged_elements,
+				fold_repeated_elements=self.settings.fold_repeated_elements,
+				element_token_budget=self.settings.element_token_budget,
+				vision_image_tokens=self.settings.vision_image_tokens,
 			),
 			state=self.state.message_manager_state,
 		)
@@ -272,6 +360,8 @@ class Agent(Generic[Context]):
 					message_manager=self._message_manager,
 					llm=self.llm,
 					config=self.memory_config,
+					llm_gateway=self.llm_gateway,
+					priority=self.settings.llm_priority,
 				)
 			except ImportError:
 				logger.warning(
@@ -310,6 +400,9 @@ class Agent(Generic[Context]):
 		self.browser_context = browser_context or BrowserContext(
 			browser=self.browser, config=self.browser.config.new_context_config
 		)
+		# the element list is cut to the budget from the viewport outwards, so extract the whole page. This is passed
+		# to every get_state call, the context's config may be shared with other agents and is left as it is
+		self._viewport_expansion: int | None = -1 if self.settings.element_token_budget is not None else None
 
 		# Callbacks
 		self.register_new_step_callback = register_new_step_callback
@@ -442,30 +535,49 @@ class Agent(Generic[Context]):
 		result: list[ActionResult] = []
 		step_start_time = time.time()
 		tokens = 0
+		stable_prefix_tokens = 0
+		self._hedge_decision = None
+		cached_output: AgentOutput | None = None
+		action_queue: asyncio.Queue[ActionModel | None] | None = None
+		action_task: asyncio.Task[list[ActionResult]] | None = None
+		streamed_actions: list[ActionModel] = []
+		on_action: Callable[[ActionModel], None] | None = None
+		span_recorder = SpanRecorder() if self.settings.record_spans else None
+		span_token = span_recorder.start('step', step=self.state.n_steps) if span_recorder else None
 
 		try:
-			state = await self.browser_context.get_state(cache_clickable_elements_hashes=True)
+			state = await self.browser_context.get_state(
+				cache_clickable_elements_hashes=True, viewport_expansion=self._viewport_expansion
+			)
 			current_page = await self.browser_context.get_current_page()
+			if (root_span := current_span()) is not None:
+				root_span.attributes['url'] = state.url
 
-			# generate procedural memory if needed
-			if self.enable_memory and self.memory and self.state.n_steps % self.memory.config.memory_interval == 0:
-				self.memory.create_procedural_memory(self.state.n_steps)
+			# swap in the procedural memory created in the background, and start the next one if needed
+			if self.enable_memory and self.memory:
+				self.memory.apply_procedural_memory()
+				if self.memory.should_create_memory(self.state.n_steps):
+					self.memory.start_procedural_memory(self.state.n_steps)
 
 			await self._raise_if_stopped_or_paused()
 
 			# Update action models with page-specific actions
 			await self._update_action_models_for_page(current_page)
 
+			# Actions that solved this page before, the model is not called for them
+			cached_output = await self._get_cached_next_action(state, step_info)
+
 			# Get page-specific filtered actions
 			page_filtered_actions = self.controller.registry.get_prompt_description(current_page)
 
 			# If there are page-specific actions, add them as a special message for this step only
 			if page_filtered_actions:
 				page_action_message = f'For this page, these additional actions are available:\n{page_filtered_actions}'
-				self._message_manager._add_message_with_tokens(HumanMessage(content=page_action_message))
+				self._message_manager.add_step_message(HumanMessage(content=page_action_message))
 
 			# If using raw tool calling method, we need to update the message context with new actions
-			if self.tool_calling_method == 'raw':
+			# (the cache friendly layout keeps the context fixed, page specific actions are in the step message above)
+			if self.tool_calling_method == 'raw' and not self.settings.cache_friendly_prompt:
 				# For raw tool calling, get all non-filtered actions plus the page-filtered ones
 				all_unfiltered_actions = self.controller.registry.get_prompt_description()
 				all_actions = all_unfiltered_actions
@@ -484,7 +596,7 @@ class Agent(Generic[Context]):
 			self._message_manager.add_state_message(state, self.state.last_result, step_info, self.settings.use_vision)
 
 			# Run planner at specified intervals if planner is configured
-			if self.settings.planner_llm and self.state.n_steps % self.settings.planner_interval == 0:
+			if self.settings.planner_llm and cached_output is None and self.state.n_steps % self.settings.planner_interval == 0:
 				plan = await self._run_planner()
 				# add plan before last state message
 				self._message_manager.add_plan(plan, position=-1)
@@ -496,14 +608,32 @@ class Agent(Generic[Context]):
 				msg += '\nIf the task is fully finished, set success in "done" to true.'
 				msg += '\nInclude everything you found out for the ultimate task in the done text.'
 				logger.info('Last step finishing up')
-				self._message_manager._add_message_with_tokens(HumanMessage(content=msg))
+				self._message_manager.add_step_message(HumanMessage(content=msg))
 				self.AgentOutput = self.DoneAgentOutput
 
 			input_messages = self._message_manager.get_messages()
 			tokens = self._message_manager.state.history.current_tokens
+			stable_prefix_tokens = self._message_manager.measure_stable_prefix()
+			if self.settings.cache_friendly_prompt and supports_cache_breakpoints(self.chat_model_library):
+				# cache the system prompt and everything up to the per-step messages
+				stable_prefix_end = self._message_manager.get_stable_prefix_length() - 1
+				input_messages = add_cache_breakpoints(input_messages, [0, stable_prefix_end])
+
+			if self._should_stream_actions() and cached_output is None:
+				# actions are executed while the rest of the model output is still streaming
+				action_queue = asyncio.Queue()
+				action_task = asyncio.create_task(self.multi_act(self._dequeue_actions(action_queue)))
+
+				def on_action(action: ActionModel) -> None:
+					streamed_actions.append(action)
+					action_queue.put_nowait(action)
 
 			try:
-				model_output = await self.get_next_action(input_messages)
+				if cached_output is not None:
+					logger.info('♻️ Reusing the cached actions for this page')
+					model_output = cached_output
+				else:
+					model_output = await self.get_next_action(input_messages, on_action=on_action)
 				if (
 					not model_output.action
 					or not isinstance(model_output.action, list)
@@ -528,6 +658,13 @@ class Agent(Generic[Context]):
 						)
 						model_output.action = [action_instance]
 
+					if action_queue is not None:
+						for action in model_output.action:
+							action_queue.put_nowait(action)
+
+				if action_queue is not None:
+					action_queue.put_nowait(None)  # all actions are dispatched
+
 				# Check again for paused/stopped state after getting model output
 				await self._raise_if_stopped_or_paused()
 
@@ -561,9 +698,14 @@ class Agent(Generic[Context]):
 				self._message_manager._remove_last_state_message()
 				raise e
 
-			result: list[ActionResult] = await self.multi_act(model_output.action)
+			if action_task is not None:
+				result: list[ActionResult] = await action_task
+			else:
+				result: list[ActionResult] = await self.multi_act(model_output.action)
 
 			self.state.last_result = result
+			if self.trajectory_cache is not None:
+				self.trajectory_cache.record(self._task_family, state, model_output, result)
 
 			if len(result) > 0 and result[-1].is_done:
 				logger.info(f'📄 Result: {result[-1].extracted_content}')
@@ -584,10 +726,25 @@ class Agent(Generic[Context]):
 			self.state.last_result = [ActionResult(error='The agent was paused with Ctrl+C', include_in_memory=False)]
 			raise InterruptedError('Step cancelled by user')
 		except Exception as e:
-			result = await self._handle_step_error(e)
+			if cached_output is not None and self.trajectory_cache is not None and state is not None:
+				# the page changed in a way the fingerprint did not catch, ask the model next time
+				self.trajectory_cache.invalidate(self._task_family, state)
+			streamed_results: list[ActionResult] = []
+			if action_queue is not None and action_task is not None:
+				# the actions streamed before the model output failed still ran, keep them next to the error
+				streamed_results = await self._finish_streamed_actions(action_queue, action_task)
+				if model_output is None and streamed_actions:
+					brain = AgentBrain(evaluation_previous_goal='', memory='', next_goal='')
+					model_output = self.AgentOutput(current_state=brain, action=streamed_actions)
+			result = streamed_results + await self._handle_step_error(e)
 			self.state.last_result = result
 
 		finally:
+			if action_queue is not None and action_task is not None:
+				# let actions dispatched from a failed model output finish before the next step starts
+				await self._finish_streamed_actions(action_queue, action_task)
+			if span_recorder is not None and span_token is not None:
+				span_recorder.stop(span_token)
 			step_end_time = time.time()
 			actions = [a.model_dump(exclude_unset=True) for a in model_output.action] if model_output else []
 			self.telemetry.capture(
@@ -608,8 +765,14 @@ class Agent(Generic[Context]):
 					step_start_time=step_start_time,
 					step_end_time=step_end_time,
 					input_tokens=tokens,
+					stable_prefix_tokens=stable_prefix_tokens,
+					hedge=self._hedge_decision,
+					from_trajectory_cache=cached_output is not None,
+					spans=span_recorder.spans if span_recorder else [],
 				)
 				self._make_history_item(model_output, state, result, metadata)
+				if self.step_log is not None:
+					self.step_log.append_step(self.state.history.history[-1], self.state)
 
 	@time_execution_async('--handle_step_error (agent)')
 	async def _handle_step_error(self, error: Exception) -> list[ActionResult]:
@@ -675,10 +838,14 @@ class Agent(Generic[Context]):
 			title=state.title,
 			tabs=state.tabs,
 			interacted_element=interacted_elements,
-			screenshot=state.screenshot,
 		)
+		if state.screenshot:
+			self.screenshot_store.save(state.screenshot, state_history)
 
 		history_item = AgentHistory(model_output=model_output, result=result, state=state_history, metadata=metadata)
+		if metadata:
+			observe('browser_use_step_duration_seconds', metadata.duration_seconds, help='Duration of agent steps')
+			observe('browser_use_step_input_tokens', metadata.input_tokens, help='Input tokens per step', buckets=COUNT_BUCKETS)
 
 		self.state.history.history.append(history_item)
 
@@ -693,27 +860,95 @@ class Agent(Generic[Context]):
 		text = re.sub(self.STRAY_CLOSE_TAG, '', text)
 		return text.strip()
 
-	def _convert_input_messages(self, input_messages: list[BaseMessage]) -> list[BaseMessage]:
-		"""Convert input messages to the correct format"""
-		if is_model_without_tool_support(self.model_name):
-			return convert_input_messages(input_messages, self.model_name)
+	async def _stream_next_action(
+		self, input_messages: list[BaseMessage], on_action: Callable[[ActionModel], None]
+	) -> tuple[AgentOutput, int]:
+		"""Stream the model output, dispatching each action as soon as it is complete. Returns the output and the number of dispatched actions."""
+		logger.debug(f'Streaming {self.tool_calling_method} output for {self.chat_model_library}')
+		action_model = self.DoneActionModel if self.AgentOutput is self.DoneAgentOutput else self.ActionModel
+		parser: StreamingActionParser | None = StreamingActionParser()
+		n_dispatched = 0
+		message = None
+		tool_call_index = None
+
+		if self.tool_calling_method == 'raw':
+			stream = self.llm.astream(input_messages)
 		else:
-			return input_messages
+			stream = self.llm.bind_tools([self.AgentOutput], tool_choice=self.AgentOutput.__name__).astream(input_messages)
 
-	@time_execution_async('--get_next_action (agent)')
-	async def get_next_action(self, input_messages: list[BaseMessage]) -> AgentOutput:
-		"""Get next action from LLM based on current state"""
-		input_messages = self._convert_input_messages(input_messages)
+		call_start_time = time.time()
+		try:
+			async with self._llm_slot(input_messages):
+				async for chunk in stream:
+					if message is None:
+						time_to_first_token = time.time() - call_start_time
+						record_span('llm_time_to_first_token', call_start_time, time_to_first_token)
+						observe(
+							'browser_use_llm_time_to_first_token_seconds',
+							time_to_first_token,
+							help='Time to the first chunk of streamed model calls',
+							model=self.model_name,
+						)
+					message = chunk if message is None else message + chunk
+					if parser is None or n_dispatched >= self.settings.max_actions_per_step:
+						continue
+
+					if self.tool_calling_method == 'raw':
+						text = get_text_content(chunk.content)
+					else:
+						# only the arguments of the first tool call are the agent output
+						text = ''
+						for tool_call_chunk in getattr(chunk, 'tool_call_chunks', []):
+							if tool_call_index is None:
+								tool_call_index = tool_call_chunk.get('index')
+							if tool_call_chunk.get('index') == tool_call_index:
+								text += tool_call_chunk.get('args') or ''
+
+					for action_dict in parser.feed(text):
+						try:
+							action = action_model(**action_dict)
+						except ValidationError as e:
+							# stop dispatching early, the complete output decides what happens
+							logger.debug(f'Streamed action is invalid, waiting for the complete output: {e}')
+							parser = None
+							break
+						on_action(action)
+						n_dispatched += 1
+						if n_dispatched >= self.settings.max_actions_per_step:
+							break
+		except Exception as e:
+			logger.error(f'Failed to invoke model: {str(e)}')
+			raise LLMException(401, 'LLM API call failed') from e
+
+		if message is None:
+			raise ValueError('Could not parse response.')
 
+		try:
+			tool_calls = getattr(message, 'tool_calls', None)
+			if self.tool_calling_method != 'raw' and tool_calls:
+				parsed_json = tool_calls[0]['args']
+			else:
+				parsed_json = extract_json_from_model_output(self._remove_think_tags(get_text_content(message.content)))
+			parsed = self.AgentOutput(**parsed_json)
+		except (ValueError, ValidationError) as e:
+			logger.warning(f'Failed to parse model output: {message} {str(e)}')
+			raise ValueError('Could not parse response.')
+
+		return parsed, n_dispatched
+
+	async def _invoke_next_action(
+		self, input_messages: list[BaseMessage], llm: BaseChatModel, coalesce: bool = True
+	) -> AgentOutput:
+		"""Call the model with the agent's tool calling method and parse its output"""
 		if self.tool_calling_method == 'raw':
 			logger.debug(f'Using {self.tool_calling_method} for {self.chat_model_library}')
 			try:
-				output = self.llm.invoke(input_messages)
+				output = await self._ainvoke_llm(llm, input_messages, coalesce=coalesce)
 				response = {'raw': output, 'parsed': None}
 			except Exception as e:
 				logger.error(f'Failed to invoke model: {str(e)}')
 				raise LLMException(401, 'LLM API call failed') from e
-			# TODO: currently invoke does not return reasoning_content, we should override invoke
+			# TODO: currently ainvoke does not return reasoning_content, we should override ainvoke
 			output.content = self._remove_think_tags(str(output.content))
 			try:
 				parsed_json = extract_json_from_model_output(output.content)
@@ -724,9 +959,9 @@ class Agent(Generic[Context]):
 				raise ValueError('Could not parse response.')
 
 		elif self.tool_calling_method is None:
-			structured_llm = self.llm.with_structured_output(self.AgentOutput, include_raw=True)
+			structured_llm = llm.with_structured_output(self.AgentOutput, include_raw=True)
 			try:
-				response: dict[str, Any] = await structured_llm.ainvoke(input_messages)  # type: ignore
+				response: dict[str, Any] = await self._ainvoke_llm(structured_llm, input_messages, coalesce=coalesce)  # type: ignore
 				parsed: AgentOutput | None = response['parsed']
 
 			except Exception as e:
@@ -735,8 +970,8 @@ class Agent(Generic[Context]):
 
 		else:
 			logger.debug(f'Using {self.tool_calling_method} for {self.chat_model_library}')
-			structured_llm = self.llm.with_structured_output(self.AgentOutput, include_raw=True, method=self.tool_calling_method)
-			response: dict[str, Any] = await structured_llm.ainvoke(input_messages)  # type: ignore
+			structured_llm = llm.with_structured_output(self.AgentOutput, include_raw=True, method=self.tool_calling_method)
+			response: dict[str, Any] = await self._ainvoke_llm(structured_llm, input_messages, coalesce=coalesce)  # type: ignore
 
 		# Handle tool call responses
 		if response.get('parsing_error') and 'raw' in response:
@@ -774,15 +1009,153 @@ class Agent(Generic[Context]):
 				logger.warning(f'Failed to parse model output: {response["raw"].content} {str(e)}')
 				raise ValueError('Could not parse response.')
 
+		return parsed
+
+	async def _hedged_next_action(self, input_messages: list[BaseMessage]) -> AgentOutput:
+		"""
+		Call the model, and send a duplicate request (to the fallback model if set) if it is slower than usual.
+
+		The first valid output wins and the other request is cancelled. The decision is kept for the step metadata.
+		"""
+		policy = self.settings.hedging_policy
+		assert policy is not None
+		hedge_delay = self._get_hedge_delay()
+		start_time = time.monotonic()
+
+		primary = asyncio.create_task(self._invoke_next_action(input_messages, self.llm))
+		pending: set[asyncio.Task[AgentOutput]] = {primary}
+		hedge: asyncio.Task[AgentOutput] | None = None
+		try:
+			if hedge_delay is not None:
+				done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+				if not done:
+					logger.debug(f'No model response after {hedge_delay:.2f}s, sending a hedged request')
+					# never coalesced in the gateway, it would just wait for the slow primary request
+					hedge = asyncio.create_task(
+						self._invoke_next_action(input_messages, policy.fallback_llm or self.llm, coalesce=False)
+					)
+					pending.add(hedge)
+
+			error: BaseException | None = None
+			while pending:
+				done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+				for task in done:
+					if task.exception() is None:
+						self._llm_latencies.append(time.monotonic() - start_time)
+						self._hedge_decision = HedgeDecision(
+							delay_seconds=hedge_delay, hedged=hedge is not None, winner='hedge' if task is hedge else 'primary'
+						)
+						return task.result()
+					error = task.exception()
+			assert error is not None
+			raise error
+		finally:
+			for task in pending:
+				task.cancel()
+
+	def _get_hedge_delay(self) -> float | None:
+		"""Hedge after the configured percentile of recent model latencies, None until there are enough samples"""
+		policy = self.settings.hedging_policy
+		assert policy is not None
+		if len(self._llm_latencies) < policy.min_samples:
+			return None
+		latencies = sorted(self._llm_latencies)
+		index = min(len(latencies) - 1, int(len(latencies) * policy.latency_percentile / 100))
+		return max(policy.min_delay_seconds, latencies[index])
+
+	def _convert_input_messages(self, input_messages: list[BaseMessage]) -> list[BaseMessage]:
+		"""Convert input messages to the correct format"""
+		if is_model_without_tool_support(self.model_name):
+			return convert_input_messages(input_messages, self.model_name)
+		else:
+			return input_messages
+
+	async def _ainvoke_llm(self, llm: Runnable, input_messages: list[BaseMessage], coalesce: bool = True) -> Any:
+		"""Call a model, queued through the shared LLM gateway if the agent has one"""
+		model = getattr(llm, 'model_name', None) or type(llm).__name__
+		start_time = time.time()
+		with span('llm_call', model=model):
+			if self.llm_gateway is None:
+				result = await llm.ainvoke(input_messages)
+			else:
+				result = await self.llm_gateway.ainvoke(
+					llm,
+					input_messages,
+					tokens=self._message_manager.count_tokens(input_messages),
+					priority=self.settings.llm_priority,
+					coalesce=coalesce,
+				)
+		observe('browser_use_llm_latency_seconds', time.time() - start_time, help='Duration of model calls', model=model)
+		return result
+
+	def _llm_slot(self, input_messages: list[BaseMessage]) -> AbstractAsyncContextManager:
+		"""Hold a slot of the shared LLM gateway (if any) for a streamed call"""
+		if self.llm_gateway is None:
+			return nullcontext()
+		return self.llm_gateway.slot(self._message_manager.count_tokens(input_messages), self.settings.llm_priority)
+
+	def _should_stream_actions(self) -> bool:
+		"""Streaming needs the output as raw JSON text or as tool call argument chunks"""
+		return self.settings.stream_actions and self.tool_calling_method != 'json_mode'
+
+	@staticmethod
+	async def _finish_streamed_actions(
+		action_queue: asyncio.Queue[ActionModel | None], action_task: asyncio.Task[list[ActionResult]]
+	) -> list[ActionResult]:
+		"""End the action queue and return the results of the actions that were dispatched to it"""
+		action_queue.put_nowait(None)
+		(results,) = await asyncio.gather(action_task, return_exceptions=True)
+		return results if isinstance(results, list) else []
+
+	@staticmethod
+	async def _dequeue_actions(action_queue: asyncio.Queue[ActionModel | None]) -> AsyncIterator[ActionModel]:
+		"""Yield actions from the queue until the end marker None"""
+		while (action := await action_queue.get()) is not None:
+			yield action
+
+	@time_execution_async('--get_next_action (agent)')
+	async def get_next_action(
+		self, input_messages: list[BaseMessage], on_action: Callable[[ActionModel], None] | None = None
+	) -> AgentOutput:
+		"""Get next action from LLM based on current state
+
+		on_action: if set, the output is streamed and every action is passed to it as soon as it is complete
+		"""
+		input_messages = self._convert_input_messages(input_messages)
+		n_dispatched = 0
+
+		if on_action is not None and self._should_stream_actions():
+			parsed, n_dispatched = await self._stream_next_action(input_messages, on_action)
+
+		elif self.settings.hedging_policy is not None:
+			parsed = await self._hedged_next_action(input_messages)
+		else:
+			parsed = await self._invoke_next_action(input_messages, self.llm)
+
 		# cut the number of actions to max_actions_per_step if needed
 		if len(parsed.action) > self.settings.max_actions_per_step:
 			parsed.action = parsed.action[: self.settings.max_actions_per_step]
 
+		# dispatch the actions the streaming parser did not pick up
+		if on_action is not None:
+			for action in parsed.action[n_dispatched:]:
+				on_action(action)
+
 		if not (hasattr(self.state, 'paused') and (self.state.paused or self.state.stopped)):
 			log_response(parsed)
 
 		return parsed
 
+	def _make_step_profiler(self) -> StepProfiler | None:
+		"""Profiler of the steps of this run, the files are written next to the saved conversation"""
+		if self.settings.profile_steps is None:
+			return None
+		if self.settings.save_conversation_path:
+			path_prefix = f'{self.settings.save_conversation_path}_profile'
+		else:
+			path_prefix = str(Path('agent_profiles') / self.state.agent_id)
+		return StepProfiler(self.settings.profile_steps, path_prefix)
+
 	def _log_agent_run(self) -> None:
 		"""Log the agent run"""
 		logger.info(f'🚀 Starting task: {self.task}')
@@ -844,11 +1217,19 @@ class Agent(Generic[Context]):
 		)
 		signal_handler.register()
 
+		# in debug mode, report synchronous code that blocks the event loop (and every other agent running on it)
+		stall_detector = EventLoopStallDetector.acquire(loop) if logger.isEnabledFor(logging.DEBUG) else None
+		add_to_gauge('browser_use_agents_running', 1, help='Agents currently running')
+		profiler = self._make_step_profiler()
+
 		try:
 			self._log_agent_run()
 
-			# Execute initial actions if provided
-			if self.initial_actions:
+			if self._resume_url is not None:
+				await self._restore_resumed_page()
+
+			# Execute initial actions if provided, not again when continuing earlier steps (e.g. after resume_from_log)
+			if self.initial_actions and self.state.n_steps == 1:
 				result = await self.multi_act(self.initial_actions, check_for_new_elements=False)
 				self.state.last_result = result
 
@@ -877,7 +1258,8 @@ class Agent(Generic[Context]):
 					await on_step_start(self)
 
 				step_info = AgentStepInfo(step_number=step, max_steps=max_steps)
-				await self.step(step_info)
+				with profiler.profile_step(self.state.n_steps) if profiler else nullcontext():
+					await self.step(step_info)
 
 				if on_step_end is not None:
 					await on_step_end(self)
@@ -919,6 +1301,17 @@ class Agent(Generic[Context]):
 		finally:
 			# Unregister signal handlers before cleanup
 			signal_handler.unregister()
+			if stall_detector:
+				stall_detector.release()
+			add_to_gauge('browser_use_agents_running', -1, help='Agents currently running')
+			if self.step_log is not None:
+				await self.step_log.flush()
+			if self.trajectory_cache is not None:
+				await self.trajectory_cache.flush()
+			if self.enable_memory and self.memory:
+				self.memory.cancel_procedural_memory()
+			if profiler and (summary_path := profiler.write_summary()):
+				logger.info(f'📈 Step profiles saved, summary of the run in {summary_path}')
 
 			self.telemetry.capture(
 				AgentEndTelemetryEvent(
@@ -927,7 +1320,7 @@ class Agent(Generic[Context]):
 					success=self.state.history.is_successful(),
 					steps=self.state.n_steps,
 					max_steps_reached=self.state.n_steps >= max_steps,
-					errors=self.state.history.errors(),
+					errors=list(self.state.history.errors()),
 					total_input_tokens=self.state.history.total_input_tokens(),
 					total_duration_seconds=self.state.history.total_duration_seconds(),
 				)
@@ -964,20 +1357,32 @@ class Agent(Generic[Context]):
 	@time_execution_async('--multi-act (agent)')
 	async def multi_act(
 		self,
-		actions: list[ActionModel],
+		actions: list[ActionModel] | AsyncIterable[ActionModel],
 		check_for_new_elements: bool = True,
 	) -> list[ActionResult]:
-		"""Execute multiple actions"""
+		"""Execute multiple actions
+
+		actions can also be an async iterable (e.g. actions streamed from the model), the next action is awaited after
+		the previous one finished.
+		"""
 		results = []
+		n_actions = f' / {len(actions)}' if isinstance(actions, list) else ''
 
 		cached_selector_map = await self.browser_context.get_selector_map()
 		cached_path_hashes = {e.hash.branch_path_hash for e in cached_selector_map.values()}
 
 		await self.browser_context.remove_highlights()
 
-		for i, action in enumerate(actions):
+		i = -1
+		async for action in self._iterate_actions(actions):
+			i += 1
+			if i != 0:
+				await asyncio.sleep(self.browser_context.config.wait_between_actions)
+
 			if action.get_index() is not None and i != 0:
-				new_state = await self.browser_context.get_state(cache_clickable_elements_hashes=False)
+				new_state = await self.browser_context.get_state(
+					cache_clickable_elements_hashes=False, viewport_expansion=self._viewport_expansion
+				)
 				new_selector_map = new_state.selector_map
 
 				# Detect index change after previous action
@@ -986,7 +1391,7 @@ class Agent(Generic[Context]):
 				new_target = new_selector_map.get(action.get_index())  # type: ignore
 				new_target_hash = new_target.hash.branch_path_hash if new_target else None
 				if orig_target_hash != new_target_hash:
-					msg = f'Element index changed after action {i} / {len(actions)}, because page changed.'
+					msg = f'Element index changed after action {i}{n_actions}, because page changed.'
 					logger.info(msg)
 					results.append(ActionResult(extracted_content=msg, include_in_memory=True))
 					break
@@ -994,7 +1399,7 @@ class Agent(Generic[Context]):
 				new_path_hashes = {e.hash.branch_path_hash for e in new_selector_map.values()}
 				if check_for_new_elements and not new_path_hashes.issubset(cached_path_hashes):
 					# next action requires index but there are new elements on the page
-					msg = f'Something new appeared after action {i} / {len(actions)}'
+					msg = f'Something new appeared after action {i}{n_actions}'
 					logger.info(msg)
 					results.append(ActionResult(extracted_content=msg, include_in_memory=True))
 					break
@@ -1002,24 +1407,22 @@ class Agent(Generic[Context]):
 			try:
 				await self._raise_if_stopped_or_paused()
 
-				result = await self.controller.act(
-					action,
-					self.browser_context,
-					self.settings.page_extraction_llm,
-					self.sensitive_data,
-					self.settings.available_file_paths,
-					context=self.context,
-				)
+				with span('action', action=next(iter(action.model_dump(exclude_unset=True)), None)):
+					result = await self.controller.act(
+						action,
+						self.browser_context,
+						self.settings.page_extraction_llm,
+						self.sensitive_data,
+						self.settings.available_file_paths,
+						context=self.context,
+					)
 
 				results.append(result)
 
-				logger.debug(f'Executed action {i + 1} / {len(actions)}')
-				if results[-1].is_done or results[-1].error or i == len(actions) - 1:
+				logger.debug(f'Executed action {i + 1}{n_actions}')
+				if results[-1].is_done or results[-1].error:
 					break
 
-				await asyncio.sleep(self.browser_context.config.wait_between_actions)
-				# hash all elements. if it is a subset of cached_state its fine - else break (new elements on page)
-
 			except asyncio.CancelledError:
 				# Gracefully handle task cancellation
 				logger.info(f'Action {i + 1} was cancelled due to Ctrl+C')
@@ -1030,6 +1433,15 @@ class Agent(Generic[Context]):
 
 		return results
 
+	@staticmethod
+	async def _iterate_actions(actions: list[ActionModel] | AsyncIterable[ActionModel]) -> AsyncIterator[ActionModel]:
+		if isinstance(actions, list):
+			for action in actions:
+				yield action
+		else:
+			async for action in actions:
+				yield action
+
 	async def _validate_output(self) -> bool:
 		"""Validate the output of the last action is what the user wanted"""
 		system_msg = (
@@ -1044,7 +1456,9 @@ class Agent(Generic[Context]):
 		)
 
 		if self.browser_context.session:
-			state = await self.browser_context.get_state(cache_clickable_elements_hashes=False)
+			state = await self.browser_context.get_state(
+				cache_clickable_elements_hashes=False, viewport_expansion=self._viewport_expansion
+			)
 			content = AgentMessagePrompt(
 				state=state,
 				result=self.state.last_result,
@@ -1064,7 +1478,7 @@ class Agent(Generic[Context]):
 			reason: str
 
 		validator = self.llm.with_structured_output(ValidationResult, include_raw=True)
-		response: dict[str, Any] = await validator.ainvoke(msg)  # type: ignore
+		response: dict[str, Any] = await self._ainvoke_llm(validator, msg)  # type: ignore
 		parsed: ValidationResult = response['parsed']
 		is_valid = parsed.is_valid
 		if not is_valid:
@@ -1154,7 +1568,9 @@ class Agent(Generic[Context]):
 
 	async def _execute_history_step(self, history_item: AgentHistory, delay: float) -> list[ActionResult]:
 		"""Execute a single step from history with element validation"""
-		state = await self.browser_context.get_state(cache_clickable_elements_hashes=False)
+		state = await self.browser_context.get_state(
+			cache_clickable_elements_hashes=False, viewport_expansion=self._viewport_expansion
+		)
 		if not state or not history_item.model_output:
 			raise ValueError('Invalid state or model output')
 		updated_actions = []
@@ -1174,6 +1590,33 @@ class Agent(Generic[Context]):
 		await asyncio.sleep(delay)
 		return result
 
+	@property
+	def _task_family(self) -> str:
+		return self.settings.task_family or self.task
+
+	async def _get_cached_next_action(self, state: BrowserState, step_info: AgentStepInfo | None = None) -> AgentOutput | None:
+		"""Cached actions for the current page, re-targeted to the current element indices"""
+		if self.trajectory_cache is None or any(r.error for r in self.state.last_result or []):
+			return None
+		if step_info and step_info.is_last_step():
+			return None  # the model has to answer with done, which is never cached
+
+		cached_step = self.trajectory_cache.lookup(self._task_family, state)
+		if cached_step is None:
+			return None
+
+		actions = []
+		for action_data, historical_element in zip(cached_step.actions, cached_step.interacted_element):
+			try:
+				action = self.ActionModel.model_validate(action_data)
+			except ValidationError:
+				return None  # the action is not available on this page anymore
+			action = await self._update_action_indices(historical_element, action, state)
+			if action is None:
+				return None
+			actions.append(action)
+		return self.AgentOutput(current_state=cached_step.current_state, action=actions)
+
 	async def _update_action_indices(
 		self,
 		historical_element: DOMHistoryElement | None,
@@ -1212,6 +1655,32 @@ class Agent(Generic[Context]):
 		history = AgentHistoryList.load_from_file(history_file, self.AgentOutput)
 		return await self.rerun_history(history, **kwargs)
 
+	def resume_from_log(self, path: str | Path) -> None:
+		"""
+		Continue from the last completed step of a step log (see StepLog), e.g. after the worker crashed.
+
+		Restores the history, the message history and the counters, the next run() starts with the step after it.
+		Pass the same log as Agent(step_log=...) to keep appending to it.
+
+		run() skips the initial actions and opens the page of the last completed step in the browser again. That is
+		the page the step started on, the step's actions are not repeated, so after a navigation the model sees the
+		earlier page in its next state and continues from there.
+		"""
+		self.state = StepLog.load_state(path, self.AgentOutput)
+		self._message_manager.state = self.state.message_manager_state
+		self._resume_url = next((h.state.url for h in reversed(self.state.history.history) if h.state.url), None)
+		logger.info(f'🔁 Resuming from step {self.state.n_steps} of {path}')
+
+	async def _restore_resumed_page(self) -> None:
+		"""Open the page of the last step after resume_from_log, the browser of the crashed run is gone"""
+		url, self._resume_url = self._resume_url, None
+		assert url is not None
+		try:
+			await self.browser_context.navigate_to(url)
+			logger.info(f'🔁 Reopened {url}')
+		except Exception as e:
+			logger.warning(f'Could not reopen {url} after resuming, continuing on the current page: {e}')
+
 	def save_history(self, file_path: str | Path | None = None) -> None:
 		"""Save the history to a file"""
 		if not file_path:
@@ -1275,18 +1744,19 @@ class Agent(Generic[Context]):
 		Verify that the LLM API keys are setup and the LLM API is responding properly.
 		Helps prevent errors due to running out of API credits, missing env vars, or network issues.
 		"""
-		logger.debug(f'Verifying the {self.llm.__class__.__name__} LLM knows the capital of France...')
+		llm = self._connection_check_llm
+		logger.debug(f'Verifying the {llm.__class__.__name__} LLM knows the capital of France...')
 
-		if getattr(self.llm, '_verified_api_keys', None) is True or SKIP_LLM_API_KEY_VERIFICATION:
+		if getattr(llm, '_verified_api_keys', None) is True or SKIP_LLM_API_KEY_VERIFICATION:
 			# skip roundtrip connection test for speed in cloud environment
 			# If the LLM API keys have already been verified during a previous run, skip the test
-			self.llm._verified_api_keys = True
+			self.llm._verified_api_keys = llm._verified_api_keys = True
 			return True
 
 		# show a warning if it looks like any required environment variables are missing
-		required_keys = REQUIRED_LLM_API_ENV_VARS.get(self.llm.__class__.__name__, [])
+		required_keys = REQUIRED_LLM_API_ENV_VARS.get(llm.__class__.__name__, [])
 		if required_keys and not check_env_variables(required_keys, any_or_all=all):
-			error = f'Expected LLM API Key environment variables might be missing for {self.llm.__class__.__name__}: {" ".join(required_keys)}'
+			error = f'Expected LLM API Key environment variables might be missing for {llm.__class__.__name__}: {" ".join(required_keys)}'
 			logger.warning(f'❌ {error}')
 
 		# send a basic sanity-test question to the LLM and verify the response
@@ -1294,14 +1764,14 @@ class Agent(Generic[Context]):
 		test_answer = 'paris'
 		try:
 			# dont convert this to async! it *should* block any subsequent llm calls from running
-			response = self.llm.invoke([HumanMessage(content=test_prompt)])
+			response = llm.invoke([HumanMessage(content=test_prompt)])
 			response_text = str(response.content).lower()
 
 			if test_answer in response_text:
 				logger.debug(
-					f'🪪 LLM API keys {", ".join(required_keys)} work, {self.llm.__class__.__name__} model is connected & responding correctly.'
+					f'🪪 LLM API keys {", ".join(required_keys)} work, {llm.__class__.__name__} model is connected & responding correctly.'
 				)
-				self.llm._verified_api_keys = True
+				self.llm._verified_api_keys = llm._verified_api_keys = True
 				return True
 			else:
 				logger.warning(
@@ -1312,10 +1782,10 @@ class Agent(Generic[Context]):
 				)
 				raise Exception('LLM responded to a simple test question incorrectly')
 		except Exception as e:
-			self.llm._verified_api_keys = False
+			self.llm._verified_api_keys = llm._verified_api_keys = False
 			if required_keys:
 				logger.error(
-					f'\n\n❌  LLM {self.llm.__class__.__name__} connection test failed. Check that {", ".join(required_keys)} is set correctly in .env and that the LLM API account has sufficient funding.\n\n{e}\n'
+					f'\n\n❌  LLM {llm.__class__.__name__} connection test failed. Check that {", ".join(required_keys)} is set correctly in .env and that the LLM API account has sufficient funding.\n\n{e}\n'
 				)
 				return False
 			else:
@@ -1367,7 +1837,7 @@ class Agent(Generic[Context]):
 
 		# Get planner output
 		try:
-			response = await self.settings.planner_llm.ainvoke(planner_messages)
+			response = await self._ainvoke_llm(self.settings.planner_llm, planner_messages)
 		except Exception as e:
 			logger.error(f'Failed to invoke planner: {str(e)}')
 			raise LLMException(401, 'LLM API call failed') from e
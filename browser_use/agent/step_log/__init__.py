@@ -0,0 +1,3 @@
+from browser_use.agent.step_log.service import StepLog
+
+__all__ = ['StepLog']
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import orjson
+
+from browser_use.agent.serialization import (
+	SERIALIZATION_VERSION,
+	decode_agent_history,
+	decode_message_manager_state,
+	encode_agent_history,
+	encode_message,
+	json_default,
+)
+
+if TYPE_CHECKING:
+	from browser_use.agent.views import AgentHistory, AgentOutput, AgentState
+
+logger = logging.getLogger(__name__)
+
+
+class StepLog:
+	"""
+	Append-only JSONL log of the agent steps, one line per finished step.
+
+	Each line holds the history item of the step and the agent state after it (without the history), so a crashed
+	run can be continued from its last completed step with Agent.resume_from_log(). The message history is written
+	in full for the first step of a StepLog, later lines only hold the messages that changed since the line before
+	(the number of leading messages that are kept and the new ones after them), so the log grows with the steps and
+	not with the steps times the history. The step is encoded (see browser_use.agent.serialization) when it is
+	appended, writing with fsync happens on a background thread, off the event loop.
+	"""
+
+	def __init__(self, path: str | Path):
+		self.path = Path(path)
+		self.path.parent.mkdir(parents=True, exist_ok=True)
+		self._queue: queue.Queue[bytes | None] = queue.Queue()
+		self._thread: threading.Thread | None = None
+		# encoded messages of the last appended step, the next step is written as the difference to them
+		self._messages: list[bytes] | None = None
+
+	def append_step(self, history_item: AgentHistory, state: AgentState) -> None:
+		"""Encode a finished step and queue it for writing, returns without waiting for the disk"""
+		history = state.message_manager_state.history
+		# [message, tokens, message_type], encoded right away, the messages can still change in place after the step
+		messages = [
+			orjson.dumps([encode_message(m.message), m.metadata.tokens, m.metadata.message_type], default=json_default)
+			for m in history.messages
+		]
+		message_manager_state: dict[str, Any] = {
+			'tool_id': state.message_manager_state.tool_id,
+			'current_tokens': history.current_tokens,
+		}
+		if self._messages is None:
+			message_manager_state['messages'] = [orjson.Fragment(m) for m in messages]
+		else:
+			kept = _common_prefix_length(self._messages, messages)
+			message_manager_state['kept_messages'] = kept
+			message_manager_state['new_messages'] = [orjson.Fragment(m) for m in messages[kept:]]
+		self._messages = messages
+
+		record = {
+			'v': SERIALIZATION_VERSION,
+			'history_item': encode_agent_history(history_item),
+			'state': {
+				**state.model_dump(mode='json', exclude={'history', 'message_manager_state'}),
+				'message_manager_state': message_manager_state,
+			},
+		}
+		line = orjson.dumps(record, default=json_default) + b'\n'
+		if self._thread is None:
+			self._thread = threading.Thread(target=self._write_records, name='step-log-writer', daemon=True)
+			self._thread.start()
+		self._queue.put(line)
+
+	async def flush(self) -> None:
+		"""Wait until all queued steps are on disk"""
+		if self._thread is not None:
+			await asyncio.to_thread(self._queue.join)
+
+	def close(self) -> None:
+		"""Write the queued steps and stop the writer thread"""
+		if self._thread is not None:
+			self._queue.put(None)
+			self._thread.join()
+			self._thread = None
+
+	def _write_records(self) -> None:
+		self._truncate_partial_line()
+		with open(self.path, 'ab') as f:
+			while True:
+				line = self._queue.get()
+				try:
+					if line is None:
+						return
+					f.write(line)
+					f.flush()
+					os.fsync(f.fileno())
+				except Exception as e:
+					logger.error(f'Failed to write step to {self.path}: {e}')
+				finally:
+					self._queue.task_done()
+
+	def _truncate_partial_line(self) -> None:
+		"""Drop a step that was cut off by a crash, so the next step starts on its own line"""
+		if not self.path.exists():
+			return
+		with open(self.path, 'rb+') as f:
+			data = f.read()
+			if data and not data.endswith(b'\n'):
+				f.truncate(data.rfind(b'\n') + 1)
+
+	@staticmethod
+	def read(path: str | Path) -> list[dict[str, Any]]:
+		"""Records of the log, a last line cut off by a crash is ignored"""
+		records = []
+		with open(path, 'rb') as f:
+			for line_number, line in enumerate(f, 1):
+				if not line.strip():
+					continue
+				try:
+					records.append(orjson.loads(line))
+				except orjson.JSONDecodeError:
+					logger.warning(f'Ignoring incomplete step {line_number} of {path}')
+					break
+		return records
+
+	@staticmethod
+	def load_state(path: str | Path, output_model: type[AgentOutput]) -> AgentState:
+		"""Agent state after the last completed step of the log, incl. the history of all steps"""
+		from browser_use.agent.views import AgentHistoryList, AgentState
+
+		records = StepLog.read(path)
+		if not records:
+			raise ValueError(f'No completed steps in {path}')
+
+		if records[-1].get('v') is None:
+			# written before the log used browser_use.agent.serialization
+			history = AgentHistoryList.from_dict({'history': [r['history_item'] for r in records]}, output_model)
+			return AgentState.model_validate({**records[-1]['state'], 'history': history, 'paused': False, 'stopped': False})
+
+		history = AgentHistoryList(history=[decode_agent_history(r['history_item'], output_model) for r in records])
+		state = records[-1]['state']
+		message_manager_state = decode_message_manager_state(
+			{**state['message_manager_state'], 'messages': _replay_messages(records)}
+		)
+		return AgentState.model_validate(
+			{**state, 'message_manager_state': message_manager_state, 'history': history, 'paused': False, 'stopped': False}
+		)
+
+
+def _common_prefix_length(previous: list[bytes], current: list[bytes]) -> int:
+	length = 0
+	for a, b in zip(previous, current):
+		if a != b:
+			break
+		length += 1
+	return length
+
+
+def _replay_messages(records: list[dict[str, Any]]) -> list[list[Any]]:
+	"""Encoded messages after the last record, applying the changes of each record to the last full history"""
+	messages: list[list[Any]] = []
+	for record in records:
+		message_manager_state = record['state']['message_manager_state']
+		if 'messages' in message_manager_state:
+			messages = message_manager_state['messages']
+		else:
+			messages = messages[: message_manager_state['kept_messages']] + message_manager_state['new_messages']
+	return messages
@@ -0,0 +1,4 @@
+from browser_use.agent.trajectory_cache.service import TrajectoryCache
+from browser_use.agent.trajectory_cache.views import CachedStep, TrajectoryCacheConfig
+
+__all__ = ['CachedStep', 'TrajectoryCache', 'TrajectoryCacheConfig']
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+from browser_use.agent.trajectory_cache.views import CachedStep, TrajectoryCacheConfig, TrajectoryCacheData
+from browser_use.agent.views import ActionResult, AgentHistory, AgentOutput
+from browser_use.browser.views import BrowserState
+from browser_use.dom.clickable_element_processor.service import ClickableElementProcessor
+
+logger = logging.getLogger(__name__)
+
+# Path segments with digits are ids (/orders/1234, /reports/2024-05), they are the same page for the cache
+ID_SEGMENT = re.compile(r'[^/]*\d[^/]*')
+
+# Actions whose arguments are specific to a run, a step containing them is never reused
+UNCACHEABLE_ACTIONS = {'done'}
+
+
+class TrajectoryCache:
+	"""
+	Cache of the actions that solved a page, to skip the model call when a routine workflow visits the page again.
+
+	Pages are identified by a structural fingerprint: the URL pattern and the set of hashes of the interactive
+	elements (tag path, attributes and xpath, see ClickableElementProcessor). Entries are grouped by task family, e.g.
+	"login to the portal", so different tasks on the same page do not share actions.
+
+	A page is only answered from the cache after the same actions succeeded `min_successes` times in a row on it. A
+	different answer from the model resets the count, and a failed replay removes the entry.
+
+	Changes are written to the file in the background on a worker thread, changes made while a write is running are
+	batched into the next one. flush() waits until everything is on disk.
+	"""
+
+	def __init__(self, config: TrajectoryCacheConfig | None = None):
+		self.config = config or TrajectoryCacheConfig()
+		self._data = TrajectoryCacheData()
+		self._dirty = False
+		self._save_task: asyncio.Task[None] | None = None
+		self._save_lock = asyncio.Lock()
+		if self.config.path and Path(self.config.path).exists():
+			self._data = TrajectoryCacheData.model_validate_json(Path(self.config.path).read_text(encoding='utf-8'))
+
+	def lookup(self, task_family: str, state: BrowserState) -> CachedStep | None:
+		"""Cached step for the page, if it is confident enough to be reused"""
+		step = self._data.steps.get(self.page_key(task_family, state))
+		if step is None or step.successes < self.config.min_successes:
+			return None
+		step.last_used_at = time.time()
+		self._changed()  # keep the recency for the eviction
+		return step
+
+	def record(self, task_family: str, state: BrowserState, model_output: AgentOutput, result: list[ActionResult]) -> None:
+		"""Count a step that ran on the page, only successful steps with reusable actions are kept"""
+		key = self.page_key(task_family, state)
+		actions = [action.model_dump(exclude_unset=True) for action in model_output.action]
+		if any(r.error for r in result) or any(name in UNCACHEABLE_ACTIONS for a in actions for name in a):
+			self.invalidate(task_family, state)
+			return
+
+		step = self._data.steps.get(key)
+		if step is None or _without_indices(step.actions) != _without_indices(actions):
+			step = CachedStep(
+				task_family=task_family,
+				url_pattern=self.url_pattern(state.url),
+				current_state=model_output.current_state,
+				actions=actions,
+				interacted_element=AgentHistory.get_interacted_element(model_output, state.selector_map),
+			)
+			self._data.steps[key] = step
+		# keep the latest indices, a replay is re-targeted from the interacted elements anyway
+		step.actions = actions
+		step.successes += 1
+		step.last_used_at = time.time()
+
+		if len(self._data.steps) > self.config.max_entries:
+			oldest_key = min(self._data.steps, key=lambda k: self._data.steps[k].last_used_at)
+			del self._data.steps[oldest_key]
+		self._changed()
+
+	def invalidate(self, task_family: str, state: BrowserState) -> None:
+		"""Forget the page, its cached actions did not work (anymore)"""
+		if self._data.steps.pop(self.page_key(task_family, state), None) is not None:
+			logger.debug(f'🗑️ Removed cached actions for {self.url_pattern(state.url)}')
+			self._changed()
+
+	def save(self) -> None:
+		"""Write the cache to its file, blocking"""
+		if not self.config.path:
+			return
+		self._dirty = False
+		self._write(self._data.model_dump_json())
+
+	async def flush(self) -> None:
+		"""Write the pending changes to the file on a worker thread, off the event loop"""
+		async with self._save_lock:
+			while self._dirty:
+				self._dirty = False
+				data = self._data.model_dump_json()
+				try:
+					await asyncio.to_thread(self._write, data)
+				except Exception as e:
+					logger.error(f'Failed to save the trajectory cache to {self.config.path}: {e}')
+
+	def _changed(self) -> None:
+		if not self.config.path:
+			return
+		self._dirty = True
+		try:
+			loop = asyncio.get_running_loop()
+		except RuntimeError:
+			self.save()  # no event loop to write in the background
+			return
+		if self._save_task is None or self._save_task.done():
+			self._save_task = loop.create_task(self.flush())
+
+	def _write(self, data: str) -> None:
+		assert self.config.path is not None
+		path = Path(self.config.path)
+		path.parent.mkdir(parents=True, exist_ok=True)
+		tmp_path = path.with_suffix(path.suffix + '.tmp')
+		tmp_path.write_text(data, encoding='utf-8')
+		tmp_path.replace(path)
+
+	def __len__(self) -> int:
+		return len(self._data.steps)
+
+	@staticmethod
+	def page_key(task_family: str, state: BrowserState) -> str:
+		element_hashes = sorted(ClickableElementProcessor.get_clickable_elements_hashes(state.element_tree))
+		fingerprint = '\n'.join([task_family, TrajectoryCache.url_pattern(state.url), *element_hashes])
+		return hashlib.sha256(fingerprint.encode()).hexdigest()
+
+	@staticmethod
+	def url_pattern(url: str) -> str:
+		"""Host and path without query, fragment and id-like path segments"""
+		parsed = urlparse(url)
+		return f'{parsed.netloc}{ID_SEGMENT.sub("*", parsed.path)}'
+
+
+def _without_indices(actions: list[dict]) -> list[dict]:
+	"""Actions compared by what they do, the same element can have another index on a new visit"""
+	return [
+		{name: {k: v for k, v in params.items() if k != 'index'} if isinstance(params, dict) else params}
+		for action in actions
+		for name, params in action.items()
+	]
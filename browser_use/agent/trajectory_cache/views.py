@@ -0,0 +1,39 @@
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from browser_use.agent.views import AgentBrain
+from browser_use.dom.history_tree_processor.view import DOMHistoryElement
+
+
+class TrajectoryCacheConfig(BaseModel):
+	"""Configuration for reusing actions on pages the agent has already solved"""
+
+	# JSON file the cache is persisted to, None keeps it in memory
+	path: str | None = None
+
+	# The cached actions of a page are only reused after they succeeded this many times in a row
+	min_successes: int = Field(default=2, ge=1)
+
+	# The least recently used pages are evicted beyond this size
+	max_entries: int = Field(default=1000, gt=0)
+
+
+class CachedStep(BaseModel):
+	"""Actions that solved a page, with the elements they interacted with"""
+
+	model_config = ConfigDict(arbitrary_types_allowed=True)
+
+	task_family: str
+	url_pattern: str
+	current_state: AgentBrain
+	actions: list[dict[str, Any]]
+	interacted_element: list[DOMHistoryElement | None]
+	successes: int = 0
+	last_used_at: float = 0.0
+
+
+class TrajectoryCacheData(BaseModel):
+	"""Content of the cache file, steps by page key"""
+
+	steps: dict[str, CachedStep] = {}
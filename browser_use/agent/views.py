@@ -3,16 +3,19 @@ from __future__ import annotations
 import json
 import traceback
 import uuid
+from collections.abc import Iterator, Sequence
 from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
-from typing import Any, Literal
+from typing import Any, Literal, TypeVar, overload
 
 from langchain_core.language_models.chat_models import BaseChatModel
 from openai import RateLimitError
-from pydantic import BaseModel, ConfigDict, Field, ValidationError, create_model
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, ValidationError, create_model
 
 from browser_use.agent.message_manager.views import MessageManagerState
 from browser_use.agent.playwright_script_generator import PlaywrightScriptGenerator
+from browser_use.agent.profiler import ProfilerMode
 from browser_use.browser.browser import BrowserConfig
 from browser_use.browser.context import BrowserContextConfig
 from browser_use.browser.views import BrowserStateHistory
@@ -23,6 +26,8 @@ from browser_use.dom.history_tree_processor.service import (
 	HistoryTreeProcessor,
 )
 from browser_use.dom.views import SelectorMap
+from browser_use.tracing.service import to_chrome_trace, to_otlp
+from browser_use.tracing.views import Span
 
 ToolCallingMethod = Literal['function_calling', 'json_mode', 'raw', 'auto', 'tools']
 REQUIRED_LLM_API_ENV_VARS = {
@@ -37,6 +42,27 @@ REQUIRED_LLM_API_ENV_VARS = {
 }
 
 
+class HedgingPolicy(BaseModel):
+	"""When to send a duplicate model request because the first one is slower than usual"""
+
+	# hedge once a call takes longer than this percentile of the recent model latencies
+	latency_percentile: float = Field(default=95, gt=0, le=100)
+	latency_window: int = Field(default=50, gt=0)
+	# no hedging until this many latencies were measured
+	min_samples: int = Field(default=5, ge=1)
+	min_delay_seconds: float = Field(default=1.0, ge=0)
+	# model for the duplicate request (uses the same tool calling method), the agent's model if None
+	fallback_llm: BaseChatModel | None = None
+
+
+class HedgeDecision(BaseModel):
+	"""How a hedged model call was resolved"""
+
+	delay_seconds: float | None  # None if there were not enough latency samples to hedge yet
+	hedged: bool  # a duplicate request was sent
+	winner: Literal['primary', 'hedge']
+
+
 class AgentSettings(BaseModel):
 	"""Options for the agent"""
 
@@ -47,6 +73,17 @@ class AgentSettings(BaseModel):
 	max_failures: int = 3
 	retry_delay: int = 10
 	max_input_tokens: int = 128000
+	cache_friendly_prompt: bool = False
+	compact_unchanged_elements: bool = False  # Collapse elements unchanged since the previous step in the state message
+	fold_repeated_elements: int | None = None  # Show only the first N items of repeated lists (results, rows) in full
+	element_token_budget: int | None = None  # Fill the element list from the viewport outwards up to this many tokens
+	vision_image_tokens: int | None = None  # Send a downscaled screenshot and crops of new elements in this many tokens
+	stream_actions: bool = False  # Execute actions while the model output is still streaming
+	llm_priority: int = 0  # Priority of this agent's calls in a shared LLM gateway, lower values are served first
+	hedging_policy: HedgingPolicy | None = None
+	record_spans: bool = False  # Record timing spans of each step in StepMetadata.spans
+	profile_steps: ProfilerMode | None = None  # Profile each step, files are written next to save_conversation_path
+	task_family: str | None = None  # Pages solved by tasks of the same family share cached actions, defaults to the task
 	validate_output: bool = False
 	message_context: str | None = None
 	generate_gif: bool | str = False
@@ -123,6 +160,10 @@ class StepMetadata(BaseModel):
 	step_end_time: float
 	input_tokens: int  # Approximate tokens from message manager for this step
 	step_number: int
+	stable_prefix_tokens: int = 0  # Input tokens unchanged since the previous step (reusable from the provider's prompt cache)
+	hedge: HedgeDecision | None = None  # Set if the model call was made with a hedging policy
+	from_trajectory_cache: bool = False  # The actions were reused from the trajectory cache, the model was not called
+	spans: list[Span] = []  # Nested timings of the step, if the agent records spans
 
 	@property
 	def duration_seconds(self) -> float:
@@ -211,18 +252,122 @@ class AgentHistory(BaseModel):
 		}
 
 
+T = TypeVar('T')
+
+
+class _ListView(Sequence[T]):
+	"""Read-only view of the first items of an append-only list, returned by the history accessors instead of a copy"""
+
+	__slots__ = ('_items', '_length')
+
+	def __init__(self, items: list[T]):
+		self._items = items
+		self._length = len(items)
+
+	def __len__(self) -> int:
+		return self._length
+
+	@overload
+	def __getitem__(self, index: int) -> T: ...
+
+	@overload
+	def __getitem__(self, index: slice) -> list[T]: ...
+
+	def __getitem__(self, index: int | slice) -> T | list[T]:
+		if isinstance(index, slice):
+			return self._items[: self._length][index]
+		if not -self._length <= index < self._length:
+			raise IndexError('list view index out of range')
+		return self._items[index if index >= 0 else self._length + index]
+
+	def __iter__(self) -> Iterator[T]:
+		return islice(self._items, self._length)
+
+	def __eq__(self, other: object) -> bool:
+		# compares like the lists the accessors used to return
+		if not isinstance(other, (list, tuple, _ListView)):
+			return NotImplemented
+		return len(other) == self._length and all(a == b for a, b in zip(self, other))
+
+	__hash__ = None  # type: ignore[assignment]
+
+	def __repr__(self) -> str:
+		return repr(self._items[: self._length])
+
+
+class _HistoryAggregates:
+	"""Running aggregates over the first `count` items of a history list"""
+
+	def __init__(self, history: list[AgentHistory]):
+		self.history = history
+		self.count = 0
+		self.duration_seconds = 0.0
+		self.input_tokens = 0
+		self.errors: list[str | None] = []
+		self.error_count = 0
+		self.urls: list[str | None] = []
+		self.action_names: list[str] = []
+		self.extracted_content: list[str] = []
+
+	def add(self, h: AgentHistory) -> None:
+		self.count += 1
+		if h.metadata:
+			self.duration_seconds += h.metadata.duration_seconds
+			self.input_tokens += h.metadata.input_tokens
+		error = _step_error(h)
+		self.errors.append(error)
+		self.error_count += error is not None
+		self.urls.append(h.state.url)
+		if h.model_output:
+			for action, _ in zip(h.model_output.action, h.state.interacted_element):
+				action_name = next(iter(action.model_dump(exclude_none=True)), None)
+				if action_name:
+					self.action_names.append(action_name)
+		self.extracted_content.extend(r.extracted_content for r in h.result if r.extracted_content)
+
+
+def _step_error(h: AgentHistory) -> str | None:
+	# each step can have only one error
+	return next((r.error for r in h.result if r.error), None)
+
+
+class AgentHistoryDelta(BaseModel):
+	"""History items appended since a step, e.g. for live monitoring: poll changes_since(delta.end) next"""
+
+	start: int
+	end: int
+	items: list[AgentHistory]
+	input_tokens: int
+	duration_seconds: float
+	errors: list[str | None]
+	is_done: bool
+
+
 class AgentHistoryList(BaseModel):
-	"""List of agent history items"""
+	"""
+	List of agent history items
+
+	The aggregates (totals, errors, urls, ...) are kept up to date with the items appended to `history` since the
+	last call, instead of scanning all steps each time. Items are not expected to change once appended.
+	errors(), urls(), action_names() and extracted_content() return read-only views of the steps so far, not copies.
+	"""
 
 	history: list[AgentHistory]
 
+	_aggregates: _HistoryAggregates | None = PrivateAttr(default=None)
+
+	def _updated_aggregates(self) -> _HistoryAggregates:
+		aggregates = self._aggregates
+		# start over if the list was replaced or truncated
+		if aggregates is None or aggregates.history is not self.history or aggregates.count > len(self.history):
+			aggregates = self._aggregates = _HistoryAggregates(self.history)
+		for i in range(aggregates.count, len(self.history)):
+			aggregates.add(self.history[i])
+		return aggregates
+
 	def total_duration_seconds(self) -> float:
 		"""Get total duration of all steps in seconds"""
-		total = 0.0
-		for h in self.history:
-			if h.metadata:
-				total += h.metadata.duration_seconds
-		return total
+		return self._updated_aggregates().duration_seconds
 
 	def total_input_tokens(self) -> int:
 		"""
@@ -230,11 +375,20 @@ class AgentHistoryList(BaseModel):
 		Note: These are from the approximate token counting of the message manager.
 		For accurate token counting, use tools like LangChain Smith or OpenAI's token counters.
 		"""
-		total = 0
-		for h in self.history:
-			if h.metadata:
-				total += h.metadata.input_tokens
-		return total
+		return self._updated_aggregates().input_tokens
+
+	def changes_since(self, step: int) -> AgentHistoryDelta:
+		"""Items appended after the first `step` items, with their totals"""
+		items = self.history[step:]
+		return AgentHistoryDelta(
+			start=step,
+			end=step + len(items),
+			items=items,
+			input_tokens=sum(h.metadata.input_tokens for h in items if h.metadata),
+			duration_seconds=sum(h.metadata.duration_seconds for h in items if h.metadata),
+			errors=[_step_error(h) for h in items],
+			is_done=self.is_done(),
+		)
 
 	def input_token_usage(self) -> list[int]:
 		"""Get token usage for each step"""
@@ -258,6 +412,14 @@ class AgentHistoryList(BaseModel):
 		except Exception as e:
 			raise e
 
+	def save_trace(self, filepath: str | Path, format: Literal['chrome', 'otlp'] = 'chrome') -> None:
+		"""Save the step timing spans (recorded with Agent(record_spans=True)) as Chrome trace or OTLP JSON"""
+		spans = [span for h in self.history if h.metadata for span in h.metadata.spans]
+		data = to_chrome_trace(spans) if format == 'chrome' else to_otlp(spans)
+		Path(filepath).parent.mkdir(parents=True, exist_ok=True)
+		with open(filepath, 'w', encoding='utf-8') as f:
+			json.dump(data, f)
+
 	def save_as_playwright_script(
 		self,
 		output_path: str | Path,
@@ -298,6 +460,11 @@ class AgentHistoryList(BaseModel):
 		"""Load history from JSON file"""
 		with open(filepath, encoding='utf-8') as f:
 			data = json.load(f)
+		return cls.from_dict(data, output_model)
+
+	@classmethod
+	def from_dict(cls, data: dict[str, Any], output_model: type[AgentOutput]) -> AgentHistoryList:
+		"""Load history from its model_dump()"""
 		# loop through history and validate output_model actions to enrich with custom actions
 		for h in data['history']:
 			if h['model_output']:
@@ -316,15 +483,9 @@ class AgentHistoryList(BaseModel):
 			return self.history[-1].model_output.action[-1].model_dump(exclude_none=True)
 		return None
 
-	def errors(self) -> list[str | None]:
+	def errors(self) -> Sequence[str | None]:
 		"""Get all errors from history, with None for steps without errors"""
-		errors = []
-		for h in self.history:
-			step_errors = [r.error for r in h.result if r.error]
-
-			# each step can have only one error
-			errors.append(step_errors[0] if step_errors else None)
-		return errors
+		return _ListView(self._updated_aggregates().errors)
 
 	def final_result(self) -> None | str:
 		"""Final result from history"""
@@ -349,24 +510,19 @@ class AgentHistoryList(BaseModel):
 
 	def has_errors(self) -> bool:
 		"""Check if the agent has any non-None errors"""
-		return any(error is not None for error in self.errors())
+		return self._updated_aggregates().error_count > 0
 
-	def urls(self) -> list[str | None]:
+	def urls(self) -> Sequence[str | None]:
 		"""Get all unique URLs from history"""
-		return [h.state.url if h.state.url is not None else None for h in self.history]
+		return _ListView(self._updated_aggregates().urls)
 
 	def screenshots(self) -> list[str | None]:
 		"""Get all screenshots from history"""
-		return [h.state.screenshot if h.state.screenshot is not None else None for h in self.history]
+		return [h.state.get_screenshot() for h in self.history]
 
-	def action_names(self) -> list[str]:
+	def action_names(self) -> Sequence[str]:
 		"""Get all action names from history"""
-		action_names = []
-		for action in self.model_actions():
-			actions = list(action.keys())
-			if actions:
-				action_names.append(actions[0])
-		return action_names
+		return _ListView(self._updated_aggregates().action_names)
 
 	def model_thoughts(self) -> list[AgentBrain]:
 		"""Get all thoughts from history"""
@@ -396,12 +552,9 @@ class AgentHistoryList(BaseModel):
 			results.extend([r for r in h.result if r])
 		return results
 
-	def extracted_content(self) -> list[str]:
+	def extracted_content(self) -> Sequence[str]:
 		"""Get all extracted content from history"""
-		content = []
-		for h in self.history:
-			content.extend([r.extracted_content for r in h.result if r.extracted_content])
-		return content
+		return _ListView(self._updated_aggregates().extracted_content)
 
 	def model_actions_filtered(self, include: list[str] | None = None) -> list[dict]:
 		"""Get all model actions from history as JSON"""
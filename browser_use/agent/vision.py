@@ -0,0 +1,133 @@
+"""
+Screenshots for the LLM within an image token budget: a downscaled overview of the viewport, plus crops at full
+resolution around the interactive elements that are new since the previous step.
+"""
+
+from __future__ import annotations
+
+import base64
+import io
+import math
+import struct
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from browser_use.dom.clickable_element_processor.service import ClickableElementProcessor
+
+if TYPE_CHECKING:
+	from PIL.Image import Image
+
+	from browser_use.dom.views import DOMElementNode
+
+# Image tokens ~= width * height / 750 (Anthropic's estimate, OpenAI's tile based count is in the same range)
+PIXELS_PER_TOKEN = 750
+CROP_PADDING = 48  # css pixels around an element
+MIN_CROP_TOKENS = 100  # crops that would have to be scaled down further are left out
+
+
+@dataclass
+class ScreenshotImage:
+	label: str
+	data: str  # base64 png
+	width: int
+	height: int
+
+	@property
+	def tokens(self) -> int:
+		return estimate_image_tokens(self.width, self.height)
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+	return math.ceil(width * height / PIXELS_PER_TOKEN)
+
+
+def png_size(data: str) -> tuple[int, int] | None:
+	"""Width and height of a base64 png (or a data url of one) from its header, without decoding the image"""
+	if data.startswith('data:'):
+		data = data.partition(',')[2]
+	try:
+		header = base64.b64decode(data[:32])
+	except ValueError:
+		return None
+	if header[:8] != b'\x89PNG\r\n\x1a\n' or header[12:16] != b'IHDR':
+		return None
+	return struct.unpack('>II', header[16:24])
+
+
+def screenshot_images(screenshot: str, element_tree: DOMElementNode, token_budget: int) -> list[ScreenshotImage]:
+	"""
+	Split the screenshot into an overview and crops around new elements that fit in token_budget together.
+
+	The overview gets half of the budget if there are new elements to crop, the whole budget otherwise. Crops of
+	overlapping elements are merged, they are only scaled down if they do not fit the rest of the budget.
+	"""
+	from PIL import Image
+
+	image = Image.open(io.BytesIO(base64.b64decode(screenshot)))
+	viewport = element_tree.viewport_info
+	scale = image.width / viewport.width if viewport and viewport.width else 1.0
+	crop_boxes = _crop_boxes(element_tree, scale, image.width, image.height)
+
+	overview = _fit_to_tokens(image, token_budget // 2 if crop_boxes else token_budget)
+	images = [_to_screenshot_image('Screenshot of the viewport:', overview)]
+	remaining = token_budget - images[0].tokens
+	for box, indices in crop_boxes:
+		crop = image.crop(box)
+		if estimate_image_tokens(crop.width, crop.height) > remaining:
+			if remaining < MIN_CROP_TOKENS:
+				break
+			crop = _fit_to_tokens(crop, remaining)
+		label = 'Close-up of the new elements ' + ', '.join(f'[{index}]' for index in indices) + ':'
+		images.append(_to_screenshot_image(label, crop))
+		remaining -= images[-1].tokens
+	return images
+
+
+def _crop_boxes(
+	element_tree: DOMElementNode, scale: float, image_width: int, image_height: int
+) -> list[tuple[tuple[int, int, int, int], list[int]]]:
+	"""Boxes in screenshot pixels around the new elements in the viewport, overlapping boxes merged"""
+	boxes: list[tuple[tuple[int, int, int, int], list[int]]] = []
+	for element in ClickableElementProcessor.get_clickable_elements(element_tree):
+		coordinates = element.viewport_coordinates
+		if not element.is_new or coordinates is None or element.highlight_index is None:
+			continue
+		box = (
+			max(0, int((coordinates.top_left.x - CROP_PADDING) * scale)),
+			max(0, int((coordinates.top_left.y - CROP_PADDING) * scale)),
+			min(image_width, int((coordinates.bottom_right.x + CROP_PADDING) * scale)),
+			min(image_height, int((coordinates.bottom_right.y + CROP_PADDING) * scale)),
+		)
+		if box[0] >= box[2] or box[1] >= box[3]:
+			continue  # outside the viewport
+		indices = [element.highlight_index]
+		# merge with every box it overlaps, the merged box can overlap further boxes
+		merged = True
+		while merged:
+			merged = False
+			for other in boxes:
+				if _overlaps(box, other[0]):
+					boxes.remove(other)
+					box = (min(box[0], other[0][0]), min(box[1], other[0][1]), max(box[2], other[0][2]), max(box[3], other[0][3]))
+					indices = sorted(indices + other[1])
+					merged = True
+					break
+		boxes.append((box, indices))
+	return sorted(boxes, key=lambda item: item[1][0])
+
+
+def _overlaps(a: tuple[int, int, int, int], b: tuple[int, int, int, int]) -> bool:
+	return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _fit_to_tokens(image: Image, max_tokens: int) -> Image:
+	if estimate_image_tokens(image.width, image.height) <= max_tokens:
+		return image
+	factor = math.sqrt(max_tokens * PIXELS_PER_TOKEN / (image.width * image.height))
+	return image.resize((max(1, int(image.width * factor)), max(1, int(image.height * factor))))
+
+
+def _to_screenshot_image(label: str, image: Image) -> ScreenshotImage:
+	output = io.BytesIO()
+	image.save(output, format='PNG')
+	return ScreenshotImage(label, base64.b64encode(output.getvalue()).decode(), image.width, image.height)
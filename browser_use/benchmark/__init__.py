@@ -0,0 +1,15 @@
+from browser_use.benchmark.fake_llm import ScriptedChatModel
+from browser_use.benchmark.fixture_server import FixtureServer, generate_page
+from browser_use.benchmark.service import run_serialization_benchmark, run_step_benchmark
+from browser_use.benchmark.views import BenchmarkConfig, BenchmarkReport, TimingStats
+
+__all__ = [
+	'BenchmarkConfig',
+	'BenchmarkReport',
+	'FixtureServer',
+	'ScriptedChatModel',
+	'TimingStats',
+	'generate_page',
+	'run_serialization_benchmark',
+	'run_step_benchmark',
+]
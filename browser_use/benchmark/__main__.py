@@ -0,0 +1,65 @@
+"""
+Offline benchmark of the framework overhead per agent step, no LLM and no internet needed.
+
+python -m browser_use.benchmark --nodes 10000 50000 --steps 10 --save benchmark.json
+python -m browser_use.benchmark --baseline benchmark.json  # exits with 1 if a phase got slower
+python -m browser_use.benchmark --serialization --steps 200  # saving and loading agent state, no browser
+"""
+
+import argparse
+import asyncio
+import sys
+
+from browser_use.benchmark.service import run_serialization_benchmark, run_step_benchmark
+from browser_use.benchmark.views import BenchmarkConfig, BenchmarkReport
+
+
+def main() -> int:
+	parser = argparse.ArgumentParser(description='Measure the framework overhead per agent step on synthetic pages')
+	parser.add_argument('--nodes', type=int, nargs='+', default=[10_000, 50_000, 200_000], help='Elements per page')
+	parser.add_argument('--iframes', type=int, default=2, help='Iframes per page')
+	parser.add_argument('--shadow-roots', type=int, default=10, help='Shadow roots per page')
+	parser.add_argument('--steps', type=int, default=5, help='Measured steps per page')
+	parser.add_argument('--warmup-steps', type=int, default=1, help='Steps before measuring')
+	parser.add_argument('--no-headless', action='store_true', help='Show the browser')
+	parser.add_argument('--save', help='Write the report to this JSON file (e.g. as new baseline)')
+	parser.add_argument('--baseline', help='Compare against the report in this JSON file')
+	parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative slowdown against the baseline')
+	parser.add_argument('--serialization', action='store_true', help='Benchmark saving and loading the state of --steps steps')
+	args = parser.parse_args()
+
+	if args.serialization:
+		timings = run_serialization_benchmark(steps=args.steps)
+		print(f'{"case":<48} {"p50 ms":>10} {"p95 ms":>10}')
+		for key, stats in timings.items():
+			print(f'{key:<48} {stats.p50 * 1000:>10.1f} {stats.p95 * 1000:>10.1f}')
+		return 0
+
+	config = BenchmarkConfig(
+		page_nodes=args.nodes,
+		iframes=args.iframes,
+		shadow_roots=args.shadow_roots,
+		steps=args.steps,
+		warmup_steps=args.warmup_steps,
+		headless=not args.no_headless,
+	)
+	report = asyncio.run(run_step_benchmark(config))
+
+	print(f'{"phase":<32} {"p50 ms":>10} {"p95 ms":>10}')
+	for key, stats in report.timings.items():
+		print(f'{key:<32} {stats.p50 * 1000:>10.1f} {stats.p95 * 1000:>10.1f}')
+
+	if args.save:
+		report.save(args.save)
+	if args.baseline:
+		regressions = report.compare(BenchmarkReport.load(args.baseline), tolerance=args.tolerance)
+		for regression in regressions:
+			print(f'❌ Regression: {regression}')
+		if regressions:
+			return 1
+		print('✅ No regressions against the baseline')
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
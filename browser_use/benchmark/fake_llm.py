@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from langchain_core.language_models import LanguageModelInput
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import BaseModel
+
+DONE_OUTPUT = {
+	'current_state': {'evaluation_previous_goal': 'Success', 'memory': '', 'next_goal': 'Finish the task'},
+	'action': [{'done': {'text': 'Scripted run finished', 'success': True}}],
+}
+
+
+class ScriptedChatModel(BaseChatModel):
+	"""
+	Chat model that answers with canned agent outputs, in order, without any network call.
+
+	Each output is an AgentOutput or its dict form, returned as JSON text or, when tools are bound (function calling and
+	structured output), as a call of the first bound tool. Once the script is exhausted it answers with a done action.
+	Use it to run the agent offline, e.g. to measure the framework overhead of a step.
+	"""
+
+	outputs: list[dict[str, Any]]
+	latency_seconds: float = 0.0  # simulated time to answer, only for async calls
+	calls: int = 0
+
+	def model_post_init(self, __context: Any) -> None:
+		# nothing to verify, skip the connection test of the agent
+		object.__setattr__(self, '_verified_api_keys', True)
+
+	@classmethod
+	def from_outputs(cls, outputs: Sequence[BaseModel | dict[str, Any]], **kwargs: Any) -> ScriptedChatModel:
+		dumped = [o.model_dump(exclude_unset=True) if isinstance(o, BaseModel) else o for o in outputs]
+		return cls(outputs=dumped, **kwargs)
+
+	@property
+	def _llm_type(self) -> str:
+		return 'scripted'
+
+	def _generate(
+		self,
+		messages: list[BaseMessage],
+		stop: list[str] | None = None,
+		run_manager: Any = None,
+		**kwargs: Any,
+	) -> ChatResult:
+		output = self.outputs[self.calls] if self.calls < len(self.outputs) else DONE_OUTPUT
+		self.calls += 1
+
+		tools = kwargs.get('tools')
+		if tools:
+			tool_call = {'name': tools[0]['function']['name'], 'args': output, 'id': f'call_{self.calls}', 'type': 'tool_call'}
+			message = AIMessage(content='', tool_calls=[tool_call])
+		else:
+			message = AIMessage(content=json.dumps(output))
+		return ChatResult(generations=[ChatGeneration(message=message)])
+
+	async def _agenerate(
+		self,
+		messages: list[BaseMessage],
+		stop: list[str] | None = None,
+		run_manager: Any = None,
+		**kwargs: Any,
+	) -> ChatResult:
+		if self.latency_seconds:
+			await asyncio.sleep(self.latency_seconds)
+		return self._generate(messages, stop=stop, **kwargs)
+
+	def bind_tools(
+		self,
+		tools: Sequence[dict[str, Any] | type | Callable | BaseTool],
+		*,
+		tool_choice: str | None = None,
+		**kwargs: Any,
+	) -> Runnable[LanguageModelInput, BaseMessage]:
+		return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], tool_choice=tool_choice, **kwargs)
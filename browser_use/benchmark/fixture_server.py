@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+# Every row of a synthetic page has this many elements
+ROW_ELEMENTS = 5
+
+
+def generate_page(
+	nodes: int, iframes: int = 0, shadow_roots: int = 0, interactive_every: int = 5, iframe_nodes: int = 500
+) -> str:
+	"""
+	Synthetic page with about `nodes` elements, in rows of 5 elements where every `interactive_every`-th row has a link,
+	a button and an input. `iframes` frames of `iframe_nodes` elements each are served by the same fixture server, and
+	`shadow_roots` open shadow roots with one interactive row each are attached by a script.
+	"""
+	rows = []
+	for i in range(max(1, nodes // ROW_ELEMENTS)):
+		if i % interactive_every == 0:
+			rows.append(
+				f'<div class="row"><span>Item {i}</span><a href="#item-{i}">Open {i}</a>'
+				f'<button type="button">Select {i}</button><input name="field-{i}" placeholder="Value {i}"></div>'
+			)
+		else:
+			rows.append(f'<div class="row"><p><span>Row {i}</span> <em>lorem ipsum</em> <b>{i}</b></p></div>')
+
+	frames = [
+		f'<iframe title="frame-{i}" src="/page?{urlencode({"nodes": iframe_nodes})}" width="400" height="200"></iframe>'
+		for i in range(iframes)
+	]
+	shadow_hosts = '<div class="shadow-host"></div>' * shadow_roots
+	shadow_script = (
+		'<script>document.querySelectorAll(".shadow-host").forEach((host, i) => {'
+		'host.attachShadow({mode: "open"}).innerHTML = '
+		'`<div class="row"><span>Shadow ${i}</span><a href="#shadow-${i}">Open</a>'
+		'<button type="button">Select</button><input name="shadow-${i}"></div>`;});</script>'
+		if shadow_roots
+		else ''
+	)
+	return (
+		f'<!DOCTYPE html><html><head><title>Fixture {nodes} nodes</title></head><body>'
+		f'{"".join(frames)}{shadow_hosts}{"".join(rows)}{shadow_script}</body></html>'
+	)
+
+
+class _FixtureRequestHandler(BaseHTTPRequestHandler):
+	def do_GET(self) -> None:
+		url = urlparse(self.path)
+		if url.path != '/page':
+			self.send_error(404)
+			return
+		params = {key: int(values[0]) for key, values in parse_qs(url.query).items()}
+		body = generate_page(**params).encode()
+		self.send_response(200)
+		self.send_header('Content-Type', 'text/html; charset=utf-8')
+		self.send_header('Content-Length', str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, format: str, *args) -> None:
+		pass  # keep the benchmark output clean
+
+
+class FixtureServer:
+	"""Local HTTP server for synthetic pages, runs in a background thread
+
+	with FixtureServer() as server:
+		url = server.page_url(nodes=50_000, iframes=2, shadow_roots=10)
+	"""
+
+	def __init__(self, host: str = '127.0.0.1', port: int = 0):
+		self._server = ThreadingHTTPServer((host, port), _FixtureRequestHandler)
+		self._thread: threading.Thread | None = None
+
+	@property
+	def base_url(self) -> str:
+		host, port = self._server.server_address[:2]
+		return f'http://{host}:{port}'
+
+	def page_url(self, nodes: int, iframes: int = 0, shadow_roots: int = 0, interactive_every: int = 5) -> str:
+		query = urlencode(
+			{'nodes': nodes, 'iframes': iframes, 'shadow_roots': shadow_roots, 'interactive_every': interactive_every}
+		)
+		return f'{self.base_url}/page?{query}'
+
+	def start(self) -> FixtureServer:
+		self._thread = threading.Thread(target=self._server.serve_forever, name='fixture-server', daemon=True)
+		self._thread.start()
+		return self
+
+	def stop(self) -> None:
+		self._server.shutdown()
+		self._server.server_close()
+		if self._thread is not None:
+			self._thread.join()
+
+	def __enter__(self) -> FixtureServer:
+		return self.start()
+
+	def __exit__(self, *args) -> None:
+		self.stop()
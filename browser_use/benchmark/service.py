@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import base64
+import functools
+import inspect
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from collections.abc import Callable
+from typing import Any
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from browser_use.agent import serialization
+from browser_use.agent.message_manager.views import MessageHistory, MessageManagerState, MessageMetadata
+from browser_use.agent.service import Agent
+from browser_use.agent.views import ActionResult, AgentHistory, AgentHistoryList, AgentOutput, StepMetadata
+from browser_use.benchmark.fake_llm import ScriptedChatModel
+from browser_use.benchmark.fixture_server import FixtureServer
+from browser_use.benchmark.views import BenchmarkConfig, BenchmarkReport, TimingStats
+from browser_use.browser.browser import Browser, BrowserConfig
+from browser_use.browser.views import BrowserStateHistory, TabInfo
+from browser_use.controller.service import Controller
+from browser_use.dom.history_tree_processor.view import CoordinateSet, DOMHistoryElement
+
+logger = logging.getLogger(__name__)
+
+# Scroll back and forth so every step sees a similar page
+SCRIPTED_ACTIONS = [{'scroll_down': {'amount': 300}}, {'scroll_up': {'amount': 300}}]
+
+
+class PhaseTimer:
+	"""Sums the time spent in wrapped methods per step and phase"""
+
+	def __init__(self):
+		self.samples: dict[str, list[float]] = defaultdict(list)
+		self._current: dict[str, float] = defaultdict(float)
+
+	def wrap(self, obj: Any, method_name: str, phase: str) -> None:
+		"""Replace obj.method_name by a wrapper that adds its duration to the phase"""
+		method = getattr(obj, method_name)
+
+		if inspect.iscoroutinefunction(method):
+
+			@functools.wraps(method)
+			async def timed_async(*args, **kwargs):
+				start = time.perf_counter()
+				try:
+					return await method(*args, **kwargs)
+				finally:
+					self._current[phase] += time.perf_counter() - start
+
+			setattr(obj, method_name, timed_async)
+		else:
+
+			@functools.wraps(method)
+			def timed(*args, **kwargs):
+				start = time.perf_counter()
+				try:
+					return method(*args, **kwargs)
+				finally:
+					self._current[phase] += time.perf_counter() - start
+
+			setattr(obj, method_name, timed)
+
+	def end_step(self, record: bool) -> None:
+		"""Close the current step, its phase durations become samples if record is set"""
+		if record:
+			for phase, duration in self._current.items():
+				self.samples[phase].append(duration)
+		self._current.clear()
+
+	def add(self, phase: str, duration: float) -> None:
+		self._current[phase] += duration
+
+
+async def run_step_benchmark(config: BenchmarkConfig | None = None) -> BenchmarkReport:
+	"""
+	Run agent steps against synthetic pages of the local fixture server with a scripted model, offline.
+
+	Measured phases per step: get_state (DOM extraction and screenshot), message_building (state message and prompt),
+	get_next_action (model call and output parsing, the scripted model answers instantly), multi_act and step (the
+	total framework overhead of the step).
+	"""
+	config = config or BenchmarkConfig()
+	timings: dict[str, TimingStats] = {}
+	n_steps = config.warmup_steps + config.steps
+
+	with FixtureServer() as server:
+		browser = Browser(config=BrowserConfig(headless=config.headless))
+		try:
+			for nodes in config.page_nodes:
+				url = server.page_url(nodes, config.iframes, config.shadow_roots, config.interactive_every)
+				async with await browser.new_context() as context:
+					page = await context.get_current_page()
+					await page.goto(url)
+					await page.wait_for_load_state()
+
+					llm = ScriptedChatModel.from_outputs(
+						[
+							{
+								'current_state': {'evaluation_previous_goal': 'Success', 'memory': '', 'next_goal': 'Scroll'},
+								'action': [SCRIPTED_ACTIONS[i % len(SCRIPTED_ACTIONS)]],
+							}
+							for i in range(n_steps)
+						]
+					)
+					agent = Agent(task='Benchmark', llm=llm, browser_context=context, enable_memory=False)
+
+					timer = PhaseTimer()
+					timer.wrap(context, 'get_state', 'get_state')
+					timer.wrap(agent._message_manager, 'add_state_message', 'message_building')
+					timer.wrap(agent._message_manager, 'get_messages', 'message_building')
+					timer.wrap(agent, 'get_next_action', 'get_next_action')
+					timer.wrap(agent, 'multi_act', 'multi_act')
+
+					for i in range(n_steps):
+						start = time.perf_counter()
+						await agent.step()
+						timer.add('step', time.perf_counter() - start)
+						timer.end_step(record=i >= config.warmup_steps)
+
+					for phase, samples in timer.samples.items():
+						timings[f'{nodes}/{phase}'] = TimingStats.from_samples(samples)
+					logger.info(f'⏱️ {nodes} nodes: step p50 {timings[f"{nodes}/step"].p50 * 1000:.0f}ms')
+		finally:
+			await browser.close()
+
+	return BenchmarkReport(config=config, timings=timings)
+
+
+def run_serialization_benchmark(steps: int = 100, repeat: int = 5) -> dict[str, TimingStats]:
+	"""
+	Time saving and loading the message manager state and the history of a synthetic run of `steps` steps, with the
+	current path (model_dump with langchain's dumpd per message, json) against browser_use.agent.serialization.
+
+	Keys are '<object>/<json|serialization>/<dump|load>', e.g. 'message_manager_state/serialization/load'.
+	"""
+	output_model = AgentOutput.type_with_custom_actions(Controller().registry.create_action_model())
+	message_manager_state, history = _synthetic_run(steps, output_model)
+
+	def save_history(history: AgentHistoryList) -> str:
+		return json.dumps(history.model_dump(), indent=2)  # as AgentHistoryList.save_to_file
+
+	cases: dict[str, tuple[Callable[[Any], str | bytes], Callable[[str | bytes], Any], Any]] = {
+		'message_manager_state/json': (
+			lambda state: json.dumps(state.model_dump(mode='json')),
+			lambda data: MessageManagerState.model_validate(json.loads(data)),
+			message_manager_state,
+		),
+		'message_manager_state/serialization': (serialization.dumps, serialization.loads, message_manager_state),
+		'history/json': (save_history, lambda data: AgentHistoryList.from_dict(json.loads(data), output_model), history),
+		'history/serialization': (serialization.dumps, lambda data: serialization.loads(data, output_model), history),
+	}
+
+	timings = {}
+	for key, (dump, load, obj) in cases.items():
+		dump_samples, load_samples = [], []
+		for _ in range(repeat):
+			start = time.perf_counter()
+			data = dump(obj)
+			dump_samples.append(time.perf_counter() - start)
+			start = time.perf_counter()
+			load(data)
+			load_samples.append(time.perf_counter() - start)
+		timings[f'{key}/dump'] = TimingStats.from_samples(dump_samples)
+		timings[f'{key}/load'] = TimingStats.from_samples(load_samples)
+	return timings
+
+
+def _synthetic_run(steps: int, output_model: type[AgentOutput]) -> tuple[MessageManagerState, AgentHistoryList]:
+	"""Message history and agent history as a run of `steps` navigation steps would leave them"""
+	history = MessageHistory()
+	history.add_message(
+		SystemMessage(content='You are a browser agent. ' * 200), MessageMetadata(tokens=1000, message_type='init')
+	)
+	history.add_message(HumanMessage(content='Your ultimate task is: benchmark'), MessageMetadata(tokens=10, message_type='init'))
+	items = []
+	for step in range(steps):
+		model_output = output_model.model_validate(
+			{
+				'current_state': {
+					'evaluation_previous_goal': 'Success',
+					'memory': f'Visited {step} pages. ' * 10,
+					'next_goal': '',
+				},
+				'action': [{'go_to_url': {'url': f'https://example.com/{step}'}}, {'click_element_by_index': {'index': step}}],
+			}
+		)
+		history.add_model_output(model_output)
+		history.add_message(
+			HumanMessage(content=f'Action result: extracted page {step}\n' + 'Lorem ipsum dolor sit amet. ' * 150),
+			MessageMetadata(tokens=1400),
+		)
+
+		element = DOMHistoryElement(
+			tag_name='button',
+			xpath=f'html/body/div[{step}]/button',
+			highlight_index=step,
+			entire_parent_branch_path=['html', 'body', 'div', 'button'],
+			attributes={'class': 'btn btn-primary', 'type': 'submit'},
+			viewport_coordinates=CoordinateSet.from_rect(100, 200, 80, 30),
+		)
+		items.append(
+			AgentHistory(
+				model_output=model_output,
+				result=[ActionResult(extracted_content=f'Navigated to page {step}', include_in_memory=True)],
+				state=BrowserStateHistory(
+					url=f'https://example.com/{step}',
+					title=f'Page {step}',
+					tabs=[TabInfo(page_id=0, url=f'https://example.com/{step}', title=f'Page {step}')],
+					interacted_element=[None, element],
+					screenshot=base64.b64encode(os.urandom(150_000)).decode(),  # a typical viewport png
+				),
+				metadata=StepMetadata(step_start_time=step, step_end_time=step + 1, input_tokens=5000, step_number=step + 1),
+			)
+		)
+	return MessageManagerState(history=history), AgentHistoryList(history=items)
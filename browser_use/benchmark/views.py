@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import statistics
+from pathlib import Path
+
+from pydantic import BaseModel, Field
+
+
+class BenchmarkConfig(BaseModel):
+	"""Synthetic pages and number of agent steps of an offline step benchmark"""
+
+	page_nodes: list[int] = [10_000, 50_000, 200_000]
+	iframes: int = Field(default=2, ge=0)
+	shadow_roots: int = Field(default=10, ge=0)
+	interactive_every: int = Field(default=5, gt=0)  # every n-th row of the page has interactive elements
+
+	steps: int = Field(default=5, gt=0)  # measured steps per page
+	warmup_steps: int = Field(default=1, ge=0)  # steps run before measuring (browser and caches warm up)
+	headless: bool = True
+
+
+class TimingStats(BaseModel):
+	"""Timings of one phase in seconds"""
+
+	samples: int
+	p50: float
+	p95: float
+	mean: float
+
+	@classmethod
+	def from_samples(cls, samples: list[float]) -> TimingStats:
+		ordered = sorted(samples)
+		return cls(
+			samples=len(ordered),
+			p50=ordered[min(len(ordered) - 1, len(ordered) * 50 // 100)] if ordered else 0.0,
+			p95=ordered[min(len(ordered) - 1, len(ordered) * 95 // 100)] if ordered else 0.0,
+			mean=statistics.fmean(ordered) if ordered else 0.0,
+		)
+
+
+class BenchmarkReport(BaseModel):
+	"""Timings per phase, keyed by '<page nodes>/<phase>' (e.g. '50000/get_state')"""
+
+	config: BenchmarkConfig
+	timings: dict[str, TimingStats]
+
+	def compare(self, baseline: BenchmarkReport, tolerance: float = 0.2, min_delta_seconds: float = 0.005) -> list[str]:
+		"""Phases slower than the baseline by more than `tolerance` (relative) and `min_delta_seconds` (absolute)"""
+		regressions = []
+		for key, stats in self.timings.items():
+			baseline_stats = baseline.timings.get(key)
+			if baseline_stats is None:
+				continue
+			for percentile in ('p50', 'p95'):
+				value, baseline_value = getattr(stats, percentile), getattr(baseline_stats, percentile)
+				if value - baseline_value > max(baseline_value * tolerance, min_delta_seconds):
+					regressions.append(
+						f'{key} {percentile}: {value * 1000:.1f}ms (baseline {baseline_value * 1000:.1f}ms, '
+						f'+{(value / baseline_value - 1) * 100 if baseline_value else float("inf"):.0f}%)'
+					)
+		return regressions
+
+	def save(self, path: str | Path) -> None:
+		Path(path).parent.mkdir(parents=True, exist_ok=True)
+		Path(path).write_text(self.model_dump_json(indent=2), encoding='utf-8')
+
+	@classmethod
+	def load(cls, path: str | Path) -> BenchmarkReport:
+		return cls.model_validate_json(Path(path).read_text(encoding='utf-8'))
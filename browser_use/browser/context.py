@@ -25,7 +25,7 @@ from patchright.async_api import (
 	FrameLocator,
 	Page,
 )
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
 
 from browser_use.browser.views import (
 	BrowserError,
@@ -36,7 +36,8 @@ from browser_use.browser.views import (
 from browser_use.dom.clickable_element_processor.service import ClickableElementProcessor
 from browser_use.dom.service import DomService
 from browser_use.dom.views import DOMElementNode, SelectorMap
-from browser_use.utils import time_execution_async, time_execution_sync
+from browser_use.metrics.service import BYTES_BUCKETS, observe
+from browser_use.utils import DomainMatcher, time_execution_async, time_execution_sync
 
 if TYPE_CHECKING:
 	from browser_use.browser.browser import Browser
@@ -183,6 +184,26 @@ class BrowserContextConfig(BaseModel):
 
 	force_new_context: bool = False
 
+	# compiled matcher for allowed_domains, rebuilt if allowed_domains is reassigned or changed in place
+	_allowed_domains_matcher: DomainMatcher | None = PrivateAttr(default=None)
+	_allowed_domains_matcher_source: tuple[str, ...] | None = PrivateAttr(default=None)
+
+	def model_post_init(self, __context) -> None:
+		self.get_allowed_domains_matcher()
+
+	def get_allowed_domains_matcher(self) -> DomainMatcher | None:
+		"""Get the compiled matcher for allowed_domains (None if all domains are allowed)"""
+		if not self.allowed_domains:
+			return None
+		source = tuple(self.allowed_domains)
+		if self._allowed_domains_matcher is None or self._allowed_domains_matcher_source != source:
+			# entries are literal domains (matching their subdomains too), wildcards are not expanded
+			self._allowed_domains_matcher = DomainMatcher.from_patterns(
+				((domain, domain) for domain in source), include_subdomains=True, globs=False
+			)
+			self._allowed_domains_matcher_source = source
+		return self._allowed_domains_matcher
+
 
 @dataclass
 class CachedStateClickableElementsHashes:
@@ -902,6 +923,7 @@ class BrowserContext:
 
 		logger.debug(f'⚖️  Network stabilized for {self.config.wait_for_network_idle_page_load_time} seconds')
 
+	@time_execution_async('--network_wait')
 	async def _wait_for_page_and_frames_load(self, timeout_overwrite: float | None = None):
 		"""
 		Ensures page is fully loaded before continuing.
@@ -936,27 +958,17 @@ class BrowserContext:
 
 	def _is_url_allowed(self, url: str) -> bool:
 		"""Check if a URL is allowed based on the whitelist configuration."""
-		if not self.config.allowed_domains:
+		matcher = self.config.get_allowed_domains_matcher()
+		if matcher is None:
 			return True
 
 		try:
-			from urllib.parse import urlparse
-
 			# Special case: Allow 'about:blank' explicitly
 			if url == 'about:blank':
 				return True
 
-			parsed_url = urlparse(url)
-
-			# Extract only the hostname component (without auth credentials or port)
-			# Hostname returns only the domain portion, ignoring username:password and port
-			domain = parsed_url.hostname.lower() if parsed_url.hostname else ''
-
-			# Check if domain matches any allowed domain pattern
-			return any(
-				domain == allowed_domain.lower() or domain.endswith('.' + allowed_domain.lower())
-				for allowed_domain in self.config.allowed_domains
-			)
+			# Only the hostname is matched (without auth credentials or port), against all allowed domains at once
+			return bool(matcher.match(url))
 		except Exception as e:
 			logger.error(f'⛔️  Error checking URL allowlist: {str(e)}')
 			return False
@@ -1117,16 +1129,18 @@ class BrowserContext:
 		structure = await page.evaluate(debug_script)
 		return structure
 
-	@time_execution_sync('--get_state')  # This decorator might need to be updated to handle async
-	async def get_state(self, cache_clickable_elements_hashes: bool) -> BrowserState:
+	@time_execution_async('--get_state')
+	async def get_state(self, cache_clickable_elements_hashes: bool, viewport_expansion: int | None = None) -> BrowserState:
 		"""Get the current state of the browser
 
 		cache_clickable_elements_hashes: bool
 			If True, cache the clickable elements hashes for the current state. This is used to calculate which elements are new to the llm (from last message) -> reduces token usage.
+		viewport_expansion: int | None
+			Overrides config.viewport_expansion for this call, e.g. for an agent that needs the elements of the whole page.
 		"""
 		await self._wait_for_page_and_frames_load()
 		session = await self.get_session()
-		updated_state = await self._get_updated_state()
+		updated_state = await self._get_updated_state(viewport_expansion=viewport_expansion)
 
 		# Find out which elements are new
 		# Do this only if url has not changed
@@ -1158,7 +1172,7 @@ class BrowserContext:
 
 		return session.cached_state
 
-	async def _get_updated_state(self, focus_element: int = -1) -> BrowserState:
+	async def _get_updated_state(self, focus_element: int = -1, viewport_expansion: int | None = None) -> BrowserState:
 		"""Update and return state."""
 		session = await self.get_session()
 
@@ -1176,7 +1190,7 @@ class BrowserContext:
 			dom_service = DomService(page)
 			content = await dom_service.get_clickable_elements(
 				focus_element=focus_element,
-				viewport_expansion=self.config.viewport_expansion,
+				viewport_expansion=self.config.viewport_expansion if viewport_expansion is None else viewport_expansion,
 				highlight_elements=self.config.highlight_elements,
 			)
 
@@ -1249,6 +1263,7 @@ class BrowserContext:
 			animations='disabled',
 		)
 
+		observe('browser_use_screenshot_bytes', len(screenshot), help='Size of the page screenshots', buckets=BYTES_BUCKETS)
 		screenshot_b64 = base64.b64encode(screenshot).decode('utf-8')
 
 		# await self.remove_highlights()
@@ -1,4 +1,6 @@
+import base64
 from dataclasses import dataclass, field
+from pathlib import Path
 from typing import Any
 
 from pydantic import BaseModel
@@ -34,12 +36,25 @@ class BrowserStateHistory:
 	title: str
 	tabs: list[TabInfo]
 	interacted_element: list[DOMHistoryElement | None] | list[None]
-	screenshot: str | None = None
+	screenshot: str | None = None  # base64, None if the screenshot was spilled to a file
+	screenshot_path: str | None = None  # file written by a DiskScreenshotStore
+
+	def get_screenshot(self) -> str | None:
+		"""The base64 screenshot, loaded from its file if it is not kept in memory"""
+		if self.screenshot is not None:
+			return self.screenshot
+		if self.screenshot_path is None:
+			return None
+		try:
+			return base64.b64encode(Path(self.screenshot_path).read_bytes()).decode('utf-8')
+		except OSError:
+			return None
 
 	def to_dict(self) -> dict[str, Any]:
 		data = {}
 		data['tabs'] = [tab.model_dump() for tab in self.tabs]
 		data['screenshot'] = self.screenshot
+		data['screenshot_path'] = self.screenshot_path
 		data['interacted_element'] = [el.to_dict() if el else None for el in self.interacted_element]
 		data['url'] = self.url
 		data['title'] = self.title
@@ -1,13 +1,16 @@
 import asyncio
+import logging
+import re
 from collections.abc import Callable
 from inspect import iscoroutinefunction, signature
-from typing import Any, Generic, Optional, TypeVar
+from typing import Any, Generic, Optional, TypeVar, get_args
 
 from langchain_core.language_models.chat_models import BaseChatModel
 from pydantic import BaseModel, Field, create_model
 
 from browser_use.browser.context import BrowserContext
 from browser_use.controller.registry.views import (
+	ActionDispatcher,
 	ActionModel,
 	ActionRegistry,
 	RegisteredAction,
@@ -19,8 +22,34 @@ from browser_use.telemetry.views import (
 )
 from browser_use.utils import time_execution_async
 
+logger = logging.getLogger(__name__)
+
 Context = TypeVar('Context')
 
+# parameters that are filled in by the registry instead of the LLM
+INJECTED_PARAMS = ('browser', 'page_extraction_llm', 'available_file_paths', 'context')
+
+SECRET_PATTERN = re.compile(r'<secret>(.*?)</secret>')
+
+
+def _can_hold_str(annotation: Any, seen: set[type] | None = None) -> bool:
+	"""Check if a value of the annotated type can contain a string (and therefore a secret placeholder)"""
+	if annotation in (str, Any, object):
+		return True
+	if annotation is type(None):
+		return False
+	if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+		seen = seen if seen is not None else set()
+		if annotation in seen:
+			return False
+		seen.add(annotation)
+		return any(_can_hold_str(field.annotation, seen) for field in annotation.model_fields.values())
+	args = get_args(annotation)
+	if args:
+		return any(_can_hold_str(arg, seen) for arg in args)
+	# bare containers (list, dict, ...) and unknown types may contain anything
+	return not isinstance(annotation, type) or annotation in (list, dict, tuple, set)
+
 
 class Registry(Generic[Context]):
 	"""Service for registering and managing actions"""
@@ -29,6 +58,7 @@ class Registry(Generic[Context]):
 		self.registry = ActionRegistry()
 		self.telemetry = ProductTelemetry()
 		self.exclude_actions = exclude_actions if exclude_actions is not None else []
+		self._dispatchers: dict[str, ActionDispatcher] = {}
 
 	# @time_execution_sync('--create_param_model')
 	def _create_param_model(self, function: Callable) -> type[BaseModel]:
@@ -86,10 +116,35 @@ class Registry(Generic[Context]):
 				page_filter=page_filter,
 			)
 			self.registry.actions[func.__name__] = action
+			self._dispatchers[func.__name__] = self._compile_action(action)
 			return func
 
 		return decorator
 
+	def _compile_action(self, action: RegisteredAction) -> ActionDispatcher:
+		"""Inspect the action function once and precompute how execute_action has to call it"""
+		parameters = list(signature(action.function).parameters.values())
+		first_annotation = parameters[0].annotation if parameters else None
+		is_pydantic = isinstance(first_annotation, type) and issubclass(first_annotation, BaseModel)
+		parameter_names = {param.name for param in parameters}
+
+		return ActionDispatcher(
+			action=action,
+			is_pydantic=is_pydantic,
+			injected_params=tuple(name for name in INJECTED_PARAMS if name in parameter_names),
+			secret_fields=frozenset(
+				name for name, field in action.param_model.model_fields.items() if _can_hold_str(field.annotation)
+			),
+		)
+
+	def _get_dispatcher(self, action_name: str) -> ActionDispatcher:
+		"""Get the compiled dispatcher for an action, compiling it if the action was added to the registry directly"""
+		action = self.registry.actions[action_name]
+		dispatcher = self._dispatchers.get(action_name)
+		if dispatcher is None or dispatcher.action is not action:
+			dispatcher = self._dispatchers[action_name] = self._compile_action(action)
+		return dispatcher
+
 	@time_execution_async('--execute_action')
 	async def execute_action(
 		self,
@@ -106,90 +161,85 @@ class Registry(Generic[Context]):
 		if action_name not in self.registry.actions:
 			raise ValueError(f'Action {action_name} not found')
 
-		action = self.registry.actions[action_name]
 		try:
+			dispatcher = self._get_dispatcher(action_name)
+			action = dispatcher.action
+
 			# Create the validated Pydantic model
 			validated_params = action.param_model(**params)
 
-			# Check if the first parameter is a Pydantic model
-			sig = signature(action.function)
-			parameters = list(sig.parameters.values())
-			is_pydantic = parameters and issubclass(parameters[0].annotation, BaseModel)
-			parameter_names = [param.name for param in parameters]
-
-			if sensitive_data:
-				validated_params = self._replace_sensitive_data(validated_params, sensitive_data)
+			if sensitive_data and dispatcher.secret_fields:
+				validated_params = self._replace_sensitive_data(validated_params, sensitive_data, dispatcher.secret_fields)
 
-			# Check if the action requires browser
-			if 'browser' in parameter_names and not browser:
-				raise ValueError(f'Action {action_name} requires browser but none provided.')
-			if 'page_extraction_llm' in parameter_names and not page_extraction_llm:
-				raise ValueError(f'Action {action_name} requires page_extraction_llm but none provided.')
-			if 'available_file_paths' in parameter_names and not available_file_paths:
-				raise ValueError(f'Action {action_name} requires available_file_paths but none provided.')
-
-			if 'context' in parameter_names and not context:
-				raise ValueError(f'Action {action_name} requires context but none provided.')
-
-			# Prepare arguments based on parameter type
+			# Prepare the injected arguments the action asks for
+			available = {
+				'browser': browser,
+				'page_extraction_llm': page_extraction_llm,
+				'available_file_paths': available_file_paths,
+				'context': context,
+			}
 			extra_args = {}
-			if 'context' in parameter_names:
-				extra_args['context'] = context
-			if 'browser' in parameter_names:
-				extra_args['browser'] = browser
-			if 'page_extraction_llm' in parameter_names:
-				extra_args['page_extraction_llm'] = page_extraction_llm
-			if 'available_file_paths' in parameter_names:
-				extra_args['available_file_paths'] = available_file_paths
+			for name in dispatcher.injected_params:
+				if not available[name]:
+					raise ValueError(f'Action {action_name} requires {name} but none provided.')
+				extra_args[name] = available[name]
 			if action_name == 'input_text' and sensitive_data:
 				extra_args['has_sensitive_data'] = True
-			if is_pydantic:
+
+			if dispatcher.is_pydantic:
 				return await action.function(validated_params, **extra_args)
 			return await action.function(**validated_params.model_dump(), **extra_args)
 
 		except Exception as e:
 			raise RuntimeError(f'Error executing action {action_name}: {str(e)}') from e
 
-	def _replace_sensitive_data(self, params: BaseModel, sensitive_data: dict[str, str]) -> BaseModel:
-		"""Replaces the sensitive data in the params"""
-		# if there are any str with <secret>placeholder</secret> in the params, replace them with the actual value from sensitive_data
-
-		import logging
-		import re
+	def _replace_sensitive_data(
+		self, params: BaseModel, sensitive_data: dict[str, str], secret_fields: frozenset[str] | None = None
+	) -> BaseModel:
+		"""Replaces the sensitive data in the params
 
-		logger = logging.getLogger(__name__)
-		secret_pattern = re.compile(r'<secret>(.*?)</secret>')
+		Only the fields in secret_fields are scanned (all fields if None). The params are only re-validated if a
+		placeholder was actually replaced, otherwise the original instance is returned.
+		"""
+		# if there are any str with <secret>placeholder</secret> in the params, replace them with the actual value from sensitive_data
 
 		# Set to track all missing placeholders across the full object
 		all_missing_placeholders = set()
+		replaced = False
+
+		def replace_placeholder(match: re.Match[str]) -> str:
+			nonlocal replaced
+			placeholder = match.group(1)
+			if sensitive_data.get(placeholder):
+				replaced = True
+				return sensitive_data[placeholder]
+			# Keep track of missing placeholders, don't replace the tag, keep it as is
+			all_missing_placeholders.add(placeholder)
+			return match.group(0)
 
 		def replace_secrets(value):
 			if isinstance(value, str):
-				matches = secret_pattern.findall(value)
-
-				for placeholder in matches:
-					if placeholder in sensitive_data and sensitive_data[placeholder]:
-						value = value.replace(f'<secret>{placeholder}</secret>', sensitive_data[placeholder])
-					else:
-						# Keep track of missing placeholders
-						all_missing_placeholders.add(placeholder)
-						# Don't replace the tag, keep it as is
-
-				return value
+				if '<secret>' not in value:
+					return value
+				# substitute all placeholders in a single pass over the string
+				return SECRET_PATTERN.sub(replace_placeholder, value)
 			elif isinstance(value, dict):
 				return {k: replace_secrets(v) for k, v in value.items()}
 			elif isinstance(value, list):
 				return [replace_secrets(v) for v in value]
 			return value
 
-		params_dump = params.model_dump()
+		params_dump = params.model_dump(include=set(secret_fields) if secret_fields is not None else None)
 		processed_params = replace_secrets(params_dump)
 
 		# Log a warning if any placeholders are missing
 		if all_missing_placeholders:
 			logger.warning(f'Missing or empty keys in sensitive_data dictionary: {", ".join(all_missing_placeholders)}')
 
-		return type(params).model_validate(processed_params)
+		if not replaced:
+			return params
+
+		return type(params).model_validate({**params.model_dump(), **processed_params})
 
 	# @time_execution_sync('--create_action_model')
 	def create_action_model(self, include_actions: list[str] | None = None, page=None) -> type[ActionModel]:
@@ -200,6 +250,7 @@ class Registry(Generic[Context]):
 		#   if page is provided, only include actions that match the page
 
 		available_actions = {}
+		matched_actions = self.registry.get_domain_matched_actions(page.url) if page is not None else set()
 		for name, action in self.registry.actions.items():
 			if include_actions is not None and name not in include_actions:
 				continue
@@ -210,12 +261,8 @@ class Registry(Generic[Context]):
 					available_actions[name] = action
 				continue
 
-			# Check page_filter if present
-			domain_is_allowed = self.registry._match_domains(action.domains, page.url)
-			page_is_allowed = self.registry._match_page_filter(action.page_filter, page)
-
 			# Include action if both filters match (or if either is not present)
-			if domain_is_allowed and page_is_allowed:
+			if self.registry.is_action_allowed_for_page(name, action, page, matched_actions):
 				available_actions[name] = action
 
 		fields = {
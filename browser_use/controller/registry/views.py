@@ -1,7 +1,11 @@
+import functools
 from collections.abc import Callable
+from dataclasses import dataclass
 
 from patchright.async_api import Page
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, PrivateAttr
+
+from browser_use.utils import DomainMatcher
 
 
 class RegisteredAction(BaseModel):
@@ -33,6 +37,16 @@ class RegisteredAction(BaseModel):
 		return s
 
 
+@dataclass(frozen=True)
+class ActionDispatcher:
+	"""Call plan for a registered action, computed once so execute_action does not have to inspect the function on every call"""
+
+	action: RegisteredAction
+	is_pydantic: bool  # function takes the param model instance as first argument (else its fields as kwargs)
+	injected_params: tuple[str, ...]  # special parameters (browser, context, ...) the function asks for
+	secret_fields: frozenset[str]  # param model fields that can carry <secret>placeholder</secret> strings
+
+
 class ActionModel(BaseModel):
 	"""Base model for dynamically created action models"""
 
@@ -65,11 +79,20 @@ class ActionModel(BaseModel):
 			action_params.index = index
 
 
+@functools.lru_cache(maxsize=128)
+def _compile_domains(domains: tuple[str, ...]) -> DomainMatcher:
+	return DomainMatcher.from_patterns((pattern, pattern) for pattern in domains)
+
+
 class ActionRegistry(BaseModel):
 	"""Model representing the action registry"""
 
 	actions: dict[str, RegisteredAction] = {}
 
+	# domain matcher for all domain-filtered actions, rebuilt whenever the actions change
+	_domain_matcher: DomainMatcher | None = PrivateAttr(default=None)
+	_domain_matcher_actions: tuple[RegisteredAction, ...] = PrivateAttr(default=())
+
 	@staticmethod
 	def _match_domains(domains: list[str] | None, url: str) -> bool:
 		"""
@@ -86,26 +109,30 @@ class ActionRegistry(BaseModel):
 		if domains is None or not url:
 			return True
 
-		import fnmatch
-		from urllib.parse import urlparse
+		return bool(_compile_domains(tuple(domains)).match(url))
 
-		# Parse the URL to get the domain
-		try:
-			parsed_url = urlparse(url)
-			if not parsed_url.netloc:
-				return False
+	def _get_domain_matcher(self) -> DomainMatcher:
+		"""Get the compiled domain matcher, recompiling it only if actions were added, removed or replaced"""
+		actions = tuple(self.actions.values())
+		cached = self._domain_matcher_actions
+		if self._domain_matcher is None or len(actions) != len(cached) or any(a is not b for a, b in zip(actions, cached)):
+			self._domain_matcher = DomainMatcher.from_patterns(
+				(name, pattern) for name, action in self.actions.items() if action.domains for pattern in action.domains
+			)
+			self._domain_matcher_actions = actions
+		return self._domain_matcher
 
-			domain = parsed_url.netloc
-			# Remove port if present
-			if ':' in domain:
-				domain = domain.split(':')[0]
+	def get_domain_matched_actions(self, url: str) -> set[str]:
+		"""Get the names of all actions whose domains match the URL, in a single lookup
 
-			for domain_pattern in domains:
-				if fnmatch.fnmatch(domain, domain_pattern):  # Perform glob *.matching.*
-					return True
-			return False
-		except Exception:
-			return False
+		Actions without domain filter are not included.
+		"""
+		return self._get_domain_matcher().match(url)
+
+	def is_action_allowed_for_page(self, name: str, action: RegisteredAction, page: Page, matched_actions: set[str]) -> bool:
+		"""Check both filters of an action against a page, using the result of get_domain_matched_actions"""
+		domain_is_allowed = action.domains is None or not page.url or name in matched_actions
+		return domain_is_allowed and self._match_page_filter(action.page_filter, page)
 
 	@staticmethod
 	def _match_page_filter(page_filter: Callable[[Page], bool] | None, page: Page) -> bool:
@@ -134,16 +161,14 @@ class ActionRegistry(BaseModel):
 			)
 
 		# only include filtered actions for the current page
+		matched_actions = self.get_domain_matched_actions(page.url)
 		filtered_actions = []
-		for action in self.actions.values():
+		for name, action in self.actions.items():
 			if not (action.domains or action.page_filter):
 				# skip actions with no filters, they are already included in the system prompt
 				continue
 
-			domain_is_allowed = self._match_domains(action.domains, page.url)
-			page_is_allowed = self._match_page_filter(action.page_filter, page)
-
-			if domain_is_allowed and page_is_allowed:
+			if self.is_action_allowed_for_page(name, action, page, matched_actions):
 				filtered_actions.append(action)
 
 		return '\n'.join(action.prompt_description() for action in filtered_actions)
@@ -1,4 +1,5 @@
 import asyncio
+import copy
 import enum
 import json
 import logging
@@ -15,11 +16,13 @@ from pydantic import BaseModel
 from browser_use.agent.views import ActionModel, ActionResult
 from browser_use.browser.context import BrowserContext
 from browser_use.controller.registry.service import Registry
+from browser_use.controller.registry.views import ActionRegistry
 from browser_use.controller.views import (
 	ClickElementAction,
 	CloseTabAction,
 	DoneAction,
 	DragDropAction,
+	ExpandElementsAction,
 	GoToUrlAction,
 	InputTextAction,
 	NoParamsAction,
@@ -30,13 +33,17 @@ from browser_use.controller.views import (
 	SendKeysAction,
 	SwitchTabAction,
 )
-from browser_use.utils import time_execution_sync
+from browser_use.utils import time_execution_async
 
 logger = logging.getLogger(__name__)
 
 
 Context = TypeVar('Context')
 
+# expand_elements shows at most this many elements per call, with these attributes
+MAX_EXPANDED_ELEMENTS = 100
+EXPANDED_ELEMENT_ATTRIBUTES = ['title', 'type', 'name', 'role', 'aria-label', 'placeholder', 'value', 'alt', 'href']
+
 
 class Controller(Generic[Context]):
 	def __init__(
@@ -815,9 +822,46 @@ class Controller(Generic[Context]):
 		"""
 		return self.registry.action(description, **kwargs)
 
+	def with_expand_elements(self) -> 'Controller[Context]':
+		"""
+		Copy of the controller with the expand_elements action, for agents that fold repeated elements
+		(Agent(fold_repeated_elements=...)). The controller itself is left unchanged, it may be shared with other agents.
+		Actions registered on the original controller afterwards are not seen by the copy.
+		"""
+		if 'expand_elements' in self.registry.registry.actions:
+			return self
+
+		controller = copy.copy(self)
+		controller.registry = copy.copy(self.registry)
+		controller.registry.registry = ActionRegistry(actions=dict(self.registry.registry.actions))
+		controller.registry._dispatchers = dict(self.registry._dispatchers)
+
+		@controller.registry.action(
+			'Show the elements of a folded list in full by their index range, e.g. 34-60 from "... with elements 34-60 ..."',
+			param_model=ExpandElementsAction,
+		)
+		async def expand_elements(params: ExpandElementsAction, browser: BrowserContext):
+			selector_map = await browser.get_selector_map()
+			end_index = min(params.end_index, params.start_index + MAX_EXPANDED_ELEMENTS - 1)
+			lines = [
+				selector_map[index].to_prompt_line(EXPANDED_ELEMENT_ATTRIBUTES)
+				for index in range(params.start_index, end_index + 1)
+				if index in selector_map
+			]
+			if not lines:
+				msg = f'No elements with index {params.start_index}-{params.end_index} on the page'
+			else:
+				msg = f'🔎  Elements {params.start_index}-{end_index}:\n' + '\n'.join(lines)
+				if end_index < params.end_index:
+					msg += f'\n... expand {end_index + 1}-{params.end_index} to see the rest'
+			logger.info(f'🔎  Expanded elements {params.start_index}-{end_index}')
+			return ActionResult(extracted_content=msg)
+
+		return controller
+
 	# Act --------------------------------------------------------------------
 
-	@time_execution_sync('--act')
+	@time_execution_async('--act')
 	async def act(
 		self,
 		action: ActionModel,
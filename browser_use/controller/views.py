@@ -38,6 +38,11 @@ class CloseTabAction(BaseModel):
 	page_id: int
 
 
+class ExpandElementsAction(BaseModel):
+	start_index: int
+	end_index: int
+
+
 class ScrollAction(BaseModel):
 	amount: int | None = None  # The number of pixels to scroll. If None, scroll down/up one page
 
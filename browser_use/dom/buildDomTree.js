@@ -1129,6 +1129,27 @@
       if (nodeData.isInViewport || viewportExpansion === -1) {
         nodeData.highlightIndex = highlightIndex++;
 
+        // Vertical distance from the viewport in pixels, negative above it and 0 inside it
+        const rect = getCachedBoundingRect(node);
+        if (rect) {
+          if (rect.bottom < 0) {
+            nodeData.viewportOffset = Math.round(rect.bottom);
+          } else if (rect.top > window.innerHeight) {
+            nodeData.viewportOffset = Math.round(rect.top - window.innerHeight);
+          } else {
+            nodeData.viewportOffset = 0;
+          }
+          // Position in the screenshot, only for the top document as iframe rects are relative to the iframe
+          if (!parentIframe) {
+            nodeData.viewportRect = {
+              x: Math.round(rect.left),
+              y: Math.round(rect.top),
+              width: Math.round(rect.width),
+              height: Math.round(rect.height),
+            };
+          }
+        }
+
         if (doHighlightElements) {
           if (focusHighlightIndex >= 0) {
             if (focusHighlightIndex === nodeData.highlightIndex) {
@@ -1172,6 +1193,10 @@
         attributes: {},
         xpath: '/body',
         children: [],
+        viewport: {
+          width: window.innerWidth,
+          height: window.innerHeight,
+        },
       };
 
       // Process children of body
@@ -8,6 +8,7 @@ from urllib.parse import urlparse
 if TYPE_CHECKING:
 	from patchright.async_api import Page
 
+from browser_use.dom.history_tree_processor.view import CoordinateSet
 from browser_use.dom.views import (
 	DOMBaseNode,
 	DOMElementNode,
@@ -15,6 +16,7 @@ from browser_use.dom.views import (
 	DOMTextNode,
 	SelectorMap,
 )
+from browser_use.metrics.service import COUNT_BUCKETS, observe
 from browser_use.utils import time_execution_async
 
 logger = logging.getLogger(__name__)
@@ -148,6 +150,14 @@ class DomService:
 
 		html_to_dict = node_map[str(js_root_id)]
 
+		observe('browser_use_dom_nodes', len(js_node_map), help='DOM nodes per extracted page', buckets=COUNT_BUCKETS)
+		observe(
+			'browser_use_dom_interactive_elements',
+			len(selector_map),
+			help='Interactive elements per extracted page',
+			buckets=COUNT_BUCKETS,
+		)
+
 		del node_map
 		del js_node_map
 		del js_root_id
@@ -176,6 +186,7 @@ class DomService:
 		# Process coordinates if they exist for element nodes
 
 		viewport_info = None
+		viewport_coordinates = None
 
 		if 'viewport' in node_data:
 			viewport_info = ViewportInfo(
@@ -183,6 +194,9 @@ class DomService:
 				height=node_data['viewport']['height'],
 			)
 
+		if 'viewportRect' in node_data:
+			viewport_coordinates = CoordinateSet.from_rect(**node_data['viewportRect'])
+
 		element_node = DOMElementNode(
 			tag_name=node_data['tagName'],
 			xpath=node_data['xpath'],
@@ -195,7 +209,9 @@ class DomService:
 			highlight_index=node_data.get('highlightIndex'),
 			shadow_root=node_data.get('shadowRoot', False),
 			parent=None,
+			viewport_coordinates=viewport_coordinates,
 			viewport_info=viewport_info,
+			viewport_offset=node_data.get('viewportOffset'),
 		)
 
 		children_ids = node_data.get('children', [])
@@ -1,3 +1,4 @@
+from collections.abc import Callable
 from dataclasses import dataclass
 from functools import cached_property
 from typing import TYPE_CHECKING, Optional
@@ -71,6 +72,7 @@ class DOMElementNode(DOMBaseNode):
 	viewport_coordinates: CoordinateSet | None = None
 	page_coordinates: CoordinateSet | None = None
 	viewport_info: ViewportInfo | None = None
+	viewport_offset: int | None = None  # vertical distance from the viewport in px, negative above it, 0 inside it
 
 	"""
 	### State injected by the browser context.
@@ -149,10 +151,75 @@ class DOMElementNode(DOMBaseNode):
 		collect_text(self, 0)
 		return '\n'.join(text_parts).strip()
 
+	def to_prompt_line(self, include_attributes: list[str] | None = None) -> str:
+		"""The highlighted element as one line of the element list, e.g. [12]<a title='Home'>Home />"""
+		text = self.get_all_text_till_next_clickable_element()
+		attributes_html_str = ''
+		if include_attributes:
+			attributes_to_include = {key: str(value) for key, value in self.attributes.items() if key in include_attributes}
+
+			# Easy LLM optimizations
+			# if tag == role attribute, don't include it
+			if self.tag_name == attributes_to_include.get('role'):
+				del attributes_to_include['role']
+
+			# if aria-label == text of the node, don't include it
+			if attributes_to_include.get('aria-label') and attributes_to_include.get('aria-label', '').strip() == text.strip():
+				del attributes_to_include['aria-label']
+
+			# if placeholder == text of the node, don't include it
+			if attributes_to_include.get('placeholder') and attributes_to_include.get('placeholder', '').strip() == text.strip():
+				del attributes_to_include['placeholder']
+
+			if attributes_to_include:
+				# Format as key1='value1' key2='value2'
+				attributes_html_str = ' '.join(f"{key}='{value}'" for key, value in attributes_to_include.items())
+
+		# Build the line
+		if self.is_new:
+			highlight_indicator = f'*[{self.highlight_index}]*'
+		else:
+			highlight_indicator = f'[{self.highlight_index}]'
+
+		line = f'{highlight_indicator}<{self.tag_name}'
+
+		if attributes_html_str:
+			line += f' {attributes_html_str}'
+
+		if text:
+			# Add space before >text only if there were NO attributes added before
+			if not attributes_html_str:
+				line += ' '
+			line += f'>{text}'
+		# Add space before /> only if neither attributes NOR text were added
+		elif not attributes_html_str:
+			line += ' '
+
+		line += ' />'  # 1 token
+		return line
+
 	@time_execution_sync('--clickable_elements_to_string')
-	def clickable_elements_to_string(self, include_attributes: list[str] | None = None) -> str:
-		"""Convert the processed DOM content to HTML."""
+	def clickable_elements_to_string(
+		self,
+		include_attributes: list[str] | None = None,
+		compact_unchanged: bool = False,
+		fold_repeated_after: int | None = None,
+		token_budget: int | None = None,
+		count_tokens: Callable[[str], int] | None = None,
+	) -> str:
+		"""Convert the processed DOM content to HTML.
+
+		compact_unchanged: collapse runs of elements that were already on the page in the previous step (is_new is
+		False) into one line with their index and a short label, new elements are shown in full.
+		fold_repeated_after: of a run of sibling subtrees with the same shape (e.g. search results, product cards, table
+		rows), show only the first ones in full and list the element indices of the rest.
+		token_budget: include the lines nearest to the viewport (by viewport_offset) until count_tokens of them reaches
+		the budget, and note how many elements were left out above and below. Meant for a tree built with
+		viewport_expansion=-1, so the list grows past the viewport as far as the budget allows.
+		"""
 		formatted_text = []
+		line_elements: list[DOMElementNode | None] = []  # per line, the highlighted element it shows
+		shapes: dict[int, tuple] = {}
 
 		def process_node(node: DOMBaseNode, depth: int) -> None:
 			next_depth = int(depth)
@@ -162,63 +229,23 @@ class DOMElementNode(DOMBaseNode):
 				# Add element with highlight_index
 				if node.highlight_index is not None:
 					next_depth += 1
-
-					text = node.get_all_text_till_next_clickable_element()
-					attributes_html_str = ''
-					if include_attributes:
-						attributes_to_include = {
-							key: str(value) for key, value in node.attributes.items() if key in include_attributes
-						}
-
-						# Easy LLM optimizations
-						# if tag == role attribute, don't include it
-						if node.tag_name == attributes_to_include.get('role'):
-							del attributes_to_include['role']
-
-						# if aria-label == text of the node, don't include it
-						if (
-							attributes_to_include.get('aria-label')
-							and attributes_to_include.get('aria-label', '').strip() == text.strip()
-						):
-							del attributes_to_include['aria-label']
-
-						# if placeholder == text of the node, don't include it
-						if (
-							attributes_to_include.get('placeholder')
-							and attributes_to_include.get('placeholder', '').strip() == text.strip()
-						):
-							del attributes_to_include['placeholder']
-
-						if attributes_to_include:
-							# Format as key1='value1' key2='value2'
-							attributes_html_str = ' '.join(f"{key}='{value}'" for key, value in attributes_to_include.items())
-
-					# Build the line
-					if node.is_new:
-						highlight_indicator = f'*[{node.highlight_index}]*'
-					else:
-						highlight_indicator = f'[{node.highlight_index}]'
-
-					line = f'{depth_str}{highlight_indicator}<{node.tag_name}'
-
-					if attributes_html_str:
-						line += f' {attributes_html_str}'
-
-					if text:
-						# Add space before >text only if there were NO attributes added before
-						if not attributes_html_str:
-							line += ' '
-						line += f'>{text}'
-					# Add space before /> only if neither attributes NOR text were added
-					elif not attributes_html_str:
-						line += ' '
-
-					line += ' />'  # 1 token
-					formatted_text.append(line)
+					formatted_text.append(f'{depth_str}{node.to_prompt_line(include_attributes)}')
+					line_elements.append(node)
 
 				# Process children regardless
-				for child in node.children:
-					process_node(child, next_depth)
+				if fold_repeated_after is None:
+					for child in node.children:
+						process_node(child, next_depth)
+					return
+				for run in _runs_of_same_shape(node.children, shapes):
+					if len(run) < fold_repeated_after + MIN_FOLDED_SIBLINGS:
+						for child in run:
+							process_node(child, next_depth)
+						continue
+					for child in run[:fold_repeated_after]:
+						process_node(child, next_depth)
+					formatted_text.append(next_depth * '\t' + _folded_run_line(run[fold_repeated_after:]))
+					line_elements.append(None)
 
 			elif isinstance(node, DOMTextNode):
 				# Add text only if it doesn't have a highlighted parent
@@ -229,8 +256,18 @@ class DOMElementNode(DOMBaseNode):
 					and node.parent.is_top_element
 				):  # and node.is_parent_top_element()
 					formatted_text.append(f'{depth_str}{node.text}')
+					line_elements.append(None)
 
 		process_node(self, 0)
+		if token_budget is not None:
+			formatted_text, line_elements = _lines_within_token_budget(
+				formatted_text, line_elements, token_budget, count_tokens or _estimate_tokens
+			)
+		if compact_unchanged:
+			unchanged_elements = [
+				element if element is not None and element.is_new is False else None for element in line_elements
+			]
+			formatted_text = _collapse_unchanged_runs(formatted_text, unchanged_elements)
 		return '\n'.join(formatted_text)
 
 	def get_file_upload_element(self, check_siblings: bool = True) -> Optional['DOMElementNode']:
@@ -258,6 +295,143 @@ class DOMElementNode(DOMBaseNode):
 
 SelectorMap = dict[int, DOMElementNode]
 
+# Runs of sibling subtrees with the same shape are folded only if at least this many siblings would be hidden
+MIN_FOLDED_SIBLINGS = 2
+
+
+def _shape(node: DOMBaseNode, shapes: dict[int, tuple]) -> tuple:
+	"""Tag paths and attribute keys of the element subtree, text is ignored"""
+	if not isinstance(node, DOMElementNode):
+		return ()
+	shape = shapes.get(id(node))
+	if shape is None:
+		children = tuple(_shape(child, shapes) for child in node.children if isinstance(child, DOMElementNode))
+		shape = shapes[id(node)] = (node.tag_name, tuple(sorted(node.attributes)), children)
+	return shape
+
+
+def _runs_of_same_shape(children: list[DOMBaseNode], shapes: dict[int, tuple]) -> list[list[DOMBaseNode]]:
+	"""Consecutive element siblings with the same shape grouped together, text nodes and other elements on their own"""
+	runs: list[list[DOMBaseNode]] = []
+	for child in children:
+		if runs and isinstance(child, DOMElementNode) and isinstance(runs[-1][0], DOMElementNode):
+			if _shape(child, shapes) == _shape(runs[-1][0], shapes):
+				runs[-1].append(child)
+				continue
+		runs.append([child])
+	return runs
+
+
+def _folded_run_line(folded: list[DOMBaseNode]) -> str:
+	indices = []
+	for node in folded:
+		if isinstance(node, DOMElementNode):
+			indices.extend(_highlight_indices(node))
+	tag_name = folded[0].tag_name if isinstance(folded[0], DOMElementNode) else 'element'
+	line = f'... {len(folded)} more similar <{tag_name}> items'
+	if indices:
+		line += f' with elements {_format_index_ranges(indices)} - use expand_elements to see them'
+	return line + ' ...'
+
+
+def _highlight_indices(node: DOMElementNode) -> list[int]:
+	indices = [] if node.highlight_index is None else [node.highlight_index]
+	for child in node.children:
+		if isinstance(child, DOMElementNode):
+			indices.extend(_highlight_indices(child))
+	return indices
+
+
+def _format_index_ranges(indices: list[int]) -> str:
+	"""e.g. [3, 4, 5, 9] -> '3-5, 9'"""
+	ranges = []
+	start = previous = None
+	for index in sorted(indices):
+		if previous is not None and index == previous + 1:
+			previous = index
+			continue
+		if start is not None:
+			ranges.append(f'{start}-{previous}' if previous != start else str(start))
+		start = previous = index
+	if start is not None:
+		ranges.append(f'{start}-{previous}' if previous != start else str(start))
+	return ', '.join(ranges)
+
+
+def _estimate_tokens(text: str) -> int:
+	return len(text) // 3 + 1  # ~3 characters per token, plus the newline
+
+
+def _lines_within_token_budget(
+	lines: list[str], line_elements: list[DOMElementNode | None], token_budget: int, count_tokens: Callable[[str], int]
+) -> tuple[list[str], list[DOMElementNode | None]]:
+	"""The lines nearest to the viewport that fit in the budget, in page order, with notes on the elements left out"""
+	# Lines without an element of their own (text, folded runs) take the offset of the element before them
+	offset = next((e.viewport_offset for e in line_elements if e is not None and e.viewport_offset is not None), 0)
+	offsets = []
+	for element in line_elements:
+		if element is not None and element.viewport_offset is not None:
+			offset = element.viewport_offset
+		offsets.append(offset)
+
+	kept = [False] * len(lines)
+	spent = 0
+	for i in sorted(range(len(lines)), key=lambda i: abs(offsets[i])):  # stable, so page order for equal distances
+		cost = count_tokens(lines[i])
+		if spent + cost > token_budget:
+			break
+		kept[i] = True
+		spent += cost
+
+	omitted = [i for i, element in enumerate(line_elements) if element is not None and not kept[i]]
+	omitted_above = sum(1 for i in omitted if offsets[i] < 0)
+	omitted_below = len(omitted) - omitted_above
+
+	selected_lines = [line for i, line in enumerate(lines) if kept[i]]
+	selected_elements = [element for i, element in enumerate(line_elements) if kept[i]]
+	if omitted_above:
+		selected_lines.insert(0, f'... {omitted_above} more elements above, left out to stay within the token budget ...')
+		selected_elements.insert(0, None)
+	if omitted_below:
+		selected_lines.append(f'... {omitted_below} more elements below, left out to stay within the token budget ...')
+		selected_elements.append(None)
+	return selected_lines, selected_elements
+
+
+# Runs of fewer unchanged elements are kept as they are
+MIN_UNCHANGED_RUN = 4
+UNCHANGED_LABEL_LENGTH = 30
+
+
+def _collapse_unchanged_runs(lines: list[str], unchanged_elements: list[DOMElementNode | None]) -> list[str]:
+	collapsed = []
+	i = 0
+	while i < len(lines):
+		end = i
+		while end < len(lines) and unchanged_elements[end] is not None:
+			end += 1
+		if end - i < MIN_UNCHANGED_RUN:
+			end = max(end, i + 1)
+			collapsed.extend(lines[i:end])
+			i = end
+			continue
+		depth_str = lines[i][: len(lines[i]) - len(lines[i].lstrip('\t'))]
+		labels = ' '.join(_short_label(element) for element in unchanged_elements[i:end] if element is not None)
+		collapsed.append(f'{depth_str}(unchanged since last step) {labels}')
+		i = end
+	return collapsed
+
+
+def _short_label(element: DOMElementNode) -> str:
+	text = element.get_all_text_till_next_clickable_element().replace('\n', ' ')
+	if not text:
+		text = next(
+			(element.attributes[key] for key in ('aria-label', 'placeholder', 'name', 'title') if element.attributes.get(key)), ''
+		)
+	if len(text) > UNCHANGED_LABEL_LENGTH:
+		text = text[: UNCHANGED_LABEL_LENGTH - 3] + '...'
+	return f'[{element.highlight_index}]<{element.tag_name}>{text}'
+
 
 @dataclass
 class DOMState:
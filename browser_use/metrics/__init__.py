@@ -0,0 +1,21 @@
+from browser_use.metrics.service import (
+	Counter,
+	Gauge,
+	Histogram,
+	MetricsRegistry,
+	disable_metrics,
+	enable_metrics,
+	exponential_buckets,
+	get_metrics_registry,
+)
+
+__all__ = [
+	'Counter',
+	'Gauge',
+	'Histogram',
+	'MetricsRegistry',
+	'disable_metrics',
+	'enable_metrics',
+	'exponential_buckets',
+	'get_metrics_registry',
+]
@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import bisect
+import logging
+import math
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from browser_use.telemetry.views import (
+	AgentEndTelemetryEvent,
+	AgentRunTelemetryEvent,
+	AgentStepTelemetryEvent,
+	BaseTelemetryEvent,
+)
+
+logger = logging.getLogger(__name__)
+
+LabelValues = tuple[tuple[str, str], ...]
+
+
+def exponential_buckets(start: float, factor: float, count: int) -> list[float]:
+	"""Log-scale histogram bucket bounds: start, start * factor, ... (count bounds)"""
+	return [start * factor**i for i in range(count)]
+
+
+SECONDS_BUCKETS = exponential_buckets(0.001, 2, 20)  # 1ms to ~9 minutes
+COUNT_BUCKETS = exponential_buckets(1, 2, 24)  # 1 to ~8 million (tokens, nodes, steps)
+BYTES_BUCKETS = exponential_buckets(1024, 2, 16)  # 1KB to 32MB
+
+
+class Counter:
+	kind = 'counter'
+
+	def __init__(self, name: str, help: str):
+		self.name = name
+		self.help = help
+		self.values: dict[LabelValues, float] = {}
+		# samples() is called from the http server thread while agents update the values
+		self._lock = threading.Lock()
+
+	def inc(self, value: float = 1, **labels: str) -> None:
+		key = _label_key(labels)
+		with self._lock:
+			self.values[key] = self.values.get(key, 0) + value
+
+	def samples(self) -> list[tuple[str, LabelValues, float]]:
+		with self._lock:
+			return [(f'{self.name}_total', key, value) for key, value in self.values.items()]
+
+
+class Gauge:
+	kind = 'gauge'
+
+	def __init__(self, name: str, help: str):
+		self.name = name
+		self.help = help
+		self.values: dict[LabelValues, float] = {}
+		self._lock = threading.Lock()
+
+	def set(self, value: float, **labels: str) -> None:
+		key = _label_key(labels)
+		with self._lock:
+			self.values[key] = value
+
+	def add(self, value: float, **labels: str) -> None:
+		key = _label_key(labels)
+		with self._lock:
+			self.values[key] = self.values.get(key, 0) + value
+
+	def samples(self) -> list[tuple[str, LabelValues, float]]:
+		with self._lock:
+			return [(self.name, key, value) for key, value in self.values.items()]
+
+
+class Histogram:
+	"""Histogram with fixed (by default log-scale) buckets, exposed with cumulative counts like Prometheus"""
+
+	kind = 'histogram'
+
+	def __init__(self, name: str, help: str, buckets: list[float] | None = None):
+		self.name = name
+		self.help = help
+		self.bounds = sorted(buckets or SECONDS_BUCKETS)
+		# label values -> (count per bucket incl. +Inf, sum)
+		self.values: dict[LabelValues, tuple[list[int], list[float]]] = {}
+		self._lock = threading.Lock()
+
+	def observe(self, value: float, **labels: str) -> None:
+		key = _label_key(labels)
+		bucket = bisect.bisect_left(self.bounds, value)
+		with self._lock:
+			entry = self.values.get(key)
+			if entry is None:
+				entry = self.values[key] = ([0] * (len(self.bounds) + 1), [0.0])
+			entry[0][bucket] += 1
+			entry[1][0] += value
+
+	def count(self, **labels: str) -> int:
+		with self._lock:
+			entry = self.values.get(_label_key(labels))
+			return sum(entry[0]) if entry else 0
+
+	def sum(self, **labels: str) -> float:
+		with self._lock:
+			entry = self.values.get(_label_key(labels))
+			return entry[1][0] if entry else 0.0
+
+	def samples(self) -> list[tuple[str, LabelValues, float]]:
+		# copy under the lock, the samples are built from the snapshot
+		with self._lock:
+			values = [(key, list(counts), total[0]) for key, (counts, total) in self.values.items()]
+		samples = []
+		for key, counts, total in values:
+			cumulative = 0
+			for bound, count in zip([*self.bounds, math.inf], counts):
+				cumulative += count
+				samples.append((f'{self.name}_bucket', (*key, ('le', _format_value(bound))), cumulative))
+			samples.append((f'{self.name}_sum', key, total))
+			samples.append((f'{self.name}_count', key, cumulative))
+		return samples
+
+
+class MetricsRegistry:
+	"""
+	In-process registry of counters, gauges and histograms.
+
+	Metrics are created on first use. Expose them with to_prometheus_text(), write_to_file() or start_http_server().
+	"""
+
+	def __init__(self):
+		self._metrics: dict[str, Counter | Gauge | Histogram] = {}
+		self._lock = threading.Lock()
+		self._http_server: ThreadingHTTPServer | None = None
+
+	def counter(self, name: str, help: str = '') -> Counter:
+		return self._get_or_create(name, lambda: Counter(name, help), Counter)
+
+	def gauge(self, name: str, help: str = '') -> Gauge:
+		return self._get_or_create(name, lambda: Gauge(name, help), Gauge)
+
+	def histogram(self, name: str, help: str = '', buckets: list[float] | None = None) -> Histogram:
+		return self._get_or_create(name, lambda: Histogram(name, help, buckets), Histogram)
+
+	def _get_or_create(self, name, factory, kind):
+		metric = self._metrics.get(name)
+		if metric is None:
+			with self._lock:
+				metric = self._metrics.setdefault(name, factory())
+		if not isinstance(metric, kind):
+			raise ValueError(f'Metric {name} is a {metric.kind}, not a {kind.kind}')
+		return metric
+
+	def to_prometheus_text(self) -> str:
+		"""Metrics in the Prometheus text exposition format"""
+		lines = []
+		with self._lock:
+			metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+		for metric in metrics:
+			if metric.help:
+				lines.append(f'# HELP {metric.name} {metric.help}')
+			lines.append(f'# TYPE {metric.name} {metric.kind}')
+			for sample_name, labels, value in metric.samples():
+				lines.append(f'{sample_name}{_format_labels(labels)} {_format_value(value)}')
+		return '\n'.join(lines) + '\n'
+
+	def write_to_file(self, path: str | Path) -> None:
+		"""Dump the metrics as text exposition, e.g. for the node exporter textfile collector"""
+		path = Path(path)
+		path.parent.mkdir(parents=True, exist_ok=True)
+		tmp_path = path.with_suffix(path.suffix + '.tmp')
+		tmp_path.write_text(self.to_prometheus_text(), encoding='utf-8')
+		tmp_path.replace(path)
+
+	def start_http_server(self, port: int = 9464, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+		"""Serve the metrics on http://host:port/metrics from a background thread"""
+		registry = self
+
+		class MetricsHandler(BaseHTTPRequestHandler):
+			def do_GET(self) -> None:
+				if self.path.split('?')[0] != '/metrics':
+					self.send_error(404)
+					return
+				body = registry.to_prometheus_text().encode()
+				self.send_response(200)
+				self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+				self.send_header('Content-Length', str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+			def log_message(self, format: str, *args) -> None:
+				pass
+
+		self.stop_http_server()
+		self._http_server = ThreadingHTTPServer((host, port), MetricsHandler)
+		threading.Thread(target=self._http_server.serve_forever, name='metrics-server', daemon=True).start()
+		logger.info(f'📊 Serving metrics on http://{host}:{self._http_server.server_address[1]}/metrics')
+		return self._http_server
+
+	def stop_http_server(self) -> None:
+		if self._http_server is not None:
+			self._http_server.shutdown()
+			self._http_server.server_close()
+			self._http_server = None
+
+
+# The metrics helpers below do nothing until metrics are enabled
+_registry: MetricsRegistry | None = None
+
+
+def enable_metrics() -> MetricsRegistry:
+	"""Start collecting metrics in the process wide registry (also enabled by BROWSER_USE_METRICS=true)"""
+	global _registry
+	if _registry is None:
+		_registry = MetricsRegistry()
+	return _registry
+
+
+def disable_metrics() -> None:
+	global _registry
+	if _registry is not None:
+		_registry.stop_http_server()
+	_registry = None
+
+
+def get_metrics_registry() -> MetricsRegistry | None:
+	return _registry
+
+
+def increment(name: str, value: float = 1, help: str = '', **labels: str) -> None:
+	if _registry is None:
+		return
+	_registry.counter(name, help).inc(value, **labels)
+
+
+def set_gauge(name: str, value: float, help: str = '', **labels: str) -> None:
+	if _registry is None:
+		return
+	_registry.gauge(name, help).set(value, **labels)
+
+
+def add_to_gauge(name: str, value: float, help: str = '', **labels: str) -> None:
+	if _registry is None:
+		return
+	_registry.gauge(name, help).add(value, **labels)
+
+
+def observe(name: str, value: float, help: str = '', buckets: list[float] | None = None, **labels: str) -> None:
+	if _registry is None:
+		return
+	_registry.histogram(name, help, buckets).observe(value, **labels)
+
+
+def record_telemetry_event(event: BaseTelemetryEvent) -> None:
+	"""Count the product telemetry events, and record the numbers they carry"""
+	if _registry is None:
+		return
+
+	increment('browser_use_telemetry_events', help='Product telemetry events', event=event.name)
+	if isinstance(event, AgentRunTelemetryEvent):
+		increment('browser_use_agent_runs', help='Agent runs started', model=event.model_name)
+	elif isinstance(event, AgentStepTelemetryEvent):
+		increment('browser_use_agent_steps', help='Agent steps')
+		if event.step_error:
+			increment('browser_use_agent_step_failures', help='Agent steps with an error')
+		for action in event.actions:
+			for action_name in action:
+				increment('browser_use_actions', help='Actions executed by agents', action=action_name)
+	elif isinstance(event, AgentEndTelemetryEvent):
+		increment(
+			'browser_use_agent_runs_finished',
+			help='Agent runs finished',
+			success=str(event.success).lower(),
+			max_steps_reached=str(event.max_steps_reached).lower(),
+		)
+		observe('browser_use_agent_run_steps', event.steps, help='Steps per agent run', buckets=COUNT_BUCKETS)
+		observe(
+			'browser_use_agent_run_input_tokens',
+			event.total_input_tokens,
+			help='Input tokens per agent run',
+			buckets=COUNT_BUCKETS,
+		)
+		observe('browser_use_agent_run_duration_seconds', event.total_duration_seconds, help='Duration of agent runs')
+
+
+def _label_key(labels: dict[str, str]) -> LabelValues:
+	return tuple(sorted((key, str(value)) for key, value in labels.items())) if labels else ()
+
+
+def _format_labels(labels: LabelValues) -> str:
+	if not labels:
+		return ''
+	return '{' + ','.join(f'{key}="{_escape_label_value(value)}"' for key, value in labels) + '}'
+
+
+def _escape_label_value(value: str) -> str:
+	return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+	if value == math.inf:
+		return '+Inf'
+	if float(value).is_integer():
+		return str(int(value))
+	return repr(float(value))
+
+
+if os.getenv('BROWSER_USE_METRICS', 'false').lower() == 'true':
+	enable_metrics()
+	if port := os.getenv('BROWSER_USE_METRICS_PORT'):
+		enable_metrics().start_http_server(int(port))
@@ -6,6 +6,7 @@ from pathlib import Path
 from dotenv import load_dotenv
 from posthog import Posthog
 
+from browser_use.metrics.service import record_telemetry_event
 from browser_use.telemetry.views import BaseTelemetryEvent
 from browser_use.utils import singleton
 
@@ -69,6 +70,7 @@ class ProductTelemetry:
 			logger.debug('Telemetry disabled')
 
 	def capture(self, event: BaseTelemetryEvent) -> None:
+		record_telemetry_event(event)
 		if self._posthog_client is None:
 			return
 
@@ -0,0 +1,4 @@
+from browser_use.tracing.service import SpanRecorder, current_span, record_span, span, to_chrome_trace, to_otlp
+from browser_use.tracing.views import Span
+
+__all__ = ['Span', 'SpanRecorder', 'current_span', 'record_span', 'span', 'to_chrome_trace', 'to_otlp']
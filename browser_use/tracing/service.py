@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import itertools
+import os
+import time
+from collections.abc import Iterable
+from contextlib import AbstractContextManager, nullcontext
+from contextvars import ContextVar, Token
+from typing import Any
+
+from browser_use.tracing.views import Span
+
+# (recorder, id of the innermost open span) of the current step, None when no step is being recorded
+_current_span: ContextVar[tuple[SpanRecorder, int] | None] = ContextVar('current_span', default=None)
+_NO_SPAN = nullcontext()
+_span_ids = itertools.count(1)
+
+
+class SpanRecorder:
+	"""
+	Records nested timing spans of one agent step.
+
+	The recorder is context-local: spans opened with `span(...)` anywhere down the call stack of the step (incl. tasks
+	started by it) are attached to it. Without an active recorder `span(...)` is a shared no-op context manager.
+	"""
+
+	def __init__(self):
+		self.spans: list[Span] = []
+		self._spans_by_id: dict[int, Span] = {}
+		self._perf_starts: dict[int, float] = {}
+
+	def start(self, name: str, **attributes: Any) -> Token:
+		"""Open the root span and make this recorder the current one, pass the token to stop()"""
+		root = self._open(name, None, attributes)
+		return _current_span.set((self, root.id))
+
+	def stop(self, token: Token) -> None:
+		"""Close all spans still open (e.g. after an error) and deactivate the recorder"""
+		for span_id in list(self._perf_starts):
+			self._close(span_id)
+		_current_span.reset(token)
+
+	@property
+	def root(self) -> Span | None:
+		return self.spans[0] if self.spans else None
+
+	def _open(self, name: str, parent_id: int | None, attributes: dict[str, Any]) -> Span:
+		span = Span(id=next(_span_ids), parent_id=parent_id, name=name, start_time=time.time(), attributes=attributes)
+		self.spans.append(span)
+		self._spans_by_id[span.id] = span
+		self._perf_starts[span.id] = time.perf_counter()
+		return span
+
+	def _close(self, span_id: int, error: BaseException | None = None) -> None:
+		span = self._spans_by_id[span_id]
+		span.duration = time.perf_counter() - self._perf_starts.pop(span_id)
+		if error is not None:
+			span.attributes['error'] = type(error).__name__
+
+
+class _SpanContext:
+	__slots__ = ('_recorder', '_parent_id', '_name', '_attributes', '_span_id', '_token')
+
+	def __init__(self, recorder: SpanRecorder, parent_id: int, name: str, attributes: dict[str, Any]):
+		self._recorder = recorder
+		self._parent_id = parent_id
+		self._name = name
+		self._attributes = attributes
+
+	def __enter__(self) -> Span:
+		span = self._recorder._open(self._name, self._parent_id, self._attributes)
+		self._span_id = span.id
+		self._token = _current_span.set((self._recorder, span.id))
+		return span
+
+	def __exit__(self, exc_type, exc, tb) -> None:
+		_current_span.reset(self._token)
+		if self._span_id in self._recorder._perf_starts:  # not closed by the recorder already
+			self._recorder._close(self._span_id, exc)
+
+
+def span(name: str, **attributes: Any) -> AbstractContextManager[Span | None]:
+	"""Time the block as a child of the current span, does nothing if no step is being recorded"""
+	current = _current_span.get()
+	if current is None:
+		return _NO_SPAN
+	return _SpanContext(current[0], current[1], name, attributes)
+
+
+def record_span(name: str, start_time: float, duration: float, **attributes: Any) -> None:
+	"""Add an already measured span (e.g. time to first token) as a child of the current span"""
+	current = _current_span.get()
+	if current is None:
+		return
+	recorder, parent_id = current
+	recorder.spans.append(
+		Span(id=next(_span_ids), parent_id=parent_id, name=name, start_time=start_time, duration=duration, attributes=attributes)
+	)
+
+
+def current_span() -> Span | None:
+	"""Innermost open span, e.g. to add attributes known only later"""
+	current = _current_span.get()
+	if current is None:
+		return None
+	recorder, span_id = current
+	return recorder._spans_by_id.get(span_id)
+
+
+def to_chrome_trace(spans: Iterable[Span]) -> dict[str, Any]:
+	"""Spans as Chrome trace events, open the JSON in chrome://tracing or https://ui.perfetto.dev"""
+	events = [
+		{
+			'name': s.name,
+			'ph': 'X',
+			'ts': s.start_time * 1_000_000,
+			'dur': s.duration * 1_000_000,
+			'pid': 1,
+			'tid': 1,
+			'args': s.attributes,
+		}
+		for s in spans
+	]
+	return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def to_otlp(spans: Iterable[Span], service_name: str = 'browser-use') -> dict[str, Any]:
+	"""Spans as an OTLP/JSON trace export request (one trace), e.g. for an OpenTelemetry collector's file receiver"""
+	trace_id = os.urandom(16).hex()
+	otlp_spans = []
+	for s in spans:
+		otlp_span = {
+			'traceId': trace_id,
+			'spanId': f'{s.id:016x}',
+			'name': s.name,
+			'kind': 1,  # internal
+			'startTimeUnixNano': str(int(s.start_time * 1e9)),
+			'endTimeUnixNano': str(int(s.end_time * 1e9)),
+			'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in s.attributes.items()],
+		}
+		if s.parent_id is not None:
+			otlp_span['parentSpanId'] = f'{s.parent_id:016x}'
+		otlp_spans.append(otlp_span)
+
+	return {
+		'resourceSpans': [
+			{
+				'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': service_name}}]},
+				'scopeSpans': [{'scope': {'name': 'browser_use'}, 'spans': otlp_spans}],
+			}
+		]
+	}
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+	if isinstance(value, bool):
+		return {'boolValue': value}
+	if isinstance(value, int):
+		return {'intValue': str(value)}
+	if isinstance(value, float):
+		return {'doubleValue': value}
+	return {'stringValue': str(value)}
@@ -0,0 +1,18 @@
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class Span(BaseModel):
+	"""Timing of a named part of a step, nested under its parent span"""
+
+	id: int
+	parent_id: int | None = None
+	name: str
+	start_time: float  # unix time in seconds
+	duration: float = 0.0  # seconds
+	attributes: dict[str, Any] = {}
+
+	@property
+	def end_time(self) -> float:
+		return self.start_time + self.duration
@@ -1,13 +1,24 @@
 import asyncio
+import fnmatch
 import logging
 import os
 import platform
+import re
 import signal
+import sys
+import threading
 import time
-from collections.abc import Callable, Coroutine
+import traceback
+import weakref
+from collections.abc import Callable, Coroutine, Iterable
 from functools import wraps
 from sys import stderr
+from types import FrameType
 from typing import Any, ParamSpec, TypeVar
+from urllib.parse import urlparse
+
+from browser_use.metrics.service import observe
+from browser_use.tracing.service import span
 
 logger = logging.getLogger(__name__)
 
@@ -297,13 +308,113 @@ class SignalHandler:
 			self.loop.waiting_for_input = False
 
 
+class EventLoopStallDetector:
+	"""
+	Debug helper that reports synchronous code blocking the asyncio event loop.
+
+	A heartbeat task on the loop records when it last ran and a watchdog thread checks it. If the heartbeat has not run
+	for longer than `threshold` seconds, the stack of the loop thread is captured and the innermost browser_use frame
+	is logged as the hot spot (e.g. a sync LLM call), so blocking calls can be found when many agents share one loop.
+
+	One detector is shared per loop, use acquire() and release() around the code to watch.
+	"""
+
+	def __init__(self, threshold: float = 0.5, interval: float = 0.1):
+		self.threshold = threshold
+		self.interval = interval
+		self.stalls: list[tuple[str, float]] = []  # (hot spot, seconds blocked when detected)
+		self._users = 0
+		self._last_beat = time.monotonic()
+		self._reported_beat: float | None = None
+		self._loop_thread_id: int | None = None
+		self._heartbeat_task: asyncio.Task | None = None
+		self._stop_event = threading.Event()
+		self._watchdog: threading.Thread | None = None
+
+	@classmethod
+	def acquire(cls, loop: asyncio.AbstractEventLoop, threshold: float = 0.5) -> 'EventLoopStallDetector':
+		"""Get the running detector of the loop, starting one if needed. Must be called from the loop's thread."""
+		detector = _stall_detectors.get(loop)
+		if detector is None:
+			detector = cls(threshold=threshold)
+			detector._start(loop)
+			_stall_detectors[loop] = detector
+		detector._users += 1
+		return detector
+
+	def release(self) -> None:
+		"""Stop the detector once the last user released it"""
+		self._users -= 1
+		if self._users > 0:
+			return
+		self._stop_event.set()
+		if self._heartbeat_task:
+			self._heartbeat_task.cancel()
+			loop = self._heartbeat_task.get_loop()
+			if _stall_detectors.get(loop) is self:
+				del _stall_detectors[loop]
+
+	def _start(self, loop: asyncio.AbstractEventLoop) -> None:
+		self._loop_thread_id = threading.get_ident()
+		self._last_beat = time.monotonic()
+		self._heartbeat_task = loop.create_task(self._heartbeat(), name='event_loop_stall_detector_heartbeat')
+		self._watchdog = threading.Thread(target=self._watch, name='event-loop-stall-detector', daemon=True)
+		self._watchdog.start()
+
+	async def _heartbeat(self) -> None:
+		while True:
+			self._last_beat = time.monotonic()
+			await asyncio.sleep(self.interval)
+
+	def _watch(self) -> None:
+		while not self._stop_event.wait(self.interval):
+			last_beat = self._last_beat
+			blocked_for = time.monotonic() - last_beat
+			if blocked_for < self.threshold or self._reported_beat == last_beat:
+				continue
+			# report every stall once
+			self._reported_beat = last_beat
+
+			frame = sys._current_frames().get(self._loop_thread_id)  # type: ignore
+			if frame is None:
+				continue
+			stack = traceback.extract_stack(frame)
+			hot_spot = self._find_hot_spot(frame)
+			self.stalls.append((hot_spot, blocked_for))
+			logger.warning(f'⏳ Event loop blocked for more than {blocked_for:.2f}s by synchronous code in {hot_spot}')
+			logger.debug('Blocking call stack:\n' + ''.join(traceback.format_list(stack[-15:])))
+
+	@staticmethod
+	def _find_hot_spot(frame: FrameType) -> str:
+		"""Name the innermost browser_use function on the stack (or the innermost function if there is none)"""
+		innermost = frame
+		current: FrameType | None = frame
+		while current is not None:
+			module = current.f_globals.get('__name__', '')
+			if module.startswith('browser_use') and module != __name__:
+				return f'{module}.{current.f_code.co_qualname} (line {current.f_lineno})'
+			current = current.f_back
+		return f'{innermost.f_globals.get("__name__", "?")}.{innermost.f_code.co_qualname} (line {innermost.f_lineno})'
+
+
+# The running detector of each loop, dropped together with the loop
+_stall_detectors: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, EventLoopStallDetector] = weakref.WeakKeyDictionary()
+
+
+FUNCTION_DURATION_HELP = 'Duration of the functions timed with time_execution_sync/async'
+
+
 def time_execution_sync(additional_text: str = '') -> Callable[[Callable[P, R]], Callable[P, R]]:
+	span_name = additional_text.strip('- ')
+
 	def decorator(func: Callable[P, R]) -> Callable[P, R]:
 		@wraps(func)
 		def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
 			start_time = time.time()
-			result = func(*args, **kwargs)
+			with span(span_name):
+				result = func(*args, **kwargs)
 			execution_time = time.time() - start_time
+			observe('browser_use_function_duration_seconds', execution_time, help=FUNCTION_DURATION_HELP, function=span_name)
 			logger.debug(f'{additional_text} Execution time: {execution_time:.2f} seconds')
 			return result
 
@@ -315,12 +426,16 @@ def time_execution_sync(additional_text: str = '') -> Callable[[Callable[P, R]],
 def time_execution_async(
 	additional_text: str = '',
 ) -> Callable[[Callable[P, Coroutine[Any, Any, R]]], Callable[P, Coroutine[Any, Any, R]]]:
+	span_name = additional_text.strip('- ')
+
 	def decorator(func: Callable[P, Coroutine[Any, Any, R]]) -> Callable[P, Coroutine[Any, Any, R]]:
 		@wraps(func)
 		async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
 			start_time = time.time()
-			result = await func(*args, **kwargs)
+			with span(span_name):
+				result = await func(*args, **kwargs)
 			execution_time = time.time() - start_time
+			observe('browser_use_function_duration_seconds', execution_time, help=FUNCTION_DURATION_HELP, function=span_name)
 			logger.debug(f'{additional_text} Execution time: {execution_time:.2f} seconds')
 			return result
 
@@ -343,3 +458,99 @@ def singleton(cls):
 def check_env_variables(keys: list[str], any_or_all=all) -> bool:
 	"""Check if all required environment variables are set"""
 	return any_or_all(os.getenv(key, '').strip() for key in keys)
+
+
+class _DomainTrieNode:
+	__slots__ = ('children', 'exact', 'subdomains')
+
+	def __init__(self) -> None:
+		self.children: dict[str, _DomainTrieNode] = {}
+		self.exact: set[str] = set()  # keys matching exactly this domain
+		self.subdomains: set[str] = set()  # keys matching any subdomain of this domain
+
+
+class DomainMatcher:
+	"""
+	Matches a URL's hostname against many domain patterns in a single lookup.
+
+	Patterns are added with a key (e.g. an action name or an allow-list entry) and match() returns the keys of all
+	patterns matching the URL. Plain domains ('example.com') and leading wildcards ('*.example.com') are stored in a
+	trie of reversed hostname labels, so a lookup costs one walk over the URL's labels no matter how many patterns
+	there are. Any other glob pattern ('example*', 'yahoo.*') falls back to a precompiled regex.
+	Matching is case-insensitive.
+	"""
+
+	def __init__(self) -> None:
+		self._root = _DomainTrieNode()
+		self._globs: list[tuple[re.Pattern[str], str]] = []
+
+	@classmethod
+	def from_patterns(
+		cls, patterns: Iterable[tuple[str, str]], include_subdomains: bool = False, globs: bool = True
+	) -> 'DomainMatcher':
+		"""Build a matcher from (key, pattern) pairs"""
+		matcher = cls()
+		for key, pattern in patterns:
+			matcher.add(key, pattern, include_subdomains=include_subdomains, globs=globs)
+		return matcher
+
+	def add(self, key: str, pattern: str, include_subdomains: bool = False, globs: bool = True) -> None:
+		"""
+		Add a domain pattern.
+
+		Args:
+			key: Returned by match() when the pattern matches
+			pattern: A domain or fnmatch-style glob, e.g. 'example.com', '*.example.com', 'example*'
+			include_subdomains: If True, a plain domain also matches all of its subdomains (allow-list semantics)
+			globs: If False, the pattern is a literal domain, wildcards in it match nothing
+		"""
+		pattern = pattern.lower()
+		subdomains_only = globs and pattern.startswith('*.')
+		domain = pattern[2:] if subdomains_only else pattern
+
+		if globs and (any(char in domain for char in '*?[') or not domain):
+			self._globs.append((re.compile(fnmatch.translate(pattern)), key))
+			return
+
+		node = self._root
+		for label in reversed(domain.split('.')):
+			node = node.children.setdefault(label, _DomainTrieNode())
+		if subdomains_only or include_subdomains:
+			node.subdomains.add(key)
+		if not subdomains_only:
+			node.exact.add(key)
+
+	@staticmethod
+	def get_hostname(url: str) -> str:
+		"""Extract the lowercase hostname from a URL, without credentials or port ('' if there is none)"""
+		try:
+			return urlparse(url).hostname or ''
+		except ValueError:
+			return ''
+
+	def match(self, url: str) -> set[str]:
+		"""Get the keys of all patterns matching the hostname of the URL"""
+		return self.match_hostname(self.get_hostname(url))
+
+	def match_hostname(self, hostname: str) -> set[str]:
+		"""Get the keys of all patterns matching a hostname"""
+		matched: set[str] = set()
+		if not hostname:
+			return matched
+		hostname = hostname.lower()
+
+		labels = hostname.split('.')
+		node = self._root
+		for remaining in range(len(labels) - 1, -1, -1):
+			node = node.children.get(labels[remaining])
+			if node is None:
+				break
+			if remaining > 0:
+				matched.update(node.subdomains)
+			else:
+				matched.update(node.exact)
+
+		for regex, key in self._globs:
+			if key not in matched and regex.match(hostname):
+				matched.add(key)
+		return matched
@@ -177,14 +177,14 @@ async def record_activity(agent_obj):
 		# prettyprinter.cpprint(model_actions_json_last_elem)
 
 	# print("--- EXTRACTED CONTENT ---")
-	extracted_content = agent_obj.state.history.extracted_content()
+	extracted_content = list(agent_obj.state.history.extracted_content())
 	extracted_content_json = obj_to_json(obj=extracted_content, check_circular=False)
 	if len(extracted_content_json) > 0:
 		extracted_content_json_last_elem = extracted_content_json[-1]
 		# prettyprinter.cpprint(extracted_content_json_last_elem)
 
 	# print("--- URLS ---")
-	urls = agent_obj.state.history.urls()
+	urls = list(agent_obj.state.history.urls())
 	# prettyprinter.cpprint(urls)
 	urls_json = obj_to_json(obj=urls, check_circular=False)
 
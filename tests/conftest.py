@@ -2,11 +2,14 @@
 Test configuration for browser-use.
 """
 
+import json
 import logging
 import os
 import sys
 
 import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
 from langchain_openai import ChatOpenAI
 from pydantic import SecretStr
 
@@ -23,8 +26,12 @@ logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 
+from browser_use.agent.service import Agent
+from browser_use.agent.views import AgentBrain, AgentOutput
 from browser_use.browser.browser import Browser, BrowserConfig
 from browser_use.browser.context import BrowserContext
+from browser_use.browser.views import BrowserState
+from browser_use.dom.views import DOMElementNode
 
 
 @pytest.fixture(scope='session')
@@ -57,3 +64,72 @@ async def browser_context(browser):
 	context = BrowserContext(browser=browser)
 	yield context
 	await context.close()
+
+
+@pytest.fixture
+def make_fake_llm():
+	"""
+	Factory for fake chat models answering with the given responses (dicts are sent as JSON), with the API key check
+	already passed. model_class and kwargs are for fake models with extra behaviour, e.g. delays.
+	"""
+
+	def make(*responses: str | dict, model_class: type[GenericFakeChatModel] = GenericFakeChatModel, **kwargs):
+		messages = [AIMessage(content=r if isinstance(r, str) else json.dumps(r)) for r in responses]
+		llm = model_class(messages=iter(messages), **kwargs)
+		object.__setattr__(llm, '_verified_api_keys', True)
+		return llm
+
+	return make
+
+
+@pytest.fixture
+def make_agent(make_fake_llm):
+	"""
+	Factory for agents (without memory unless enabled), on a fake model answering with the given responses unless llm is
+	passed.
+	"""
+
+	def make(*responses: str | dict, llm=None, **kwargs) -> Agent:
+		kwargs = {'task': 'Test task', 'enable_memory': False, **kwargs}
+		return Agent(llm=llm if llm is not None else make_fake_llm(*responses), **kwargs)
+
+	return make
+
+
+@pytest.fixture
+def make_browser_state():
+	"""
+	Factory for browser states of a page with one button per id, indexed in order.
+	"""
+
+	def make(button_ids: list[str] | None = None, url: str = 'https://example.com', screenshot: str | None = None) -> BrowserState:
+		root = DOMElementNode(tag_name='body', xpath='/body', attributes={}, children=[], is_visible=True, parent=None)
+		selector_map = {}
+		for index, button_id in enumerate(button_ids or [], start=1):
+			button = DOMElementNode(
+				tag_name='button',
+				xpath=f'/body/button[@id="{button_id}"]',
+				attributes={'id': button_id},
+				children=[],
+				is_visible=True,
+				parent=root,
+				highlight_index=index,
+			)
+			root.children.append(button)
+			selector_map[index] = button
+		return BrowserState(element_tree=root, selector_map=selector_map, url=url, title='', tabs=[], screenshot=screenshot)
+
+	return make
+
+
+@pytest.fixture
+def make_agent_output():
+	"""
+	Factory for model outputs of the agent with the given actions.
+	"""
+
+	def make(agent: Agent, *actions: dict, memory: str = '') -> AgentOutput:
+		brain = AgentBrain(evaluation_previous_goal='', memory=memory, next_goal='')
+		return agent.AgentOutput(current_state=brain, action=[agent.ActionModel.model_validate(a) for a in actions])
+
+	return make
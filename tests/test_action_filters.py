@@ -303,3 +303,29 @@ class TestActionFilters:
 		assert 'domain_filter_action' in non_matching_page_model.model_fields
 		assert 'page_filter_action' not in non_matching_page_model.model_fields
 		assert 'both_filters_action' not in non_matching_page_model.model_fields
+
+	def test_domain_matched_actions_single_lookup(self):
+		"""Test that the compiled domain matcher returns every matching action and follows registry changes"""
+		registry = ActionRegistry()
+
+		def make_action(name: str, domains: list[str]) -> RegisteredAction:
+			return RegisteredAction(
+				name=name, description=name, function=lambda: None, param_model=EmptyParamModel, domains=domains
+			)
+
+		registry.actions = {
+			'exact': make_action('exact', ['example.com']),
+			'subdomain': make_action('subdomain', ['*.example.com']),
+			'glob': make_action('glob', ['example*']),
+			'multi': make_action('multi', ['other.com', 'shop.example.com']),
+		}
+
+		assert registry.get_domain_matched_actions('https://example.com/page') == {'exact', 'glob'}
+		assert registry.get_domain_matched_actions('https://shop.example.com') == {'subdomain', 'multi'}
+		assert registry.get_domain_matched_actions('https://a.b.example.com:8080/x') == {'subdomain'}
+		# credentials in the URL must not be mistaken for the domain
+		assert registry.get_domain_matched_actions('https://example.com@malicious.com') == set()
+
+		# replacing an action recompiles the matcher
+		registry.actions['exact'] = make_action('exact', ['other.org'])
+		assert registry.get_domain_matched_actions('https://other.org') == {'exact'}
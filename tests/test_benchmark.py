@@ -0,0 +1,62 @@
+import re
+
+import httpx
+import pytest
+
+from browser_use.benchmark import BenchmarkConfig, BenchmarkReport, FixtureServer, ScriptedChatModel, TimingStats, generate_page
+
+OUTPUT = {
+	'current_state': {'evaluation_previous_goal': 'Start', 'memory': '', 'next_goal': 'Open the page'},
+	'action': [{'go_to_url': {'url': 'https://example.com'}}],
+}
+
+
+@pytest.mark.parametrize('tool_calling_method', ['raw', 'function_calling', None])
+async def test_scripted_model_drives_the_agent(tool_calling_method, make_agent):
+	"""Test that the scripted outputs are returned in order, as text or tool calls, then a done action"""
+	llm = ScriptedChatModel.from_outputs([OUTPUT])
+	agent = make_agent(llm=llm, tool_calling_method=tool_calling_method)
+
+	first = await agent.get_next_action(agent._message_manager.get_messages())
+	second = await agent.get_next_action(agent._message_manager.get_messages())
+
+	assert first.action[0].model_dump(exclude_unset=True) == OUTPUT['action'][0]
+	assert 'done' in second.action[0].model_dump(exclude_unset=True)
+	assert llm.calls == 2
+
+
+def test_fixture_server_serves_synthetic_pages():
+	with FixtureServer() as server:
+		html = httpx.get(server.page_url(nodes=10_000, iframes=2, shadow_roots=3)).text
+		assert httpx.get(f'{server.base_url}/missing').status_code == 404
+
+	# rows and shadow hosts, the shadow roots are created by the script
+	markup = html.split('<script>')[0]
+	assert len(re.findall(r'<(div|p|span|em|b|a|button|input)[ >]', markup)) == 10_000 + 3
+	assert html.count('<iframe') == 2
+	assert 'attachShadow' in html
+	assert 'attachShadow' not in generate_page(100)
+
+
+def test_report_compare_with_baseline(tmp_path):
+	"""Test that only phases slower than the tolerance are reported"""
+	baseline = BenchmarkReport(
+		config=BenchmarkConfig(),
+		timings={
+			'10000/get_state': TimingStats.from_samples([0.100, 0.110, 0.120]),
+			'10000/multi_act': TimingStats.from_samples([0.050]),
+		},
+	)
+	baseline.save(tmp_path / 'baseline.json')
+
+	report = BenchmarkReport(
+		config=BenchmarkConfig(),
+		timings={
+			'10000/get_state': TimingStats.from_samples([0.105, 0.115, 0.125]),
+			'10000/multi_act': TimingStats.from_samples([0.090]),
+			'50000/get_state': TimingStats.from_samples([0.500]),
+		},
+	)
+	regressions = report.compare(BenchmarkReport.load(tmp_path / 'baseline.json'))
+
+	assert [regression.split(':')[0] for regression in regressions] == ['10000/multi_act p50', '10000/multi_act p95']
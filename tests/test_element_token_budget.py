@@ -0,0 +1,88 @@
+from browser_use.agent.prompts import AgentMessagePrompt
+from browser_use.browser.browser import Browser
+from browser_use.browser.context import BrowserContext, BrowserContextConfig
+from browser_use.dom.views import DOMElementNode, DOMTextNode
+
+
+def make_page(offsets: list[int]) -> DOMElementNode:
+	"""A page with one link per offset (distance from the viewport in px), each followed by a line of text"""
+	body = DOMElementNode(tag_name='body', xpath='body', attributes={}, children=[], is_visible=True, parent=None)
+	for index, offset in enumerate(offsets, start=1):
+		link = DOMElementNode(
+			tag_name='a',
+			xpath=f'a[{index}]',
+			attributes={},
+			children=[],
+			is_visible=True,
+			parent=body,
+			highlight_index=index,
+			viewport_offset=offset,
+		)
+		link.children.append(DOMTextNode(text=f'Link {index}', is_visible=True, parent=link))
+		section = DOMElementNode(
+			tag_name='p', xpath=f'p[{index}]', attributes={}, children=[], is_visible=True, parent=body, is_top_element=True
+		)
+		section.children.append(DOMTextNode(text=f'Text {index}', is_visible=True, parent=section))
+		body.children.extend([link, section])
+	return body
+
+
+def count_lines(text: str) -> int:
+	return 1
+
+
+def test_nearest_elements_fill_the_budget():
+	page = make_page([-900, -300, 0, 0, 250, 1200])
+
+	# 8 lines fit: the two links in the viewport first, then the ones 250 and 300 px away, each with its text line
+	text = page.clickable_elements_to_string(token_budget=8, count_tokens=count_lines)
+	assert text.splitlines() == [
+		'... 1 more elements above, left out to stay within the token budget ...',
+		'[2]<a >Link 2 />',
+		'Text 2',
+		'[3]<a >Link 3 />',
+		'Text 3',
+		'[4]<a >Link 4 />',
+		'Text 4',
+		'[5]<a >Link 5 />',
+		'Text 5',
+		'... 1 more elements below, left out to stay within the token budget ...',
+	]
+
+
+def test_budget_larger_than_page_keeps_everything():
+	page = make_page([-900, 0, 1200])
+	assert page.clickable_elements_to_string(token_budget=10_000) == page.clickable_elements_to_string()
+
+
+def test_budget_with_default_token_estimate():
+	page = make_page([i * 100 for i in range(50)])
+	text = page.clickable_elements_to_string(token_budget=60)
+	assert text.startswith('[1]<a >Link 1 />')
+	assert text.endswith('more elements below, left out to stay within the token budget ...')
+	assert sum(len(line) // 3 + 1 for line in text.splitlines()[:-1]) <= 60
+
+
+def test_budget_does_not_change_the_shared_context_config(make_agent):
+	"""Test that the agent extracts the whole page without modifying the config of a context it was given"""
+	config = BrowserContextConfig(viewport_expansion=500)
+	browser_context = BrowserContext(browser=Browser(), config=config)
+
+	agent = make_agent(browser_context=browser_context, element_token_budget=500)
+	other_agent = make_agent(browser_context=browser_context)
+
+	assert agent._viewport_expansion == -1
+	assert other_agent._viewport_expansion is None
+	assert config.viewport_expansion == 500
+
+
+def test_element_list_header_names_the_budget(make_browser_state):
+	state = make_browser_state()
+	state.element_tree = make_page([0, 1200])
+
+	with_budget = AgentMessagePrompt(state, element_token_budget=500).get_user_message(use_vision=False).content
+	without_budget = AgentMessagePrompt(state).get_user_message(use_vision=False).content
+
+	assert 'current page nearest to the viewport, above and below it, within a token budget:' in with_budget
+	assert 'inside the viewport' not in with_budget
+	assert 'current page inside the viewport:' in without_budget
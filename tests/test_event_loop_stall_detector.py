@@ -0,0 +1,38 @@
+import asyncio
+import time
+
+from browser_use.utils import EventLoopStallDetector, _stall_detectors
+
+
+def blocking_call():
+	time.sleep(0.4)
+
+
+async def test_stall_detector_names_blocking_call():
+	"""Test that a synchronous call blocking the loop is reported with its location"""
+	loop = asyncio.get_running_loop()
+	detector = EventLoopStallDetector.acquire(loop, threshold=0.15)
+	assert EventLoopStallDetector.acquire(loop) is detector
+
+	await asyncio.sleep(0.05)
+	blocking_call()
+	await asyncio.sleep(0.05)
+
+	detector.release()
+	assert _stall_detectors.get(loop) is detector
+	detector.release()
+	assert _stall_detectors.get(loop) is None
+	assert not hasattr(loop, 'stall_detector')
+
+	assert len(detector.stalls) == 1
+	hot_spot, blocked_for = detector.stalls[0]
+	assert 'blocking_call' in hot_spot
+	assert blocked_for >= 0.15
+
+
+async def test_stall_detector_ignores_async_waits():
+	"""Test that awaiting does not count as a stall"""
+	detector = EventLoopStallDetector.acquire(asyncio.get_running_loop(), threshold=0.15)
+	await asyncio.sleep(0.4)
+	detector.release()
+	assert detector.stalls == []
@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+
+from browser_use.agent.gateway import LLMGateway
+from browser_use.agent.service import Agent
+from browser_use.agent.views import HedgingPolicy
+
+
+def model_output(url: str) -> dict:
+	return {
+		'current_state': {'evaluation_previous_goal': 'Start', 'memory': '', 'next_goal': 'Open the page'},
+		'action': [{'go_to_url': {'url': url}}],
+	}
+
+
+class DelayedFakeChatModel(GenericFakeChatModel):
+	"""Fake chat model that answers call n after delays[n] seconds and records cancelled calls"""
+
+	delays: list[float]
+	calls: int = 0
+	cancelled: int = 0
+
+	async def _agenerate(self, *args, **kwargs):
+		delay = self.delays[self.calls]
+		self.calls += 1
+		try:
+			await asyncio.sleep(delay)
+		except asyncio.CancelledError:
+			self.cancelled += 1
+			raise
+		return self._generate(*args, **kwargs)
+
+
+@pytest.fixture
+def make_hedging_agent(make_agent):
+	def make(
+		llm: DelayedFakeChatModel, fallback_llm: DelayedFakeChatModel | None = None, llm_gateway: LLMGateway | None = None
+	) -> Agent:
+		return make_agent(
+			llm=llm,
+			tool_calling_method='raw',
+			hedging_policy=HedgingPolicy(min_samples=3, min_delay_seconds=0.05, fallback_llm=fallback_llm),
+			llm_gateway=llm_gateway,
+		)
+
+	return make
+
+
+async def test_no_hedging_before_enough_samples(make_fake_llm, make_hedging_agent):
+	"""Test that the first calls only measure the latency"""
+	llm = make_fake_llm(*[model_output('https://a.com')] * 3, model_class=DelayedFakeChatModel, delays=[0.01] * 3)
+	agent = make_hedging_agent(llm)
+
+	for _ in range(3):
+		await agent.get_next_action(agent._message_manager.get_messages())
+		assert agent._hedge_decision is not None
+		assert agent._hedge_decision.hedged is False
+		assert agent._hedge_decision.delay_seconds is None
+
+	assert llm.calls == 3
+	assert len(agent._llm_latencies) == 3
+
+
+async def test_slow_call_is_hedged_and_cancelled(make_fake_llm, make_hedging_agent):
+	"""Test that a call slower than the recent latencies is duplicated and the slower one is cancelled"""
+	llm = make_fake_llm(
+		# responses are taken when a call finishes, the hedged call finishes before the slow one
+		*[model_output('https://a.com')] * 3 + [model_output('https://hedge.com'), model_output('https://a.com')],
+		model_class=DelayedFakeChatModel,
+		delays=[0.01, 0.01, 0.01, 5.0, 0.01],
+	)
+	agent = make_hedging_agent(llm)
+	for _ in range(3):
+		await agent.get_next_action(agent._message_manager.get_messages())
+
+	output = await agent.get_next_action(agent._message_manager.get_messages())
+	await asyncio.sleep(0)
+
+	assert output.action[0].model_dump(exclude_unset=True) == {'go_to_url': {'url': 'https://hedge.com'}}
+	assert agent._hedge_decision is not None
+	assert agent._hedge_decision.hedged is True
+	assert agent._hedge_decision.winner == 'hedge'
+	assert agent._hedge_decision.delay_seconds == 0.05
+	assert llm.cancelled == 1
+
+
+async def test_hedge_goes_to_fallback_model(make_fake_llm, make_hedging_agent):
+	"""Test that the duplicate request is sent to the fallback model and the primary can still win"""
+	llm = make_fake_llm(*[model_output('https://a.com')] * 4, model_class=DelayedFakeChatModel, delays=[0.01, 0.01, 0.01, 0.2])
+	fallback_llm = make_fake_llm(model_output('https://fallback.com'), model_class=DelayedFakeChatModel, delays=[5.0])
+	agent = make_hedging_agent(llm, fallback_llm)
+	for _ in range(3):
+		await agent.get_next_action(agent._message_manager.get_messages())
+
+	output = await agent.get_next_action(agent._message_manager.get_messages())
+	await asyncio.sleep(0)
+
+	assert output.action[0].model_dump(exclude_unset=True) == {'go_to_url': {'url': 'https://a.com'}}
+	assert agent._hedge_decision is not None
+	assert agent._hedge_decision.hedged is True
+	assert agent._hedge_decision.winner == 'primary'
+	assert fallback_llm.calls == 1
+	assert fallback_llm.cancelled == 1
+
+
+async def test_hedge_is_not_coalesced_by_the_gateway(make_fake_llm, make_hedging_agent):
+	"""Test that the hedged request makes its own call instead of waiting for the identical primary request"""
+	llm = make_fake_llm(
+		*[model_output('https://a.com')] * 3 + [model_output('https://hedge.com'), model_output('https://a.com')],
+		model_class=DelayedFakeChatModel,
+		delays=[0.01, 0.01, 0.01, 5.0, 0.01],
+	)
+	gateway = LLMGateway()
+	agent = make_hedging_agent(llm, llm_gateway=gateway)
+	for _ in range(3):
+		await agent.get_next_action(agent._message_manager.get_messages())
+
+	output = await asyncio.wait_for(agent.get_next_action(agent._message_manager.get_messages()), timeout=1)
+	await asyncio.sleep(0)
+
+	assert output.action[0].model_dump(exclude_unset=True) == {'go_to_url': {'url': 'https://hedge.com'}}
+	assert agent._hedge_decision is not None
+	assert agent._hedge_decision.winner == 'hedge'
+	assert llm.calls == 5
+	assert llm.cancelled == 1
+	assert gateway.metrics().coalesced_requests == 0
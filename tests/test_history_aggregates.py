@@ -0,0 +1,81 @@
+from browser_use.agent.views import ActionResult, AgentHistory, AgentHistoryList, AgentOutput, StepMetadata
+from browser_use.browser.views import BrowserStateHistory
+from browser_use.controller.service import Controller
+
+AgentOutputWithActions = AgentOutput.type_with_custom_actions(Controller().registry.create_action_model())
+
+
+def make_item(step: int, error: str | None = None) -> AgentHistory:
+	model_output = AgentOutputWithActions.model_validate(
+		{
+			'current_state': {'evaluation_previous_goal': '', 'memory': '', 'next_goal': ''},
+			'action': [{'go_to_url': {'url': f'https://example.com/{step}'}}, {'scroll_down': {}}],
+		}
+	)
+	return AgentHistory(
+		model_output=model_output,
+		result=[ActionResult(extracted_content=f'content {step}', error=error)],
+		state=BrowserStateHistory(url=f'https://example.com/{step}', title='', tabs=[], interacted_element=[None, None]),
+		metadata=StepMetadata(step_start_time=step, step_end_time=step + 0.5, input_tokens=100 * step, step_number=step),
+	)
+
+
+def test_aggregates_follow_appended_steps():
+	history = AgentHistoryList(history=[make_item(1)])
+	assert history.total_input_tokens() == 100
+	assert not history.has_errors()
+
+	history.history.append(make_item(2, error='Timeout'))
+	history.history.append(make_item(3))
+	assert history.total_input_tokens() == 600
+	assert history.total_duration_seconds() == 1.5
+	assert history.errors() == [None, 'Timeout', None]
+	assert history.has_errors()
+	assert history.urls() == ['https://example.com/1', 'https://example.com/2', 'https://example.com/3']
+	assert history.action_names() == ['go_to_url', 'scroll_down'] * 3
+	assert history.extracted_content() == ['content 1', 'content 2', 'content 3']
+
+	# returned views are read-only snapshots of the steps so far
+	errors = history.errors()
+	assert not hasattr(errors, 'clear')
+	history.history.append(make_item(4))
+	assert len(errors) == 3 and errors[-1] is None and errors[:2] == [None, 'Timeout']
+	assert len(history.errors()) == 4
+	del history.history[3:]
+
+	# replaced or truncated histories are aggregated again
+	del history.history[1:]
+	assert history.errors() == [None]
+	history.history = [make_item(4, error='Failed')]
+	assert history.total_input_tokens() == 400
+	assert history.errors() == ['Failed']
+
+
+def test_changes_since():
+	history = AgentHistoryList(history=[make_item(1), make_item(2, error='Timeout')])
+	delta = history.changes_since(1)
+	assert (delta.start, delta.end, delta.input_tokens, delta.errors) == (1, 2, 200, ['Timeout'])
+
+	history.history.append(make_item(3))
+	delta = history.changes_since(delta.end)
+	assert (delta.start, delta.end, delta.input_tokens, delta.duration_seconds) == (2, 3, 300, 0.5)
+	assert delta.items[0].state.url == 'https://example.com/3'
+	assert history.changes_since(delta.end).items == []
+
+
+def test_accessors_do_not_rebuild_the_aggregates(monkeypatch):
+	"""Test that repeated accessor calls neither aggregate the steps again nor copy the aggregated lists"""
+	history = AgentHistoryList(history=[make_item(step) for step in range(1, 101)])
+	history.errors()
+	aggregates = history._aggregates
+	added = []
+	monkeypatch.setattr(aggregates, 'add', added.append)
+
+	for _ in range(3):
+		for accessor in (history.errors, history.urls, history.action_names, history.extracted_content):
+			accessor()
+
+	assert added == []
+	assert history._aggregates is aggregates
+	assert history.urls()._items is aggregates.urls
+	assert len(history.action_names()) == 200
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+
+from browser_use.agent.llm_cache import LLMCacheConfig, LLMCacheMissError, LLMResponseCache
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+	def make(**kwargs) -> LLMResponseCache:
+		return LLMResponseCache(LLMCacheConfig(path=str(tmp_path / 'llm_cache.sqlite'), **kwargs))
+
+	return make
+
+
+async def test_record_then_replay(make_fake_llm, make_cache):
+	"""Test that a recorded response is replayed from disk by a new cache and model"""
+	llm = make_fake_llm('recorded')
+	llm.cache = make_cache()
+	assert (await llm.ainvoke([HumanMessage(content='hi')])).content == 'recorded'
+	assert (await llm.ainvoke([HumanMessage(content='hi')])).content == 'recorded'
+
+	replay_cache = make_cache(mode='replay')
+	replay_llm = make_fake_llm()
+	replay_llm.cache = replay_cache
+	assert (await replay_llm.ainvoke([HumanMessage(content='hi')])).content == 'recorded'
+	with pytest.raises(LLMCacheMissError):
+		await replay_llm.ainvoke([HumanMessage(content='something else')])
+	assert replay_cache.stats().model_dump() == {'hits': 1, 'misses': 1, 'entries': 1}
+
+
+async def test_current_time_is_not_part_of_the_key(make_fake_llm, make_cache):
+	"""Test that prompts differing only in the current time share an entry"""
+	llm = make_fake_llm('first', 'second')
+	llm.cache = make_cache()
+
+	first = await llm.ainvoke([HumanMessage(content='Step 1\nCurrent date and time: 2025-01-01 10:00')])
+	second = await llm.ainvoke([HumanMessage(content='Step 1\nCurrent date and time: 2025-06-30 18:45')])
+	assert first.content == second.content == 'first'
+
+
+async def test_ttl_and_lru_eviction(make_fake_llm, make_cache):
+	"""Test that expired entries are missed and the least recently used entry is evicted"""
+	cache = make_cache(max_entries=2, ttl_seconds=0.2)
+	llm = make_fake_llm('a', 'b', 'a again', 'c', 'b again')
+	llm.cache = cache
+
+	await llm.ainvoke('a')
+	await llm.ainvoke('b')
+	await asyncio.sleep(0.25)
+	assert (await llm.ainvoke('a')).content == 'a again'  # expired
+
+	await llm.ainvoke('c')  # evicts b, used least recently
+	assert cache.stats().entries == 2
+	assert (await llm.ainvoke('a')).content == 'a again'
+	assert (await llm.ainvoke('b')).content == 'b again'
+
+
+async def test_off_mode_does_not_touch_the_cache(make_fake_llm, make_cache):
+	"""Test that the off mode neither reads nor writes entries"""
+	cache = make_cache(mode='off')
+	llm = make_fake_llm('first', 'second')
+	llm.cache = cache
+
+	await llm.ainvoke('hi')
+	assert (await llm.ainvoke('hi')).content == 'second'
+	assert cache.stats().entries == 0
+
+
+async def test_agent_replays_next_action(make_fake_llm, make_agent, make_cache):
+	"""Test that an agent run can be replayed without calling the model"""
+	output = {
+		'current_state': {'evaluation_previous_goal': 'Start', 'memory': '', 'next_goal': 'Open the page'},
+		'action': [{'go_to_url': {'url': 'https://example.com'}}],
+	}
+
+	async def next_action(llm: GenericFakeChatModel, cache: LLMResponseCache):
+		agent = make_agent(llm=llm, tool_calling_method='raw', llm_cache=cache)
+		model_output = await agent.get_next_action(agent._message_manager.get_messages())
+		return model_output.action[0].model_dump(exclude_unset=True)
+
+	assert await next_action(make_fake_llm(output), make_cache()) == output['action'][0]
+	assert await next_action(make_fake_llm(), make_cache(mode='replay')) == output['action'][0]
+
+
+def test_agent_does_not_change_the_callers_models(make_fake_llm, make_agent, make_cache):
+	"""Test that the agent uses copies of the models with the cache set"""
+	llm, planner_llm = make_fake_llm(), make_fake_llm()
+	cache = make_cache()
+
+	agent = make_agent(llm=llm, planner_llm=planner_llm, llm_cache=cache)
+
+	assert llm.cache is None and planner_llm.cache is None
+	assert agent.llm is not llm and agent.llm.cache is cache
+	assert agent.settings.planner_llm is not None and agent.settings.planner_llm.cache is cache
+	assert agent.settings.page_extraction_llm is agent.llm
+
+
+@pytest.mark.parametrize('mode', ['record', 'replay'])
+def test_connection_check_is_not_answered_from_the_cache(mode, make_agent, make_cache):
+	"""Test that the connection check asks the model itself and is neither recorded nor replayed"""
+	llm = GenericFakeChatModel(messages=iter([AIMessage(content='Paris')]))  # not verified yet
+	cache = make_cache(mode=mode)
+
+	agent = make_agent(llm=llm, llm_cache=cache)
+
+	assert agent.llm._verified_api_keys is True
+	assert cache.stats().model_dump() == {'hits': 0, 'misses': 0, 'entries': 0}
@@ -0,0 +1,163 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import HumanMessage
+from langchain_openai import ChatOpenAI
+from pydantic import BaseModel
+
+from browser_use.agent.gateway import LLMGateway, LLMGatewayConfig
+
+
+class SlowFakeChatModel(GenericFakeChatModel):
+	"""Fake chat model that takes `delay` seconds per call and counts the calls"""
+
+	delay: float = 0.05
+	calls: int = 0
+
+	async def _agenerate(self, *args, **kwargs):
+		self.calls += 1
+		await asyncio.sleep(self.delay)
+		return self._generate(*args, **kwargs)
+
+
+class RateLimitError(Exception):
+	status_code = 429
+
+
+class RateLimitedFakeChatModel(GenericFakeChatModel):
+	async def _agenerate(self, *args, **kwargs):
+		raise RateLimitError('Too many requests')
+
+
+@pytest.fixture
+def slow_llm(make_fake_llm) -> SlowFakeChatModel:
+	return make_fake_llm(*(f'response {i}' for i in range(10)), model_class=SlowFakeChatModel)
+
+
+async def test_tokens_per_minute_limit(slow_llm):
+	"""Test that a request waits until the token bucket has refilled"""
+	gateway = LLMGateway(LLMGatewayConfig(tokens_per_minute=600, coalesce_identical_requests=False))
+
+	await gateway.ainvoke(slow_llm, [HumanMessage(content='first')], tokens=600)
+	start = time.monotonic()
+	await gateway.ainvoke(slow_llm, [HumanMessage(content='second')], tokens=5)
+
+	# 600 tokens per minute refill 10 tokens per second
+	assert time.monotonic() - start >= 0.4
+	assert gateway.metrics().total_requests == 2
+
+
+async def test_priority_order():
+	"""Test that queued requests are served by priority, then in order of arrival"""
+	gateway = LLMGateway(LLMGatewayConfig(max_concurrent_requests=1))
+	served = []
+
+	async def request(name: str, priority: int):
+		async with gateway.slot(priority=priority):
+			served.append(name)
+			await asyncio.sleep(0.01)
+
+	first = asyncio.create_task(request('first', 5))
+	await asyncio.sleep(0)
+	others = [asyncio.create_task(request(name, priority)) for name, priority in [('low', 5), ('high', 0), ('high2', 0)]]
+	await asyncio.sleep(0)
+	assert gateway.metrics().queue_depth == 3
+
+	await asyncio.gather(first, *others)
+	assert served == ['first', 'high', 'high2', 'low']
+	assert gateway.metrics().in_flight == 0
+
+
+async def test_identical_requests_are_coalesced(slow_llm):
+	"""Test that identical concurrent requests share one model call"""
+	gateway = LLMGateway()
+	messages = [HumanMessage(content='same prompt')]
+
+	results = await asyncio.gather(*(gateway.ainvoke(slow_llm, messages) for _ in range(5)))
+
+	assert slow_llm.calls == 1
+	assert {result.content for result in results} == {'response 0'}
+	assert results[0] is not results[1]
+	assert gateway.metrics().coalesced_requests == 4
+
+
+async def test_coalescing_can_be_bypassed(slow_llm):
+	"""Test that a request with coalesce=False makes its own call next to an identical pending one"""
+	gateway = LLMGateway()
+	messages = [HumanMessage(content='same prompt')]
+
+	results = await asyncio.gather(gateway.ainvoke(slow_llm, messages), gateway.ainvoke(slow_llm, messages, coalesce=False))
+
+	assert slow_llm.calls == 2
+	assert {result.content for result in results} == {'response 0', 'response 1'}
+	assert gateway.metrics().coalesced_requests == 0
+
+
+class Answer(BaseModel):
+	text: str
+
+
+def test_request_key_compares_models_by_parameters():
+	"""Test that separate but identical models and structured output runnables share a key, other parameters do not"""
+	messages = [HumanMessage(content='same prompt')]
+
+	def key(**kwargs) -> str:
+		llm = ChatOpenAI(model='gpt-4o', api_key='sk-test', **kwargs)
+		return LLMGateway._request_key(llm.with_structured_output(Answer, include_raw=True), messages)
+
+	assert key(temperature=0) == key(temperature=0)
+	assert key(temperature=0) != key(temperature=1)
+	assert LLMGateway._request_key(ChatOpenAI(model='gpt-4o', api_key='sk-test'), messages) != key()
+
+
+async def test_rate_limit_error_pauses_queue(slow_llm):
+	"""Test that a provider rate limit error holds back the following requests"""
+	gateway = LLMGateway(LLMGatewayConfig(rate_limit_backoff_seconds=0.3))
+
+	with pytest.raises(RateLimitError):
+		await gateway.ainvoke(RateLimitedFakeChatModel(messages=iter([])), [HumanMessage(content='hi')])
+
+	start = time.monotonic()
+	await gateway.ainvoke(slow_llm, [HumanMessage(content='hi')])
+	assert time.monotonic() - start >= 0.25
+
+	metrics = gateway.metrics()
+	assert metrics.rate_limited_requests == 1
+	assert metrics.failed_requests == 1
+	assert metrics.latency_max > 0
+
+
+async def test_agent_calls_go_through_gateway(make_agent):
+	"""Test that the agent's model calls are queued through its gateway"""
+	output = {
+		'current_state': {'evaluation_previous_goal': 'Start', 'memory': '', 'next_goal': 'Open the page'},
+		'action': [{'go_to_url': {'url': 'https://example.com'}}],
+	}
+	gateway = LLMGateway()
+	agent = make_agent(output, tool_calling_method='raw', llm_gateway=gateway)
+
+	model_output = await agent.get_next_action(agent._message_manager.get_messages())
+
+	assert model_output.action[0].model_dump(exclude_unset=True) == output['action'][0]
+	assert gateway.metrics().total_requests == 1
+
+
+async def test_agent_charges_the_tokens_of_the_sent_messages(make_fake_llm, make_agent):
+	"""Test that a call with other messages than the history (e.g. the planner) is charged for its own tokens"""
+	llm = make_fake_llm('plan')
+	charged: list[int | None] = []
+
+	class RecordingGateway(LLMGateway):
+		async def _ainvoke(self, runnable, input, tokens, priority):
+			charged.append(tokens)
+			return await super()._ainvoke(runnable, input, tokens, priority)
+
+	agent = make_agent(llm=llm, llm_gateway=RecordingGateway())
+	messages = [HumanMessage(content='Plan the next steps')]
+
+	await agent._ainvoke_llm(llm, messages)
+
+	assert charged == [agent._message_manager.count_tokens(messages)]
+	assert charged[0] < agent._message_manager.state.history.current_tokens
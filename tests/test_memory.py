@@ -0,0 +1,90 @@
+import asyncio
+import threading
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from browser_use.agent.gateway import LLMGateway
+from browser_use.agent.memory import Memory, MemoryBackend, MemoryConfig, SummaryMemoryBackend
+from browser_use.agent.message_manager.service import MessageManager
+
+
+class SlowBackend(MemoryBackend):
+	"""Backend that blocks until released"""
+
+	def __init__(self):
+		self.release = threading.Event()
+
+	def create_memory(self, messages, current_step):
+		self.release.wait(5)
+		return f'Summary of {len(messages)} messages at step {current_step}'
+
+
+@pytest.fixture
+def message_manager(make_agent) -> MessageManager:
+	message_manager = make_agent()._message_manager
+	for i in range(3):
+		message_manager._add_message_with_tokens(AIMessage(content=f'Step {i}'))
+	return message_manager
+
+
+async def test_procedural_memory_is_created_in_the_background(make_fake_llm, message_manager):
+	n_init_messages = len([m for m in message_manager.state.history.messages if m.metadata.message_type == 'init'])
+
+	backend = SlowBackend()
+	memory = Memory(message_manager, message_manager_llm := make_fake_llm(), backend=backend)
+	assert memory.llm is message_manager_llm
+	memory.start_procedural_memory(current_step=3)
+	# the step goes on while the memory is created
+	message_manager._add_message_with_tokens(HumanMessage(content='Result of step 3'))
+	assert not memory.apply_procedural_memory()
+
+	backend.release.set()
+	await asyncio.wait_for(asyncio.shield(memory._pending[1]), 5)  # type: ignore[index]
+	assert memory.apply_procedural_memory()
+
+	messages = message_manager.state.history.messages
+	assert [m.metadata.message_type for m in messages[n_init_messages:]] == ['memory', None]
+	assert messages[-2].message.content.endswith('messages at step 3')
+	assert messages[-1].message.content == 'Result of step 3'
+	assert message_manager.state.history.current_tokens == sum(m.metadata.tokens for m in messages)
+	assert not memory.apply_procedural_memory()
+
+
+def test_summary_backend_rolls_previous_summary(make_fake_llm, message_manager):
+	llm = make_fake_llm('Opened the page', 'Opened and searched')
+	memory = Memory(message_manager, llm, config=MemoryConfig(backend='summary', memory_interval=5, compact_at_tokens=100_000))
+	assert isinstance(memory.backend, SummaryMemoryBackend)
+	assert memory.should_create_memory(5) and not memory.should_create_memory(6)
+
+	memory.create_procedural_memory(current_step=5)
+	message_manager._add_message_with_tokens(AIMessage(content='Step 5'))
+	message_manager._add_message_with_tokens(AIMessage(content='Step 6'))
+	memory.create_procedural_memory(current_step=7)
+
+	memories = [m.message.content for m in message_manager.state.history.messages if m.metadata.message_type == 'memory']
+	assert memories == ['Summary of steps 1-7:\nOpened and searched']
+
+	memory.config.compact_at_tokens = 1
+	assert memory.should_create_memory(6)
+
+
+def test_summary_backend_is_opt_in(make_agent):
+	"""Test that the default memory is mem0 (turned off if it is not installed), the summary backend only runs when configured"""
+	assert MemoryConfig().backend == 'mem0'
+	agent = make_agent(enable_memory=True, memory_config=MemoryConfig(backend='summary'))
+	assert agent.memory is not None and isinstance(agent.memory.backend, SummaryMemoryBackend)
+
+
+async def test_summary_backend_goes_through_the_gateway(make_fake_llm, message_manager):
+	llm = make_fake_llm('Opened the page')
+	gateway = LLMGateway()
+	memory = Memory(message_manager, llm, config=MemoryConfig(backend='summary'), llm_gateway=gateway)
+
+	memory.start_procedural_memory(current_step=3)
+	await asyncio.wait_for(asyncio.shield(memory._pending[1]), 5)  # type: ignore[index]
+	assert memory.apply_procedural_memory()
+
+	assert gateway.metrics().total_requests == 1
+	memories = [m.message.content for m in message_manager.state.history.messages if m.metadata.message_type == 'memory']
+	assert memories == ['Summary of steps 1-3:\nOpened the page']
@@ -0,0 +1,119 @@
+import threading
+
+import httpx
+import pytest
+
+from browser_use.metrics import MetricsRegistry, disable_metrics, enable_metrics, get_metrics_registry
+from browser_use.metrics.service import increment, observe
+from browser_use.telemetry.service import ProductTelemetry
+from browser_use.telemetry.views import AgentEndTelemetryEvent, AgentStepTelemetryEvent
+from browser_use.utils import time_execution_async
+
+
+@pytest.fixture
+def registry():
+	yield enable_metrics()
+	disable_metrics()
+
+
+def test_helpers_do_nothing_when_disabled():
+	assert get_metrics_registry() is None
+	increment('browser_use_test')
+	observe('browser_use_test_seconds', 1.0)
+	assert get_metrics_registry() is None
+
+
+def test_prometheus_exposition():
+	"""Test the text format of counters with labels and of histogram buckets"""
+	registry = MetricsRegistry()
+	registry.counter('requests', 'Requests').inc(2, path='/a "b"')
+	histogram = registry.histogram('latency_seconds', 'Latency', buckets=[0.1, 1])
+	for value in (0.05, 0.5, 0.5, 5):
+		histogram.observe(value)
+
+	assert registry.to_prometheus_text().splitlines() == [
+		'# HELP latency_seconds Latency',
+		'# TYPE latency_seconds histogram',
+		'latency_seconds_bucket{le="0.1"} 1',
+		'latency_seconds_bucket{le="1"} 3',
+		'latency_seconds_bucket{le="+Inf"} 4',
+		'latency_seconds_sum 6.05',
+		'latency_seconds_count 4',
+		'# HELP requests Requests',
+		'# TYPE requests counter',
+		'requests_total{path="/a \\"b\\""} 2',
+	]
+	with pytest.raises(ValueError):
+		registry.gauge('requests')
+
+
+async def test_decorators_and_telemetry_feed_the_registry(registry, tmp_path):
+	"""Test that timed functions and telemetry events are recorded, and the metrics are served and dumped"""
+
+	@time_execution_async('--get_state')
+	async def get_state():
+		pass
+
+	await get_state()
+	await get_state()
+	telemetry = ProductTelemetry()
+	telemetry.capture(
+		AgentStepTelemetryEvent(
+			agent_id='a',
+			step=1,
+			step_error=['Timeout'],
+			consecutive_failures=1,
+			actions=[{'click_element_by_index': {'index': 1}}],
+		)
+	)
+	telemetry.capture(
+		AgentEndTelemetryEvent(
+			agent_id='a',
+			steps=3,
+			max_steps_reached=False,
+			is_done=True,
+			success=True,
+			total_input_tokens=1200,
+			total_duration_seconds=12.5,
+			errors=[],
+		)
+	)
+
+	assert registry.histogram('browser_use_function_duration_seconds').count(function='get_state') == 2
+	assert registry.counter('browser_use_agent_step_failures').values == {(): 1}
+	assert registry.counter('browser_use_actions').values == {(('action', 'click_element_by_index'),): 1}
+	assert registry.histogram('browser_use_agent_run_input_tokens').sum() == 1200
+
+	server = registry.start_http_server(port=0)
+	try:
+		async with httpx.AsyncClient() as client:
+			response = await client.get(f'http://127.0.0.1:{server.server_address[1]}/metrics')
+	finally:
+		registry.stop_http_server()
+	assert 'browser_use_agent_runs_finished_total{max_steps_reached="false",success="true"} 1' in response.text
+
+	registry.write_to_file(tmp_path / 'metrics.prom')
+	assert (tmp_path / 'metrics.prom').read_text() == registry.to_prometheus_text()
+
+
+def test_exposition_while_metrics_are_updated():
+	"""Test that exposing the metrics from another thread while new label values are added does not fail"""
+	registry = MetricsRegistry()
+	counter, gauge, histogram = registry.counter('requests'), registry.gauge('pages'), registry.histogram('latency')
+	done = threading.Event()
+
+	def update() -> None:
+		for i in range(20_000):
+			counter.inc(url=str(i))
+			gauge.set(i, url=str(i))
+			histogram.observe(i / 1000, url=str(i))
+		done.set()
+
+	thread = threading.Thread(target=update)
+	thread.start()
+	while not done.is_set():
+		registry.to_prometheus_text()
+	thread.join()
+
+	assert len(counter.samples()) == 20_000
+	assert histogram.count(url='19999') == 1
@@ -0,0 +1,53 @@
+import asyncio
+import pstats
+
+import pytest
+
+from browser_use.agent.profiler import StepProfiler
+
+
+def busy_work():
+	return sum(i * i for i in range(200_000))
+
+
+async def fake_step():
+	busy_work()
+	await asyncio.sleep(0.02)
+
+
+@pytest.mark.parametrize('mode, suffix', [('cprofile', 'pstats'), ('sampling', 'collapsed')])
+async def test_step_profiles_and_summary(tmp_path, mode, suffix):
+	profiler = StepProfiler(mode, str(tmp_path / 'run' / 'conversation_profile'), interval=0.001)
+	for step_number in (1, 2):
+		with profiler.profile_step(step_number):
+			await fake_step()
+
+	assert (tmp_path / 'run' / f'conversation_profile_step_1.{suffix}').exists()
+	assert (tmp_path / 'run' / f'conversation_profile_step_2.{suffix}').exists()
+	assert 'busy_work' in profiler.summary()
+	assert profiler.write_summary() == tmp_path / 'run' / 'conversation_profile_summary.txt'
+
+	if mode == 'cprofile':
+		stats = pstats.Stats(str(tmp_path / 'run' / 'conversation_profile_step_1.pstats'))
+		assert any(func[2] == 'busy_work' for func in stats.stats)  # type: ignore[attr-defined]
+	else:
+		stacks = (tmp_path / 'run' / 'conversation_profile_step_1.collapsed').read_text().splitlines()
+		assert any('test_profiler:busy_work' in line for line in stacks)
+		assert 'waiting for I/O' in profiler.summary()
+
+
+async def test_agent_run_profiles_each_step(tmp_path, make_agent):
+	agent = make_agent(save_conversation_path=str(tmp_path / 'conversation'), profile_steps='cprofile')
+
+	async def step(step_info=None):
+		agent.state.n_steps += 1
+		await fake_step()
+
+	agent.step = step
+	await agent.run(max_steps=2)
+
+	assert sorted(p.name for p in tmp_path.glob('conversation_profile_*')) == [
+		'conversation_profile_step_1.pstats',
+		'conversation_profile_step_2.pstats',
+		'conversation_profile_summary.txt',
+	]
@@ -0,0 +1,71 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from browser_use.agent.message_manager.service import MessageManager, MessageManagerSettings
+from browser_use.agent.message_manager.utils import add_cache_breakpoints
+from browser_use.browser.views import BrowserState
+
+
+def make_message_manager(cache_friendly_prompt: bool) -> MessageManager:
+	return MessageManager(
+		task='Test task',
+		system_message=SystemMessage(content='system prompt'),
+		settings=MessageManagerSettings(cache_friendly_prompt=cache_friendly_prompt),
+	)
+
+
+def run_step(message_manager: MessageManager, state: BrowserState) -> tuple[list, int]:
+	"""Add the per-step messages like Agent.step does and return the prompt and its stable prefix tokens"""
+	message_manager.add_step_message(HumanMessage(content=f'For this page, these additional actions are available: {state.url}'))
+	message_manager.add_state_message(state, use_vision=False)
+	message_manager.add_step_message(HumanMessage(content='Now comes your last step.'))
+	prompt = message_manager.get_messages()
+	stable_prefix_tokens = message_manager.measure_stable_prefix()
+	message_manager._remove_last_state_message()
+	message_manager.add_tool_message(content='')
+	return prompt, stable_prefix_tokens
+
+
+def test_add_cache_breakpoints():
+	"""Test that breakpoints are set on copies and skip messages without text"""
+	messages = [
+		SystemMessage(content='system prompt'),
+		HumanMessage(content='task'),
+		AIMessage(content='', tool_calls=[{'name': 'AgentOutput', 'args': {}, 'id': '1', 'type': 'tool_call'}]),
+		ToolMessage(content='', tool_call_id='1'),
+		HumanMessage(content=[{'type': 'text', 'text': 'state'}, {'type': 'image_url', 'image_url': {'url': 'x'}}]),
+	]
+
+	marked = add_cache_breakpoints(messages, [0, 3, 4])
+
+	assert marked[0].content == [{'type': 'text', 'text': 'system prompt', 'cache_control': {'type': 'ephemeral'}}]
+	# the empty tool and ai messages cannot be marked, the task message before them is
+	assert marked[1].content == [{'type': 'text', 'text': 'task', 'cache_control': {'type': 'ephemeral'}}]
+	assert marked[2] is messages[2] and marked[3] is messages[3]
+	assert marked[4].content[0] == {'type': 'text', 'text': 'state', 'cache_control': {'type': 'ephemeral'}}
+	assert messages[0].content == 'system prompt'
+
+
+def test_cache_friendly_layout_keeps_prefix_stable(make_browser_state):
+	"""Test that per-step messages go after the history and are dropped after the step"""
+	message_manager = make_message_manager(cache_friendly_prompt=True)
+	history_length = len(message_manager.state.history.messages)
+
+	prompt, _ = run_step(message_manager, make_browser_state(url='https://a.com'))
+	assert 'Current url: https://a.com' in prompt[-1].content
+	assert message_manager.get_stable_prefix_length() == len(message_manager.state.history.messages)
+	assert len(message_manager.state.history.messages) == history_length + 1
+	assert message_manager.state.history.current_tokens == sum(m.metadata.tokens for m in message_manager.state.history.messages)
+
+	prompt, stable_prefix_tokens = run_step(message_manager, make_browser_state(url='https://b.com'))
+	history_tokens = sum(m.metadata.tokens for m in message_manager.state.history.messages)
+	assert stable_prefix_tokens == history_tokens
+	assert not any('https://a.com' in str(message.content) for message in prompt)
+
+
+def test_default_layout_keeps_step_messages(make_browser_state):
+	"""Test that the default layout still adds per-step messages to the history"""
+	message_manager = make_message_manager(cache_friendly_prompt=False)
+	history_length = len(message_manager.state.history.messages)
+
+	run_step(message_manager, make_browser_state(url='https://a.com'))
+	assert len(message_manager.state.history.messages) > history_length + 1
@@ -0,0 +1,92 @@
+import pytest
+from pydantic import BaseModel
+
+from browser_use.controller.registry.service import Registry
+from browser_use.controller.registry.views import RegisteredAction
+
+
+class TextParams(BaseModel):
+	text: str
+	count: int = 1
+
+
+class NumberParams(BaseModel):
+	a: int
+	b: int
+
+
+@pytest.fixture
+def registry():
+	return Registry()
+
+
+def test_dispatcher_is_compiled_at_registration(registry):
+	"""Test that the call plan is computed when the action is registered"""
+
+	@registry.action('Echo text', param_model=TextParams)
+	async def echo(params: TextParams, browser):
+		return params.text
+
+	@registry.action('Add numbers')
+	def add(a: int, b: int):
+		return a + b
+
+	echo_dispatcher = registry._dispatchers['echo']
+	assert echo_dispatcher.is_pydantic is True
+	assert echo_dispatcher.injected_params == ('browser',)
+	assert echo_dispatcher.secret_fields == frozenset({'text'})
+
+	add_dispatcher = registry._dispatchers['add']
+	assert add_dispatcher.is_pydantic is False
+	assert add_dispatcher.injected_params == ()
+	assert add_dispatcher.secret_fields == frozenset()
+
+
+async def test_execute_action_uses_dispatcher(registry):
+	"""Test that pydantic and kwargs actions are called correctly and injected params are checked"""
+
+	@registry.action('Echo text', param_model=TextParams)
+	async def echo(params: TextParams, browser):
+		return f'{params.text} x{params.count}'
+
+	@registry.action('Add numbers')
+	def add(a: int, b: int):
+		return a + b
+
+	assert await registry.execute_action('echo', {'text': 'hi'}, browser=object()) == 'hi x1'
+	assert await registry.execute_action('add', {'a': 1, 'b': 2}) == 3
+
+	with pytest.raises(RuntimeError, match='Action echo requires browser but none provided'):
+		await registry.execute_action('echo', {'text': 'hi'})
+
+
+async def test_execute_action_replaces_secrets(registry):
+	"""Test that secrets are only substituted in string-bearing fields"""
+
+	@registry.action('Echo text', param_model=TextParams)
+	async def echo(params: TextParams):
+		return params.text
+
+	result = await registry.execute_action(
+		'echo', {'text': 'pw: <secret>password</secret>'}, sensitive_data={'password': 'hunter2'}
+	)
+	assert result == 'pw: hunter2'
+
+
+async def test_directly_added_action_is_compiled_lazily(registry):
+	"""Test that actions inserted into the registry without the decorator still get a dispatcher"""
+
+	async def multiply(params: NumberParams):
+		return params.a * params.b
+
+	registry.registry.actions['multiply'] = RegisteredAction(
+		name='multiply', description='Multiply', function=multiply, param_model=NumberParams
+	)
+	assert await registry.execute_action('multiply', {'a': 3, 'b': 4}) == 12
+	assert registry._dispatchers['multiply'].action is registry.registry.actions['multiply']
+
+
+def test_replace_sensitive_data_returns_same_instance_without_placeholders(registry):
+	"""Test that params without placeholders are not re-validated"""
+	params = TextParams(text='nothing secret here')
+	assert registry._replace_sensitive_data(params, {'password': 'hunter2'}) is params
@@ -0,0 +1,98 @@
+from browser_use.controller.service import Controller
+from browser_use.dom.views import DOMElementNode, DOMTextNode
+
+
+def make_node(tag_name: str, parent: DOMElementNode | None, highlight_index: int | None = None, **attributes) -> DOMElementNode:
+	node = DOMElementNode(
+		tag_name=tag_name,
+		xpath=tag_name,
+		attributes=attributes,
+		children=[],
+		is_visible=True,
+		parent=parent,
+		highlight_index=highlight_index,
+	)
+	if parent is not None:
+		parent.children.append(node)
+	return node
+
+
+def make_results_page(n_results: int) -> DOMElementNode:
+	"""Search box and a list of results with a link and a button each"""
+	body = make_node('body', None)
+	make_node('input', body, 1, type='search')
+	results = make_node('ul', body)
+	index = 2
+	for i in range(n_results):
+		item = make_node('li', results, **{'class': f'result result-{i}'})
+		link = make_node('a', item, index, href=f'/item/{i}')
+		link.children.append(DOMTextNode(text=f'Result {i}', is_visible=True, parent=link))
+		make_node('button', item, index + 1, title='Add to cart')
+		index += 2
+	footer = make_node('footer', body)
+	make_node('a', footer, index, href='/about')
+	return body
+
+
+def test_repeated_siblings_are_folded():
+	page = make_results_page(10)
+	assert page.clickable_elements_to_string().count('\n') == 21
+
+	assert page.clickable_elements_to_string(fold_repeated_after=2).splitlines() == [
+		'[1]<input  />',
+		'[2]<a >Result 0 />',
+		'[3]<button  />',
+		'[4]<a >Result 1 />',
+		'[5]<button  />',
+		'... 8 more similar <li> items with elements 6-21 - use expand_elements to see them ...',
+		'[22]<a  />',
+	]
+	# not worth folding a single item
+	assert 'more similar' not in make_results_page(3).clickable_elements_to_string(fold_repeated_after=2)
+
+
+async def test_expand_elements_action():
+	page = make_results_page(10)
+
+	class FakeBrowser:
+		async def get_selector_map(self):
+			return {node.highlight_index: node for node in _elements(page) if node.highlight_index is not None}
+
+	controller = Controller().with_expand_elements()
+	result = await controller.registry.execute_action(
+		'expand_elements', {'start_index': 20, 'end_index': 30}, browser=FakeBrowser()
+	)
+	assert result.extracted_content.splitlines() == [
+		'🔎  Elements 20-30:',
+		"[20]<a href='/item/9'>Result 9 />",
+		"[21]<button title='Add to cart' />",
+		"[22]<a href='/about' />",
+	]
+
+
+def _elements(node: DOMElementNode):
+	yield node
+	for child in node.children:
+		if isinstance(child, DOMElementNode):
+			yield from _elements(child)
+
+
+def test_expand_elements_only_registered_with_folding(make_agent):
+	assert 'expand_elements' not in Controller().registry.registry.actions
+	assert 'expand_elements' not in make_agent().controller.registry.registry.actions
+	agent = make_agent(fold_repeated_elements=3)
+	assert 'expand_elements' in agent.controller.registry.registry.actions
+	assert 'expand_elements' in agent.ActionModel.model_fields
+
+
+def test_expand_elements_does_not_leak_to_agents_sharing_the_controller(make_agent):
+	controller = Controller()
+
+	folding_agent = make_agent(controller=controller, fold_repeated_elements=3)
+	other_agent = make_agent(controller=controller)
+
+	assert 'expand_elements' in folding_agent.ActionModel.model_fields
+	assert 'expand_elements' not in controller.registry.registry.actions
+	assert 'expand_elements' not in other_agent.ActionModel.model_fields
+	assert 'expand_elements' not in other_agent.controller.registry.get_prompt_description()
+	assert 'go_to_url' in folding_agent.controller.registry.registry.actions
@@ -0,0 +1,89 @@
+import base64
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from browser_use.agent.screenshot_store import DiskScreenshotStore, InMemoryScreenshotStore
+from browser_use.agent.screenshot_store import service as screenshot_store_service
+from browser_use.agent.views import AgentHistoryList, AgentOutput
+from browser_use.browser.views import BrowserStateHistory
+
+
+def make_screenshot(color: str) -> str:
+	return base64.b64encode(f'png of a {color} page'.encode()).decode()
+
+
+def test_in_memory_store_shares_identical_screenshots():
+	store = InMemoryScreenshotStore()
+	first, second = (BrowserStateHistory(url='', title='', tabs=[], interacted_element=[]) for _ in range(2))
+	store.save(make_screenshot('red'), first)
+	store.save(make_screenshot('red'), second)
+	assert first.screenshot is second.screenshot
+	assert second.get_screenshot() == make_screenshot('red')
+
+
+def test_disk_store_keeps_only_paths_in_history(tmp_path, make_agent, make_browser_state):
+	agent = make_agent(screenshot_store=DiskScreenshotStore(tmp_path / 'screenshots'))
+	for screenshot in (make_screenshot('red'), make_screenshot('red'), make_screenshot('blue'), None):
+		agent._make_history_item(None, make_browser_state(screenshot=screenshot), [])
+
+	assert len(list((tmp_path / 'screenshots').glob('*/*.png'))) == 2
+	assert [h.state.screenshot for h in agent.state.history.history] == [None] * 4
+	screenshots = agent.state.history.screenshots()
+	assert screenshots == [make_screenshot('red'), make_screenshot('red'), make_screenshot('blue'), None]
+
+	agent.state.history.save_to_file(tmp_path / 'history.json')
+	assert (tmp_path / 'history.json').stat().st_size < 10_000
+	loaded = AgentHistoryList.load_from_file(tmp_path / 'history.json', AgentOutput)
+	assert loaded.screenshots() == screenshots
+
+
+def test_disk_store_webp(tmp_path):
+	Image = pytest.importorskip('PIL.Image')
+	output = io.BytesIO()
+	Image.new('RGB', (64, 48), 'red').save(output, format='PNG')
+	state = BrowserStateHistory(url='', title='', tabs=[], interacted_element=[])
+	DiskScreenshotStore(tmp_path, format='webp').save(base64.b64encode(output.getvalue()).decode(), state)
+	assert state.screenshot_path and state.screenshot_path.endswith('.webp')
+	image = Image.open(io.BytesIO(base64.b64decode(state.get_screenshot() or '')))
+	assert image.format == 'WEBP' and image.size == (64, 48)
+
+
+def test_disk_store_shared_by_concurrent_agents(tmp_path):
+	"""Test that stores writing the same screenshot to one directory at the same time do not collide"""
+
+	screenshot = base64.b64encode(os.urandom(4_000_000)).decode()
+	start = threading.Barrier(8)
+
+	def save(_) -> str | None:
+		state = BrowserStateHistory(url='', title='', tabs=[], interacted_element=[])
+		store = DiskScreenshotStore(tmp_path)
+		start.wait()
+		store.save(screenshot, state)
+		return state.screenshot_path
+
+	with ThreadPoolExecutor(max_workers=8) as executor:
+		paths = set(executor.map(save, range(8)))
+
+	assert len(paths) == 1
+	assert [p.name for p in tmp_path.rglob('*') if p.is_file()] == [os.path.basename(paths.pop() or '')]
+
+
+def test_disk_store_existing_target_is_success(tmp_path, monkeypatch):
+	"""Test that a failed replace is fine when another agent already wrote the file"""
+	store = DiskScreenshotStore(tmp_path)
+
+	def replace(src: str, dst) -> None:
+		with open(dst, 'wb') as f:
+			f.write(b'written by another agent')
+		raise PermissionError('file is in use')
+
+	monkeypatch.setattr(screenshot_store_service.os, 'replace', replace)
+	state = BrowserStateHistory(url='', title='', tabs=[], interacted_element=[])
+	store.save(make_screenshot('red'), state)
+
+	assert state.screenshot_path is not None and os.path.exists(state.screenshot_path)
+	assert not list(tmp_path.rglob('*.tmp'))
@@ -89,3 +89,22 @@ def test_filter_sensitive_data(message_manager):
 	result = message_manager._filter_sensitive_data(message)
 	assert '<secret>username</secret>' in result.content
 	# Only username should be replaced since password is empty
+
+
+def test_filter_sensitive_data_overlapping_values(message_manager):
+	"""Test that overlapping secrets resolve to the longest match in a single pass"""
+	message_manager.settings.sensitive_data = {'short': 'abc', 'long': 'abcdef', 'other': 'xyz', 'tag': 'secret'}
+	message = HumanMessage(content='abcdef abc abcxyz secret')
+	result = message_manager._filter_sensitive_data(message)
+	assert result.content == (
+		'<secret>long</secret> <secret>short</secret> <secret>short</secret><secret>other</secret> <secret>tag</secret>'
+	)
+
+
+def test_filter_sensitive_data_many_secrets(message_manager):
+	"""Test that the compiled scrubber handles many secrets and special regex characters"""
+	sensitive_data = {f'key_{i}': f'value.{i}*(x)' for i in range(60)}
+	message_manager.settings.sensitive_data = sensitive_data
+	text = ' '.join(sensitive_data.values())
+	result = message_manager._filter_sensitive_data(HumanMessage(content=text))
+	assert result.content == ' '.join(f'<secret>{key}</secret>' for key in sensitive_data)
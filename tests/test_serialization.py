@@ -0,0 +1,93 @@
+import warnings
+
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage, ToolMessage
+
+from browser_use.agent import serialization
+from browser_use.agent.message_manager.views import MessageHistory, MessageManagerState, MessageMetadata
+from browser_use.agent.views import ActionResult, AgentHistoryList, AgentOutput, HedgeDecision, StepMetadata
+from browser_use.benchmark.service import _synthetic_run, run_serialization_benchmark
+from browser_use.controller.service import Controller
+from browser_use.tracing.views import Span
+
+
+@pytest.fixture(scope='module')
+def output_model() -> type[AgentOutput]:
+	return AgentOutput.type_with_custom_actions(Controller().registry.create_action_model())
+
+
+def test_message_manager_state_round_trip():
+	history = MessageHistory()
+	history.add_message(SystemMessage(content='system'), MessageMetadata(tokens=1, message_type='init'))
+	history.add_message(
+		HumanMessage(content=[{'type': 'text', 'text': 'state'}, {'type': 'image_url', 'image_url': {'url': 'data:'}}]),
+		MessageMetadata(tokens=810, message_type='state'),
+	)
+	history.add_message(
+		AIMessage(content='', tool_calls=[{'name': 'AgentOutput', 'args': {'a': 1}, 'id': '1', 'type': 'tool_call'}], id='run-1'),
+		MessageMetadata(tokens=100),
+	)
+	history.add_message(ToolMessage(content='', tool_call_id='1'), MessageMetadata(tokens=10))
+	history.add_message(AIMessageChunk(content='streamed'), MessageMetadata(tokens=2))
+	state = MessageManagerState(history=history, tool_id=7)
+
+	data = serialization.dumps(state)
+	assert serialization.loads(data) == state
+	assert b'"lc":1' in data  # only the chunk goes through langchain's dumpd
+
+
+def test_history_round_trip(output_model):
+	_, history = _synthetic_run(3, output_model)
+	loaded = serialization.loads(serialization.dumps(history), output_model)
+	assert isinstance(loaded, AgentHistoryList)
+	assert loaded == history
+	assert serialization.loads(serialization.dumps(history.history[1]), output_model) == history.history[1]
+	assert serialization.loads(serialization.dumps(history.history[1].state)) == history.history[1].state
+
+
+def test_rejects_other_versions(output_model):
+	_, history = _synthetic_run(1, output_model)
+	data = serialization.dumps(history).replace(b'"v":1', b'"v":99', 1)
+	with pytest.raises(ValueError, match='version 99'):
+		serialization.loads(data, output_model)
+	with pytest.raises(ValueError, match='output_model'):
+		serialization.loads(serialization.dumps(history))
+
+
+def test_serialization_benchmark_runs():
+	timings = run_serialization_benchmark(steps=2, repeat=1)
+	assert set(timings) == {
+		f'{obj}/{path}/{op}'
+		for obj in ('message_manager_state', 'history')
+		for path in ('json', 'serialization')
+		for op in ('dump', 'load')
+	}
+
+
+def test_history_metadata_round_trip(output_model):
+	_, history = _synthetic_run(1, output_model)
+	history.history[0].metadata = StepMetadata(
+		step_start_time=1.0,
+		step_end_time=2.5,
+		input_tokens=120,
+		step_number=1,
+		hedge=HedgeDecision(delay_seconds=0.8, hedged=True, winner='hedge'),
+		spans=[Span(id=1, name='step', start_time=1.0, duration=1.5, attributes={'url': 'https://example.com'})],
+	)
+	history.history[0].result.append(ActionResult(error='Timeout'))
+
+	loaded = serialization.loads(serialization.dumps(history), output_model)
+	assert loaded == history
+	assert loaded.history[0].metadata.spans[0].attributes == {'url': 'https://example.com'}
+
+
+def test_decoding_messages_leaves_the_warning_filters_unchanged():
+	state = MessageManagerState(history=MessageHistory())
+	state.history.add_message(AIMessageChunk(content='streamed'), MessageMetadata(tokens=2))
+	with warnings.catch_warnings():
+		warnings.simplefilter('default')
+		filters = list(warnings.filters)
+
+		serialization.loads(serialization.dumps(state))
+
+		assert warnings.filters == filters
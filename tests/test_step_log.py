@@ -0,0 +1,106 @@
+import pytest
+from langchain_core.messages import HumanMessage
+
+from browser_use.agent.service import Agent
+from browser_use.agent.step_log import StepLog
+from browser_use.agent.views import ActionResult
+
+
+@pytest.fixture
+def finish_step(make_browser_state, make_agent_output):
+	def finish(agent: Agent, step: int) -> None:
+		"""Record a step the way Agent.step does it"""
+		model_output = make_agent_output(agent, {'go_to_url': {'url': f'https://example.com/{step}'}}, memory=f'step {step}')
+		agent._message_manager.add_model_output(model_output)
+		agent._message_manager._add_message_with_tokens(HumanMessage(content=f'Result of step {step}'), message_type='init')
+		agent.state.n_steps += 1
+		agent.state.last_result = [ActionResult(extracted_content=f'step {step} done', include_in_memory=True)]
+		state = make_browser_state(url=f'https://example.com/{step}')
+		agent._make_history_item(model_output, state, agent.state.last_result)
+		agent.step_log.append_step(agent.state.history.history[-1], agent.state)  # type: ignore[union-attr]
+
+	return finish
+
+
+async def test_resume_from_log_after_crash(tmp_path, make_agent, finish_step):
+	path = tmp_path / 'steps.jsonl'
+	agent = make_agent(step_log=StepLog(path))
+	messages_after_step: list[int] = []
+	for step in (1, 2, 3):
+		finish_step(agent, step)
+		messages_after_step.append(len(agent._message_manager.get_messages()))
+	await agent.step_log.flush()  # type: ignore[union-attr]
+	assert len(path.read_text().splitlines()) == 3
+
+	# the worker dies while writing step 3
+	lines = path.read_text().splitlines(keepends=True)
+	path.write_text(''.join(lines[:2]) + lines[2][:100])
+
+	resumed = make_agent(step_log=StepLog(path))
+	resumed.resume_from_log(path)
+	assert resumed.state.agent_id == agent.state.agent_id
+	assert resumed.state.n_steps == 3
+	assert resumed.state.last_result == [ActionResult(extracted_content='step 2 done', include_in_memory=True)]
+	assert resumed.state.history.urls() == ['https://example.com/1', 'https://example.com/2']
+	assert resumed.state.history.model_actions()[-1]['go_to_url']['url'] == 'https://example.com/2'
+	assert len(resumed._message_manager.get_messages()) == messages_after_step[1]
+	assert resumed._message_manager.get_messages()[-1].content == 'Result of step 2'
+
+	finish_step(resumed, 3)
+	resumed.step_log.close()  # type: ignore[union-attr]
+	assert [r['state']['n_steps'] for r in StepLog.read(path)] == [2, 3, 4]
+
+
+async def test_log_holds_only_the_changed_messages(tmp_path, make_agent, finish_step):
+	"""Test that each line after the first holds the new messages only and the history is rebuilt from them"""
+	path = tmp_path / 'steps.jsonl'
+	agent = make_agent(step_log=StepLog(path))
+	messages_after_step: list[int] = []
+	for step in range(1, 11):
+		finish_step(agent, step)
+		messages_after_step.append(len(agent._message_manager.get_messages()))
+	# a message in the middle of the history changes, e.g. cut to fit the token limit
+	agent._message_manager.state.history.messages[3].message.content = 'Shortened'
+	finish_step(agent, 11)
+	agent.step_log.close()  # type: ignore[union-attr]
+
+	states = [record['state']['message_manager_state'] for record in StepLog.read(path)]
+	assert 'messages' in states[0]
+	assert [state['kept_messages'] for state in states[1:]] == [*messages_after_step[:-1], 3]
+	assert [len(state['new_messages']) for state in states[1:-1]] == [3] * 9
+
+	resumed = make_agent(step_log=StepLog(path))
+	resumed.resume_from_log(path)
+	assert resumed._message_manager.get_messages() == agent._message_manager.get_messages()
+	assert resumed._message_manager.state.history.current_tokens == agent._message_manager.state.history.current_tokens
+
+
+async def test_run_after_resume_reopens_the_page_and_skips_initial_actions(tmp_path, monkeypatch, make_agent, finish_step):
+	path = tmp_path / 'steps.jsonl'
+	agent = make_agent(step_log=StepLog(path))
+	for step in (1, 2):
+		finish_step(agent, step)
+	agent.step_log.close()  # type: ignore[union-attr]
+
+	resumed = make_agent(initial_actions=[{'go_to_url': {'url': 'https://example.com/start'}}])
+	resumed.resume_from_log(path)
+
+	calls: list[str] = []
+
+	async def navigate_to(url: str) -> None:
+		calls.append(f'navigate {url}')
+
+	async def multi_act(actions, check_for_new_elements: bool = True):
+		calls.append('initial actions')
+		return []
+
+	async def step(step_info=None) -> None:
+		calls.append(f'step {resumed.state.n_steps}')
+		resumed.stop()
+
+	monkeypatch.setattr(resumed.browser_context, 'navigate_to', navigate_to)
+	monkeypatch.setattr(resumed, 'multi_act', multi_act)
+	monkeypatch.setattr(resumed, 'step', step)
+	await resumed.run(max_steps=2)
+
+	assert calls == ['navigate https://example.com/2', 'step 3']
@@ -0,0 +1,109 @@
+import json
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from browser_use.agent.message_manager.utils import StreamingActionParser
+from browser_use.agent.service import Agent
+from browser_use.agent.views import ActionResult, HedgingPolicy
+
+MODEL_OUTPUT = {
+	'current_state': {
+		'evaluation_previous_goal': 'Success - the page "[1]" {loaded}',
+		'memory': 'Nothing yet, "action": [{"done": {}}]',
+		'next_goal': 'Open the page and scroll',
+	},
+	'action': [
+		{'go_to_url': {'url': 'https://example.com'}},
+		{'input_text': {'index': 2, 'text': 'a } ] " tricky text'}},
+		{'scroll_down': {}},
+	],
+}
+
+
+@pytest.fixture
+def make_streaming_agent(make_agent):
+	def make(model_output: dict = MODEL_OUTPUT, **kwargs) -> Agent:
+		return make_agent(model_output, tool_calling_method='raw', stream_actions=True, **kwargs)
+
+	return make
+
+
+def test_parser_returns_actions_as_soon_as_complete():
+	"""Test that each action is returned by the chunk that completes it, ignoring look-alikes in strings and think tags"""
+	text = '<think>{"action": [{"done": {}}]}</think>```json\n' + json.dumps(MODEL_OUTPUT) + '\n```'
+	parser = StreamingActionParser()
+
+	returned = []
+	for position in range(0, len(text), 7):
+		chunk_end = position + 7
+		for action in parser.feed(text[position:chunk_end]):
+			returned.append((action, chunk_end))
+
+	assert [action for action, _ in returned] == MODEL_OUTPUT['action']
+	first_action_end = text.index('}}', text.rindex('"action": [')) + 2
+	assert returned[0][1] < first_action_end + 7
+	assert returned[-1][1] < len(text)
+
+
+async def test_streamed_actions_are_dispatched(make_streaming_agent):
+	"""Test that streamed actions are dispatched in order and match the final output"""
+	agent = make_streaming_agent()
+	dispatched = []
+
+	model_output = await agent.get_next_action(agent._message_manager.get_messages(), on_action=dispatched.append)
+
+	assert [action.model_dump(exclude_unset=True) for action in dispatched] == MODEL_OUTPUT['action']
+	assert [action.model_dump(exclude_unset=True) for action in model_output.action] == MODEL_OUTPUT['action']
+
+
+async def test_streamed_actions_respect_max_actions_per_step(make_streaming_agent):
+	"""Test that no more than max_actions_per_step actions are dispatched"""
+	agent = make_streaming_agent(max_actions_per_step=2)
+	dispatched = []
+
+	model_output = await agent.get_next_action(agent._message_manager.get_messages(), on_action=dispatched.append)
+
+	assert len(dispatched) == 2
+	assert len(model_output.action) == 2
+
+
+async def test_streamed_actions_are_kept_when_the_model_output_is_invalid(monkeypatch, make_browser_state, make_streaming_agent):
+	"""Test that actions which ran before the model output failed validation are recorded with the error"""
+	invalid_output = {'current_state': {'next_goal': 'Open the page'}, 'action': MODEL_OUTPUT['action'][:1]}
+	agent = make_streaming_agent(invalid_output)
+	state = make_browser_state()
+	ran = []
+
+	async def get_state(**kwargs):
+		return state
+
+	async def get_current_page():
+		return SimpleNamespace(url=state.url)
+
+	async def multi_act(actions):
+		async for action in actions:
+			ran.append(action.model_dump(exclude_unset=True))
+		return [ActionResult(extracted_content=f'ran {len(ran)} actions', include_in_memory=True)]
+
+	monkeypatch.setattr(agent.browser_context, 'get_state', get_state)
+	monkeypatch.setattr(agent.browser_context, 'get_current_page', get_current_page)
+	monkeypatch.setattr(agent, 'multi_act', multi_act)
+
+	await agent.step()
+
+	assert ran == MODEL_OUTPUT['action'][:1]
+	history_item = agent.state.history.history[-1]
+	assert [a.model_dump(exclude_unset=True) for a in history_item.model_output.action] == ran
+	assert history_item.result[0].extracted_content == 'ran 1 actions'
+	assert history_item.result[-1].error
+	assert agent.state.last_result == history_item.result
+
+
+def test_streaming_with_hedging_policy_warns(caplog, make_streaming_agent):
+	"""Test that the agent warns that hedging is not used while actions are streamed"""
+	with caplog.at_level(logging.WARNING):
+		make_streaming_agent(hedging_policy=HedgingPolicy())
+
+	assert 'not hedged' in caplog.text
@@ -0,0 +1,108 @@
+import threading
+import time
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from browser_use.agent.message_manager import tokenizer as tokenizer_module
+from browser_use.agent.message_manager.service import MessageManager, MessageManagerSettings
+from browser_use.agent.message_manager.tokenizer import CharacterEstimateTokenizer, DefaultTokenizer, Tokenizer
+
+
+class CountingTokenizer(Tokenizer):
+	"""One token per word, counts how often the underlying tokenizer is called"""
+
+	def __init__(self):
+		super().__init__()
+		self.calls = 0
+
+	def _count(self, text: str) -> int:
+		self.calls += 1
+		return len(text.split())
+
+
+def test_counts_are_cached_by_content():
+	"""Test that counting the same content twice only tokenizes once"""
+	tokenizer = CountingTokenizer()
+	text = 'one two three four'
+
+	assert tokenizer.count(text) == 4
+	assert tokenizer.count(''.join(['one two ', 'three four'])) == 4
+	assert tokenizer.calls == 1
+
+	assert tokenizer.count('five six') == 2
+	assert tokenizer.calls == 2
+
+
+def test_character_estimate_truncate():
+	"""Test that truncating keeps the text within the token budget"""
+	tokenizer = CharacterEstimateTokenizer(characters_per_token=3)
+	text = 'x' * 300
+
+	assert tokenizer.count(text) == 100
+	assert tokenizer.truncate(text, 200) == text
+	assert tokenizer.count(tokenizer.truncate(text, 40)) <= 40
+
+
+def test_message_manager_uses_pluggable_tokenizer():
+	"""Test that message token counts and cutting go through the configured tokenizer"""
+	tokenizer = CountingTokenizer()
+	message_manager = MessageManager(
+		task='Test task',
+		system_message=SystemMessage(content='system prompt'),
+		settings=MessageManagerSettings(max_input_tokens=500, tokenizer=tokenizer),
+	)
+	tokens_before = message_manager.state.history.current_tokens
+	assert tokens_before == sum(m.metadata.tokens for m in message_manager.state.history.messages)
+
+	message_manager._add_message_with_tokens(HumanMessage(content='word ' * 1000))
+	assert message_manager.state.history.current_tokens == tokens_before + 1000
+
+	message_manager.cut_messages()
+	assert message_manager.state.history.current_tokens <= 500
+	assert message_manager.state.history.current_tokens == sum(m.metadata.tokens for m in message_manager.state.history.messages)
+
+
+class WordEncoding:
+	"""Stands in for a tiktoken encoding, one token per word"""
+
+	def encode(self, text: str, disallowed_special=()) -> list[str]:
+		return text.split()
+
+	def decode(self, tokens: list[str]) -> str:
+		return ' '.join(tokens)
+
+
+def test_default_tokenizer_estimates_until_the_encoding_is_loaded(monkeypatch):
+	"""Test that a slow encoding download neither blocks the settings nor counting, tiktoken is used once it is loaded"""
+	loaded = threading.Event()
+
+	def load_encoding(encoding_name: str) -> WordEncoding:
+		loaded.wait(5)
+		return WordEncoding()
+
+	monkeypatch.setattr(tokenizer_module, '_load_tiktoken_encoding', load_encoding)
+	settings = MessageManagerSettings(estimated_characters_per_token=3, tokenizer=DefaultTokenizer(3, 'slow_test_encoding'))
+	tokenizer = settings.tokenizer
+	assert tokenizer is not None
+
+	start = time.monotonic()
+	assert tokenizer.count('one two three') == 4  # 13 characters / 3
+	assert time.monotonic() - start < 1
+
+	loaded.set()
+	deadline = time.monotonic() + 5
+	while tokenizer.count('one two three') != 3 and time.monotonic() < deadline:
+		time.sleep(0.01)
+	assert tokenizer.count('one two three') == 3
+	assert tokenizer.truncate('one two three', 2) == 'one two'
+
+
+def test_default_tokenizer_falls_back_if_the_encoding_fails(monkeypatch):
+	def load_encoding(encoding_name: str):
+		raise ConnectionError('offline')
+
+	monkeypatch.setattr(tokenizer_module, '_load_tiktoken_encoding', load_encoding)
+	tokenizer = DefaultTokenizer(3, 'failing_test_encoding')
+	tokenizer.count('warm up')
+	time.sleep(0.05)
+	assert tokenizer.count('x' * 30) == 10
@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+import pytest
+
+from browser_use.agent.views import ActionResult, AgentHistory, AgentHistoryList, StepMetadata
+from browser_use.browser.views import BrowserStateHistory
+from browser_use.tracing import SpanRecorder, current_span, record_span, span, to_otlp
+from browser_use.utils import time_execution_async
+
+
+def test_span_is_noop_without_recorder():
+	with span('outside') as s:
+		assert s is None
+	assert span('a') is span('b')
+	assert current_span() is None
+
+
+async def test_nested_spans_across_tasks():
+	"""Test that spans nest under the innermost open span, also in tasks started by the step"""
+	recorder = SpanRecorder()
+	token = recorder.start('step', step=1)
+
+	@time_execution_async('--get_state')
+	async def get_state():
+		with span('network_wait'):
+			await asyncio.sleep(0.01)
+
+	await get_state()
+	with pytest.raises(ValueError):
+		with span('action', action='click_element_by_index'):
+			record_span('llm_time_to_first_token', 0.0, 0.5)
+			await asyncio.create_task(asyncio.sleep(0))
+			raise ValueError('failed')
+	recorder.stop(token)
+
+	by_name = {s.name: s for s in recorder.spans}
+	assert list(by_name) == ['step', 'get_state', 'network_wait', 'action', 'llm_time_to_first_token']
+	assert by_name['get_state'].parent_id == by_name['step'].id
+	assert by_name['network_wait'].parent_id == by_name['get_state'].id
+	assert by_name['llm_time_to_first_token'].parent_id == by_name['action'].id
+	assert by_name['action'].attributes == {'action': 'click_element_by_index', 'error': 'ValueError'}
+	assert by_name['get_state'].duration >= by_name['network_wait'].duration >= 0.01
+	assert by_name['step'].duration >= by_name['get_state'].duration
+	assert current_span() is None
+
+
+async def test_agent_model_call_spans(tmp_path, make_agent):
+	"""Test that the model call is recorded and the spans of a history export as Chrome trace and OTLP"""
+	output = {
+		'current_state': {'evaluation_previous_goal': 'Start', 'memory': '', 'next_goal': 'Open the page'},
+		'action': [{'go_to_url': {'url': 'https://example.com'}}],
+	}
+	agent = make_agent(output, tool_calling_method='raw', record_spans=True)
+
+	recorder = SpanRecorder()
+	token = recorder.start('step')
+	await agent.get_next_action(agent._message_manager.get_messages())
+	recorder.stop(token)
+	names = [s.name for s in recorder.spans]
+	assert names[:3] == ['step', 'get_messages', 'get_next_action (agent)']
+	assert 'llm_call' in names
+
+	history = AgentHistoryList(
+		history=[
+			AgentHistory(
+				model_output=None,
+				result=[ActionResult()],
+				state=BrowserStateHistory(url='', title='', tabs=[], interacted_element=[]),
+				metadata=StepMetadata(step_start_time=0, step_end_time=1, input_tokens=0, step_number=1, spans=recorder.spans),
+			)
+		]
+	)
+	history.save_trace(tmp_path / 'trace.json')
+	events = json.loads((tmp_path / 'trace.json').read_text())['traceEvents']
+	assert [e['name'] for e in events] == names
+	assert all(e['ph'] == 'X' and e['dur'] >= 0 for e in events)
+
+	otlp_spans = to_otlp(recorder.spans)['resourceSpans'][0]['scopeSpans'][0]['spans']
+	assert 'parentSpanId' not in otlp_spans[0]
+	assert otlp_spans[1]['parentSpanId'] == otlp_spans[0]['spanId']
@@ -0,0 +1,127 @@
+import threading
+import time
+
+from browser_use.agent.trajectory_cache import TrajectoryCache, TrajectoryCacheConfig
+from browser_use.agent.trajectory_cache.views import TrajectoryCacheData
+from browser_use.agent.views import ActionResult, AgentStepInfo
+
+REPORT_URL = 'https://portal.example.com/reports/2024'
+
+
+def test_url_pattern():
+	assert TrajectoryCache.url_pattern('https://a.com/orders/1234/items?page=2#top') == 'a.com/orders/*/items'
+
+
+async def test_actions_are_reused_after_enough_successes(make_agent, make_browser_state, make_agent_output):
+	"""Test that a page is answered from the cache once the same actions succeeded on it min_successes times"""
+	cache = TrajectoryCache(TrajectoryCacheConfig(min_successes=2))
+	agent = make_agent(trajectory_cache=cache)
+	state = make_browser_state(['monthly', 'yearly'], url=REPORT_URL)
+	output = make_agent_output(agent, {'click_element_by_index': {'index': 1}})
+
+	cache.record(agent._task_family, state, output, [ActionResult()])
+	assert await agent._get_cached_next_action(state) is None
+
+	# same page on another run, e.g. another report id in the url
+	cache.record(
+		agent._task_family, make_browser_state(['monthly', 'yearly'], url='https://portal.example.com/reports/2025'), output, []
+	)
+	cached_output = await agent._get_cached_next_action(state)
+	assert cached_output is not None
+	assert cached_output.action[0].model_dump(exclude_unset=True) == {'click_element_by_index': {'index': 1}}
+
+
+async def test_cached_action_is_retargeted(make_agent, make_browser_state, make_agent_output):
+	"""Test that the cached element is found at its new index"""
+	cache = TrajectoryCache(TrajectoryCacheConfig(min_successes=1))
+	agent = make_agent(trajectory_cache=cache)
+	cache.record(
+		agent._task_family,
+		make_browser_state(['monthly', 'yearly']),
+		make_agent_output(agent, {'click_element_by_index': {'index': 2}}),
+		[],
+	)
+
+	# the same elements in another order
+	cached_output = await agent._get_cached_next_action(make_browser_state(['yearly', 'monthly']))
+	assert cached_output is not None
+	assert cached_output.action[0].get_index() == 1
+
+	# a different page
+	assert await agent._get_cached_next_action(make_browser_state(['monthly', 'yearly', 'weekly'])) is None
+
+
+async def test_failures_and_done_are_not_cached(tmp_path, make_agent, make_browser_state, make_agent_output):
+	"""Test that failed steps drop the entry and done steps are never stored"""
+	path = tmp_path / 'trajectories.json'
+	cache = TrajectoryCache(TrajectoryCacheConfig(path=str(path), min_successes=1))
+	agent = make_agent(trajectory_cache=cache)
+	state = make_browser_state(['monthly'])
+	click = make_agent_output(agent, {'click_element_by_index': {'index': 1}})
+
+	cache.record(agent._task_family, state, click, [])
+	assert not path.exists()  # written in the background
+	await cache.flush()
+	assert len(TrajectoryCache(TrajectoryCacheConfig(path=str(path)))) == 1
+
+	cache.record(agent._task_family, state, click, [ActionResult(error='Element not found')])
+	assert len(cache) == 0
+
+	cache.record(agent._task_family, state, make_agent_output(agent, {'done': {'text': 'Report opened', 'success': True}}), [])
+	assert len(cache) == 0
+
+	# the agent asks the model after a failed step
+	cache.record(agent._task_family, state, click, [])
+	agent.state.last_result = [ActionResult(error='Timeout')]
+	assert await agent._get_cached_next_action(state) is None
+
+
+async def test_writes_are_batched_off_the_event_loop(tmp_path, monkeypatch, make_agent, make_browser_state, make_agent_output):
+	"""Test that steps recorded in a row are saved together, on a worker thread"""
+	path = tmp_path / 'trajectories.json'
+	cache = TrajectoryCache(TrajectoryCacheConfig(path=str(path), min_successes=1))
+	agent = make_agent(trajectory_cache=cache)
+	writes: list[int] = []
+	write = cache._write
+
+	def slow_write(data: str) -> None:
+		time.sleep(0.05)
+		writes.append(threading.get_ident())
+		write(data)
+
+	monkeypatch.setattr(cache, '_write', slow_write)
+	for i in range(10):
+		cache.record(agent._task_family, make_browser_state([f'report {i}']), make_agent_output(agent, {'scroll_down': {}}), [])
+	await cache.flush()
+
+	assert len(writes) == 1
+	assert threading.get_ident() not in writes
+	assert len(TrajectoryCache(TrajectoryCacheConfig(path=str(path)))) == 10
+
+
+async def test_last_step_is_not_answered_from_the_cache(make_agent, make_browser_state, make_agent_output):
+	"""Test that the last step goes to the model, it has to finish with done"""
+	cache = TrajectoryCache(TrajectoryCacheConfig(min_successes=1))
+	agent = make_agent(trajectory_cache=cache)
+	state = make_browser_state(['monthly', 'yearly'])
+	cache.record(agent._task_family, state, make_agent_output(agent, {'click_element_by_index': {'index': 1}}), [])
+
+	assert await agent._get_cached_next_action(state, AgentStepInfo(step_number=3, max_steps=10)) is not None
+	assert await agent._get_cached_next_action(state, AgentStepInfo(step_number=9, max_steps=10)) is None
+
+
+async def test_lookup_recency_is_saved(tmp_path, make_agent, make_browser_state, make_agent_output):
+	"""Test that using a cached step is written to the file, the eviction goes by it"""
+	path = tmp_path / 'trajectories.json'
+	cache = TrajectoryCache(TrajectoryCacheConfig(path=str(path), min_successes=1))
+	agent = make_agent(trajectory_cache=cache)
+	state = make_browser_state(['monthly'])
+	cache.record(agent._task_family, state, make_agent_output(agent, {'click_element_by_index': {'index': 1}}), [])
+	await cache.flush()
+
+	step = cache.lookup(agent._task_family, state)
+	assert step is not None
+	await cache.flush()
+
+	saved = TrajectoryCacheData.model_validate_json(path.read_text())
+	assert [s.last_used_at for s in saved.steps.values()] == [step.last_used_at]
@@ -0,0 +1,45 @@
+from browser_use.agent.prompts import AgentMessagePrompt
+from browser_use.browser.views import BrowserState
+from browser_use.dom.views import DOMElementNode, DOMTextNode
+
+
+def make_tree(labels: list[str], new: set[int]) -> DOMElementNode:
+	"""Body with one link per label, indexed from 1, elements not in `new` were on the previous page already"""
+	root = DOMElementNode(tag_name='body', xpath='/body', attributes={}, children=[], is_visible=True, parent=None)
+	for index, label in enumerate(labels, start=1):
+		link = DOMElementNode(
+			tag_name='a',
+			xpath=f'/body/a[{index}]',
+			attributes={'title': f'Go to {label}'},
+			children=[],
+			is_visible=True,
+			parent=root,
+			highlight_index=index,
+		)
+		link.is_new = index in new
+		link.children.append(DOMTextNode(text=label, is_visible=True, parent=link))
+		root.children.append(link)
+	return root
+
+
+def test_unchanged_runs_are_collapsed():
+	labels = ['Home', 'Products', 'Pricing', 'A very long navigation link label here', 'Contact', 'Result', 'Next', 'Footer']
+	tree = make_tree(labels, new={6})
+
+	assert tree.clickable_elements_to_string(include_attributes=['title']).splitlines()[0] == "[1]<a title='Go to Home'>Home />"
+	assert tree.clickable_elements_to_string(include_attributes=['title'], compact_unchanged=True).splitlines() == [
+		'(unchanged since last step) [1]<a>Home [2]<a>Products [3]<a>Pricing [4]<a>A very long navigation link... [5]<a>Contact',
+		"*[6]*<a title='Go to Result'>Result />",
+		"[7]<a title='Go to Next'>Next />",
+		"[8]<a title='Go to Footer'>Footer />",
+	]
+
+
+def test_fresh_page_is_shown_in_full():
+	tree = make_tree(['Home', 'Products', 'Pricing', 'About', 'Contact'], new=set())
+	for node in tree.children:
+		node.is_new = None  # the url changed, nothing to compare with
+	state = BrowserState(element_tree=tree, selector_map={}, url='https://example.com', title='', tabs=[])
+	message = AgentMessagePrompt(state, compact_unchanged_elements=True).get_user_message(use_vision=False)
+	assert 'unchanged' not in message.content
+	assert '[5]<a >Contact />' in message.content
@@ -0,0 +1,103 @@
+import base64
+import struct
+import sys
+import zlib
+
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from browser_use.agent.message_manager.service import MessageManager, MessageManagerSettings
+from browser_use.agent.views import MessageManagerState
+from browser_use.agent.vision import estimate_image_tokens, png_size, screenshot_images
+from browser_use.dom.history_tree_processor.view import CoordinateSet
+from browser_use.dom.views import DOMElementNode
+
+
+def make_png(width: int, height: int) -> str:
+	"""A blank png, without Pillow"""
+
+	def chunk(kind: bytes, data: bytes) -> bytes:
+		return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+	rows = b''.join(b'\x00' + b'\xff' * width * 3 for _ in range(height))
+	png = (
+		b'\x89PNG\r\n\x1a\n'
+		+ chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+		+ chunk(b'IDAT', zlib.compress(rows))
+		+ chunk(b'IEND', b'')
+	)
+	return base64.b64encode(png).decode()
+
+
+def make_page(new_elements: dict[int, tuple[int, int, int, int]]) -> DOMElementNode:
+	body = DOMElementNode(tag_name='body', xpath='body', attributes={}, children=[], is_visible=True, parent=None)
+	body.viewport_info = type('Viewport', (), {'width': 800, 'height': 600})()  # css pixels, the screenshot is 2x
+	for index, rect in new_elements.items():
+		body.children.append(
+			DOMElementNode(
+				tag_name='button',
+				xpath=f'button[{index}]',
+				attributes={},
+				children=[],
+				is_visible=True,
+				parent=body,
+				highlight_index=index,
+				viewport_coordinates=CoordinateSet.from_rect(*rect),
+				is_new=True,
+			)
+		)
+	return body
+
+
+def test_png_size_reads_the_header():
+	assert png_size(make_png(37, 11)) == (37, 11)
+	assert png_size('data:image/png;base64,' + make_png(5, 3)) == (5, 3)
+	assert png_size(base64.b64encode(b'not an image, just some bytes').decode()) is None
+
+
+def test_image_tokens_counted_by_size():
+	settings = MessageManagerSettings(vision_image_tokens=1000)
+	manager = MessageManager(
+		task='task', system_message=SystemMessage(content='system'), settings=settings, state=MessageManagerState()
+	)
+	message = HumanMessage(
+		content=[
+			{'type': 'text', 'text': 'state'},
+			{'type': 'image_url', 'image_url': {'url': 'data:image/png;base64,' + make_png(300, 250)}},
+			{'type': 'image_url', 'image_url': {'url': 'data:image/png;base64,' + make_png(100, 75)}},
+		]
+	)
+	assert manager._count_tokens(message) == manager._count_text_tokens('state') + 100 + 10
+
+
+def test_overview_and_crops_fit_the_budget():
+	pytest.importorskip('PIL')
+	page = make_page({3: (100, 100, 80, 30), 4: (150, 110, 80, 30), 7: (600, 500, 60, 20)})
+	images = screenshot_images(make_png(1600, 1200), page, token_budget=1500)
+
+	assert [image.label for image in images] == [
+		'Screenshot of the viewport:',
+		'Close-up of the new elements [3], [4]:',
+		'Close-up of the new elements [7]:',
+	]
+	assert images[0].tokens <= 750
+	assert sum(image.tokens for image in images) <= 1500
+	# elements 3 and 4 overlap once padded, the crop covers both at full resolution
+	assert (images[1].width, images[1].height) == ((130 + 2 * 48) * 2, (40 + 2 * 48) * 2)
+
+
+def test_no_new_elements_gives_the_overview_the_whole_budget():
+	pytest.importorskip('PIL')
+	images = screenshot_images(make_png(1600, 1200), make_page({}), token_budget=1500)
+	assert len(images) == 1
+	assert 1400 < images[0].tokens <= 1500
+	assert estimate_image_tokens(images[0].width, images[0].height) == images[0].tokens
+
+
+def test_agent_requires_pillow_for_vision_image_tokens(monkeypatch, make_agent):
+	"""Test that a missing Pillow is reported when the agent is created, not on every step"""
+	monkeypatch.setitem(sys.modules, 'PIL', None)
+
+	with pytest.raises(ImportError, match='browser-use\\[vision\\]'):
+		make_agent(vision_image_tokens=1200)
+	make_agent()